@@ -1,4 +1,12 @@
-from typing import List, Optional, Any
+import asyncio
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import AsyncIterator, Iterable, Iterator, List, Optional, Tuple, Any
+from agents.batch import BatchCheckpoint, BatchResult, BatchStats
+from agents.context_builder import BuiltContext, ContextBuilder, memory_parts
+from agents.tool_matcher import ToolMatch, ToolMatcher
+from agents.tool_calling import ToolCallExecutor, tool_spec
 
 class BaseAgent:
     """
@@ -12,15 +20,28 @@ class BaseAgent:
         model: Optional[Any] = None,
         memory: Optional[Any] = None,
         tools: Optional[List[Any]] = None,
+        tool_matcher: Optional[ToolMatcher] = None,
+        context_builder: Optional[ContextBuilder] = None,
     ):
         """
         :param model:   An object or function capable of processing text (i.e., must have a .generate(str)->str method).
         :param memory:  An object to store and retrieve data (e.g., conversation history).
         :param tools:   A list of tool objects/functions the agent can call.
+        :param tool_matcher: An empty ToolMatcher configured for matching TRIGGER_KEYWORDs
+                             (e.g. ToolMatcher(ignore_case=True, whole_words=True)); defaults to
+                             plain case-sensitive substring matching.
+        :param context_builder: Packs memory and recent turns into a token budget
+                                (see agents/context_builder.py); defaults to ContextBuilder().
         """
         self.model = model
         self.memory = memory
         self.tools = tools or []
+        self.tool_matcher = tool_matcher or ToolMatcher()
+        for tool in self.tools:
+            self.tool_matcher.add(tool)
+        self.context_builder = context_builder or ContextBuilder()
+        self._tool_executor = None
+        self.last_batch_stats: Optional[BatchStats] = None
 
     def set_model(self, model: Any):
         """Set or replace the current model."""
@@ -33,23 +54,43 @@ class BaseAgent:
     def add_tool(self, tool: Any):
         """Add a new tool to the agent's toolset."""
         self.tools.append(tool)
+        self.tool_matcher.add(tool)
 
     def _retrieve_context(self, prompt: str) -> str:
         """Override with your own logic if you have memory."""
         if self.memory is None:
             return ""
-        # E.g., if memory has a .retrieve() method
-        return self.memory.retrieve(prompt)
+        # E.g., if memory has a .retrieve() method (see agents/memory.py)
+        return self.memory.retrieve(prompt) or ""
+
+    def _gather_context(self, prompt: str) -> Tuple[List[Any], List[str]]:
+        """(recent turns, retrieved snippets) for the context builder."""
+        if self.memory is not None and hasattr(self.memory, "latest") and hasattr(self.memory, "search"):
+            return memory_parts(self.memory, prompt, self.context_builder.max_turns)
+        context = self._retrieve_context(prompt)
+        return [], [context] if context else []
+
+    def _build_context(self, prompt: str, history: List[Any], retrieved: List[str], extra: str = "") -> BuiltContext:
+        """The prompt with its context, packed into the context builder's token budget."""
+        return self.context_builder.build(prompt, history=history, retrieved=retrieved, extra=extra,
+                                          scope=getattr(self.memory, "scope", "default"))
     
+    def _find_tools(self, prompt: str) -> List[ToolMatch]:
+        """All tools whose TRIGGER_KEYWORD occurs in the prompt, best match first."""
+        if len(self.tool_matcher) != len(self.tools):
+            # self.tools was changed directly instead of through add_tool
+            self.tool_matcher = ToolMatcher(
+                self.tools, ignore_case=self.tool_matcher.ignore_case, whole_words=self.tool_matcher.whole_words
+            )
+        return self.tool_matcher.match(prompt)
+
     def _decide_tool_usage(self, prompt: str) -> Optional[Any]:
         """
         Decide if a tool is needed. This is a stub; your real logic might parse the prompt
         or use an LLM to decide which tool to call.
         """
-        for tool in self.tools:
-            if hasattr(tool, "TRIGGER_KEYWORD") and tool.TRIGGER_KEYWORD in prompt:
-                return tool
-        return None
+        matches = self._find_tools(prompt)
+        return matches[0].tool if matches else None
 
     def run(self, prompt: str, prefix: str="", suffix: str="", no_prefix: bool=False) -> str:
         """
@@ -61,15 +102,17 @@ class BaseAgent:
           5) Return the final response
         """
         # (1) Retrieve context
-        context = self._retrieve_context(prompt)
+        history, retrieved = self._gather_context(prompt)
 
-        # (2) Decide if a tool is needed
+        # (2) Decide if a tool is needed; the context is packed into the token budget
         chosen_tool = self._decide_tool_usage(prompt)
         if chosen_tool is not None:
             tool_output = chosen_tool.run(prompt)
-            final_prompt = f"{context}\nTool Output: {tool_output}\nOriginal Prompt: {prompt}"
+            final_prompt = self._build_context(
+                f"Original Prompt: {prompt}", history, retrieved, extra=f"Tool Output: {tool_output}"
+            ).text
         else:
-            final_prompt = f"{context}\n{prompt}"
+            final_prompt = self._build_context(prompt, history, retrieved).text
 
         # (3) Generate response using the model (DeepSeekModel in your case)
         if self.model is not None and hasattr(self.model, "generate"):
@@ -84,3 +127,185 @@ class BaseAgent:
         # (5) Return the response
         return response
 
+    @property
+    def tool_executor(self) -> ToolCallExecutor:
+        """Thread pool and result cache for run_with_tools, created on first use."""
+        if self._tool_executor is None:
+            self._tool_executor = ToolCallExecutor()
+        return self._tool_executor
+
+    def run_with_tools(self, prompt: str, max_steps: int = 6, token_budget: int = 20000) -> str:
+        """
+        Tool-calling loop: the model may request several tool calls per turn; they
+        run concurrently (see agents/tool_calling.py), their results are sent back,
+        and this repeats until the model answers without tool calls.
+
+        :param prompt:       The user request.
+        :param max_steps:    Model turns that may request tools; one more turn without
+                             tools then forces an answer.
+        :param token_budget: Total tokens (prompt + completion) over all turns; when it
+                             is used up the loop stops with the last answer so far.
+        """
+        if self.model is None or not hasattr(self.model, "tool_chat"):
+            raise ValueError("run_with_tools needs a model with tool_chat() (e.g. DeepSeekModel)")
+
+        tools = {tool.NAME: tool for tool in self.tools if getattr(tool, "NAME", None)}
+        specs = [tool_spec(tool) for tool in tools.values()]
+        history, retrieved = self._gather_context(prompt)
+        messages = [{"role": "user", "content": self._build_context(prompt, history, retrieved).text}]
+        tokens_used = 0
+        response = ""
+
+        for step in range(max_steps + 1):
+            # The last turn is offered no tools, so the model has to answer
+            offered = specs if step < max_steps else None
+            message, usage = self.model.tool_chat(messages, tools=offered)
+            tokens_used += getattr(usage, "total_tokens", 0) or 0
+            response = message.content or ""
+            tool_calls = getattr(message, "tool_calls", None) or []
+            if not tool_calls or offered is None:
+                break
+            if tokens_used >= token_budget:
+                print(f"[BaseAgent] Token budget of {token_budget} used up after {step + 1} turns")
+                response = response or "Stopped: the token budget was used up before a final answer."
+                break
+
+            calls = [(call.id, call.function.name, call.function.arguments) for call in tool_calls]
+            print(f"[BaseAgent] Turn {step + 1}: {len(calls)} tool calls: {', '.join(c[1] for c in calls)}")
+            messages.append({
+                "role": "assistant",
+                "content": message.content or "",
+                "tool_calls": [
+                    {"id": call_id, "type": "function", "function": {"name": name, "arguments": arguments}}
+                    for call_id, name, arguments in calls
+                ],
+            })
+            results = self.tool_executor.execute(calls, tools)
+            for (call_id, _, _), result in zip(calls, results):
+                messages.append({"role": "tool", "tool_call_id": call_id, "content": result})
+
+        if self.memory is not None and hasattr(self.memory, "store"):
+            self.memory.store(prompt, response)
+        return response
+
+    def _run_one(self, index: int, prompt: str, run_kwargs: dict) -> BatchResult:
+        started = time.perf_counter()
+        try:
+            output, error = self.run(prompt, **run_kwargs), None
+        except Exception as e:
+            output, error = None, f"{type(e).__name__}: {e}"
+        return BatchResult(index, prompt, output, error, time.perf_counter() - started, False)
+
+    def run_many(self, prompts: Iterable[str], concurrency: int = 8, ordered: bool = False,
+                 checkpoint_path: Optional[str] = None, progress_every: int = 100,
+                 **run_kwargs) -> Iterator[BatchResult]:
+        """
+        Runs many prompts through run() on a thread pool and yields a BatchResult per prompt.
+
+        :param prompts:         Any iterable; it is consumed lazily, so it can be a large file or generator.
+        :param concurrency:     Prompts running at the same time.
+        :param ordered:         Yield in input order instead of completion order (results that finish
+                                early are held back; at most 4x concurrency prompts are buffered).
+        :param checkpoint_path: JSONL file of finished prompts; on a rerun these are yielded from the
+                                file (resumed=True) instead of running again.
+        :param progress_every:  Print progress every this many results (0 disables).
+        :param run_kwargs:      Passed on to run() (prefix, suffix, no_prefix).
+
+        Throughput is printed at the end and kept in self.last_batch_stats.
+        The model (and memory, if any) must be safe to use from several threads.
+        """
+        checkpoint = BatchCheckpoint(checkpoint_path) if checkpoint_path else None
+        stats = self.last_batch_stats = BatchStats()
+        window = concurrency * 4 if ordered else concurrency
+        pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="agent-batch")
+        source = enumerate(prompts)
+        exhausted = False
+        in_flight = {}
+        held = {}
+        next_index = 0
+
+        def emit(result: BatchResult) -> List[BatchResult]:
+            nonlocal next_index
+            stats.add(result)
+            if progress_every and (stats.completed + stats.failed + stats.resumed) % progress_every == 0:
+                print(f"[BaseAgent] run_many progress: {stats.summary()}")
+            if not ordered:
+                return [result]
+            held[result.index] = result
+            ready = []
+            while next_index in held:
+                ready.append(held.pop(next_index))
+                next_index += 1
+            return ready
+
+        try:
+            while True:
+                while not exhausted and len(in_flight) < concurrency and len(in_flight) + len(held) < window:
+                    try:
+                        index, prompt = next(source)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    entry = checkpoint.lookup(index, prompt) if checkpoint else None
+                    if entry is not None:
+                        yield from emit(BatchResult(index, prompt, entry["output"], None, 0.0, True))
+                        continue
+                    in_flight[pool.submit(self._run_one, index, prompt, run_kwargs)] = index
+
+                if not in_flight:
+                    if exhausted:
+                        break
+                    continue
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del in_flight[future]
+                    result = future.result()
+                    if checkpoint:
+                        checkpoint.record(result)
+                    yield from emit(result)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            if checkpoint:
+                checkpoint.close()
+            print(f"[BaseAgent] run_many: {stats.summary()}")
+
+    async def arun_many(self, prompts: Iterable[str], concurrency: int = 8, ordered: bool = False,
+                        checkpoint_path: Optional[str] = None, **run_kwargs) -> AsyncIterator[BatchResult]:
+        """
+        Async version of run_many for use inside an event loop; same arguments.
+        The batch runs on a helper thread and results are handed over with backpressure.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+        stop = threading.Event()
+        finished = object()
+
+        def produce():
+            results = self.run_many(prompts, concurrency=concurrency, ordered=ordered,
+                                    checkpoint_path=checkpoint_path, **run_kwargs)
+            outcome = finished
+            try:
+                for result in results:
+                    if stop.is_set():
+                        return
+                    asyncio.run_coroutine_threadsafe(queue.put(result), loop).result()
+            except BaseException as e:
+                outcome = e
+            finally:
+                results.close()
+            if not stop.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(outcome), loop).result()
+
+        threading.Thread(target=produce, daemon=True).start()
+        try:
+            while True:
+                item = await queue.get()
+                if item is finished:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            while not queue.empty():
+                queue.get_nowait()
@@ -0,0 +1,116 @@
+"""
+Batch Module
+
+Helpers for BaseAgent.run_many / arun_many.
+
+Classes:
+    BatchResult: Outcome of one prompt of a batch.
+    BatchCheckpoint: Append-only JSONL log of finished prompts, so a restarted
+                     job skips what is already done.
+    BatchStats: Progress counters and throughput of a batch.
+
+Note:
+    The checkpoint stores each prompt's index plus a hash of its text, so a
+    resumed job only reuses an entry when the prompt at that position is
+    unchanged. Failed prompts are not checkpointed and run again on resume.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+
+class BatchResult(NamedTuple):
+    index: int            # position of the prompt in the input
+    prompt: str
+    output: Any           # run() result, None on failure
+    error: Optional[str]  # error message on failure
+    seconds: float        # time spent in run() (0 when resumed)
+    resumed: bool         # taken from the checkpoint
+
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+class BatchCheckpoint:
+    """
+    Args:
+        path (str): JSONL file; created on first write, appended to afterwards
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Dict[int, dict] = {}
+        self._lock = threading.Lock()
+        self._file = None
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a line cut short by a crash
+                    self.done[entry["index"]] = entry
+
+    def lookup(self, index: int, prompt: str) -> Optional[dict]:
+        entry = self.done.get(index)
+        if entry is not None and entry.get("key") == prompt_key(prompt):
+            return entry
+        return None
+
+    def record(self, result: BatchResult):
+        if result.error is not None:
+            return
+        line = json.dumps({
+            "index": result.index, "key": prompt_key(result.prompt),
+            "output": result.output, "seconds": round(result.seconds, 3),
+        }, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "a", buffering=1)
+            self._file.write(line)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class BatchStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.completed = 0
+        self.failed = 0
+        self.resumed = 0
+        self.busy_seconds = 0.0
+
+    def add(self, result: BatchResult):
+        if result.resumed:
+            self.resumed += 1
+        elif result.error is not None:
+            self.failed += 1
+        else:
+            self.completed += 1
+        self.busy_seconds += result.seconds
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def throughput(self) -> float:
+        """Prompts run (not resumed) per second of wall time."""
+        return (self.completed + self.failed) / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        ran = self.completed + self.failed
+        average = self.busy_seconds / ran if ran else 0.0
+        return (f"{self.completed} completed, {self.failed} failed, {self.resumed} resumed in {self.elapsed:.1f}s "
+                f"({self.throughput:.2f} prompts/s, {average:.2f}s per prompt)")
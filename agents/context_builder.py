@@ -0,0 +1,317 @@
+"""
+Context Builder Module
+
+Packs the context of a prompt (system prompt, retrieved memory, recent
+conversation turns and a summary of older turns) into a token budget, so
+prompt size, latency and cost stay bounded however long a conversation gets.
+
+Classes:
+    Turn: One user/assistant exchange (ConversationMemory's MemoryEntry works too).
+    RollingSummary: Cached summary of a scope's turns up to a turn id.
+    BuiltContext: The packed context and its token accounting.
+    ContextBuilder: Does the packing and keeps the rolling summaries.
+
+Functions:
+    count_tokens: Local token estimate (no tokenizer download or API call).
+    memory_parts: Recent turns and relevant older entries from a memory backend.
+    extractive_summarizer: Default summarizer; compacts turns without a model call.
+    model_summarizer: Summarizer that asks a model for the summary.
+
+Packing order (what is dropped last comes first):
+    1. system prompt, prompt and extra text (e.g. tool output), always kept
+    2. recent turns, newest first, up to `history_share` of the budget
+    3. the rolling summary of turns that no longer fit, up to `summary_tokens`
+    4. retrieved memory snippets, best first, in whatever budget is left
+
+Rolling summaries:
+    Turns that fall out of the window are folded into the scope's summary:
+    summarizer(previous summary, newly dropped turns). Each turn is summarized
+    once; later calls only pay for turns that dropped out since. Summarized
+    turns never re-enter the window, so the summary and the window do not overlap.
+    The window then shrinks to `compact_to` of its budget, so a summary call
+    happens every few turns instead of on every turn once the window is full.
+
+Configuration (environment):
+    CONTEXT_TOKEN_BUDGET=4000     Default token budget of a built prompt
+    CONTEXT_SUMMARIZER=model      Summarize with a model instead of extractively
+
+Example Usage:
+    builder = ContextBuilder(budget=3000, summarizer=model_summarizer())
+    history, retrieved = memory_parts(memory.scoped("discord:1234"), prompt, builder.max_turns)
+    built = builder.build(prompt, history=history, retrieved=retrieved, scope="discord:1234")
+    answer = model.generate(built.text)
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+_PIECE = re.compile(r"\w+|[^\w\s]")
+
+HEADING_TOKENS = 8
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimate of BPE tokens: about one token per four characters of a word and
+    one per punctuation mark. Within ~15% of GPT/DeepSeek tokenizers for English.
+    """
+    return sum((len(piece) + 3) // 4 for piece in _PIECE.findall(text))
+
+
+def truncate_tokens(text: str, max_tokens: int, count: Callable[[str], int] = count_tokens) -> str:
+    """Cuts text to about max_tokens at a word boundary."""
+    if max_tokens <= 0:
+        return ""
+    total = count(text)
+    if total <= max_tokens:
+        return text
+    characters = max(1, len(text) * max_tokens // total - 3)
+    cut = text[:characters]
+    return (cut[:cut.rfind(" ")] if " " in cut else cut) + "..."
+
+
+class Turn(NamedTuple):
+    id: int          # increasing per scope
+    prompt: str
+    response: str
+
+
+class RollingSummary(NamedTuple):
+    text: str
+    upto: int        # id of the newest summarized turn
+
+
+class BuiltContext(NamedTuple):
+    system_prompt: str
+    context: str     # summary, retrieved snippets and recent turns
+    prompt: str
+    tokens: int      # estimated tokens of system prompt + context + prompt
+    turns: int       # recent turns included verbatim
+    summarized: int  # turns newly folded into the summary by this call
+    snippets: int    # retrieved snippets included
+
+    @property
+    def text(self) -> str:
+        """Context and prompt as one user message."""
+        return f"{self.context}\n{self.prompt}" if self.context else self.prompt
+
+
+def format_turn(turn: Any) -> str:
+    return f"User: {turn.prompt}\nAssistant: {turn.response}"
+
+
+def extractive_summarizer(previous: str, turns: Sequence[Any], max_tokens: int) -> str:
+    """
+    Appends one line per turn (the start of the user message and of the answer)
+    and keeps the newest lines that fit in max_tokens.
+    """
+    lines = previous.split("\n") if previous else []
+    for turn in turns:
+        asked = truncate_tokens(" ".join(turn.prompt.split()), 30)
+        answered = truncate_tokens(" ".join(turn.response.split()), 40)
+        lines.append(f"- User: {asked} / Assistant: {answered}")
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return truncate_tokens("\n".join(lines), max_tokens)
+
+
+SUMMARY_PROMPT = """Update the running summary of a conversation with the new turns below.
+Keep facts, names, dates, decisions and open requests; drop small talk. Answer with the summary only,
+at most {words} words.
+
+Current summary:
+{previous}
+
+New turns:
+{turns}"""
+
+
+def model_summarizer(model: Optional[Any] = None) -> Callable[[str, Sequence[Any], int], str]:
+    """
+    Summarizer backed by a model with generate(text, prompt_type="prompt")
+    (default: build_model for the "summary" call site, created on first use).
+    Falls back to the extractive summary when the model call fails.
+    """
+    state = {"model": model}
+
+    def summarize(previous: str, turns: Sequence[Any], max_tokens: int) -> str:
+        if state["model"] is None:
+            from modules.ai_modules.models.router import build_model
+            state["model"] = build_model(system_prompt="You summarize conversations.", call_site="summary",
+                                         prompt_type="prompt")
+        request = SUMMARY_PROMPT.format(
+            words=max(20, max_tokens * 3 // 4), previous=previous or "(empty)",
+            turns="\n".join(format_turn(turn) for turn in turns),
+        )
+        try:
+            summary = state["model"].generate(text=request, prompt_type="prompt")
+        except Exception as e:
+            print(f"[ContextBuilder] Summary model failed, using extractive summary: {e}")
+            return extractive_summarizer(previous, turns, max_tokens)
+        return truncate_tokens((summary or "").strip(), max_tokens)
+
+    return summarize
+
+
+def memory_parts(memory: Any, prompt: str, max_turns: int, k: int = 4) -> Tuple[List[Any], List[str]]:
+    """
+    (recent turns oldest first, retrieved snippets best first) from a memory backend.
+
+    Memories with latest()/search() (ConversationMemory.scoped) provide turns and
+    entries separately, without overlap; any other memory's retrieve() text is
+    used as a single snippet. Twice the window is fetched, so turns leaving the
+    window are seen by the builder and folded into the summary.
+    """
+    if memory is None:
+        return [], []
+    if hasattr(memory, "latest") and hasattr(memory, "search"):
+        history = memory.latest(max_turns * 2)
+        entries = memory.search(prompt, k, exclude=[turn.id for turn in history])
+        return history, [format_turn(entry) for entry in entries]
+    retrieved = memory.retrieve(prompt) if hasattr(memory, "retrieve") else ""
+    return [], [retrieved] if retrieved else []
+
+
+class ContextBuilder:
+    """
+    Args:
+        budget (int): Token budget of system prompt + context + prompt (default: CONTEXT_TOKEN_BUDGET)
+        history_share (float): Share of the remaining budget recent turns may use
+        max_turns (int): Recent turns considered for the window
+        compact_to (float): When turns must drop out, the window shrinks to this share of
+                            its budget, so the next turns fit without another summary call
+        summary_tokens (int): Maximum tokens of a rolling summary
+        summarizer (callable): (previous summary, turns, max_tokens) -> summary
+                               (default: extractive_summarizer, or model_summarizer with
+                               CONTEXT_SUMMARIZER=model)
+        count (callable): Token counter (default: count_tokens)
+        max_scopes (int): Rolling summaries kept; the least recently used are dropped
+    """
+    def __init__(self, budget: Optional[int] = None, history_share: float = 0.5, max_turns: int = 20,
+                 compact_to: float = 0.6, summary_tokens: int = 300, summarizer: Optional[Callable[[str, Sequence[Any], int], str]] = None,
+                 count: Callable[[str], int] = count_tokens, max_scopes: int = 1024):
+        self.budget = budget or int(os.getenv("CONTEXT_TOKEN_BUDGET", "4000"))
+        self.history_share = history_share
+        self.max_turns = max_turns
+        self.compact_to = compact_to
+        self.summary_tokens = summary_tokens
+        if summarizer is None:
+            summarizer = model_summarizer() if os.getenv("CONTEXT_SUMMARIZER") == "model" else extractive_summarizer
+        self.summarizer = summarizer
+        self.count = count
+        self.max_scopes = max_scopes
+        self.summaries_computed = 0
+        self._summaries: "OrderedDict[str, RollingSummary]" = OrderedDict()
+        self._turn_tokens: "OrderedDict[Tuple[str, int], int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def summary(self, scope: str) -> Optional[RollingSummary]:
+        with self._lock:
+            return self._summaries.get(scope)
+
+    def _tokens_of_turn(self, scope: str, turn: Any) -> int:
+        """Token count of a formatted turn, cached by (scope, turn id): turns are counted once."""
+        key = (scope, turn.id)
+        with self._lock:
+            tokens = self._turn_tokens.get(key)
+        if tokens is None:
+            tokens = self.count(format_turn(turn)) + 1
+            with self._lock:
+                self._turn_tokens[key] = tokens
+                while len(self._turn_tokens) > self.max_scopes * self.max_turns * 2:
+                    self._turn_tokens.popitem(last=False)
+        return tokens
+
+    def _compact(self, scope: str, summary: Optional[RollingSummary], dropped: List[Any]) -> RollingSummary:
+        """Folds the turns that fell out of the window into the scope's summary."""
+        previous = summary.text if summary is not None else ""
+        summary = RollingSummary(self.summarizer(previous, dropped, self.summary_tokens), dropped[-1].id)
+        self.summaries_computed += 1
+        with self._lock:
+            current = self._summaries.get(scope)
+            if current is not None and current.upto >= summary.upto:
+                return current  # a concurrent call already summarized further
+            self._summaries[scope] = summary
+            self._summaries.move_to_end(scope)
+            while len(self._summaries) > self.max_scopes:
+                self._summaries.popitem(last=False)
+        return summary
+
+    def _window(self, scope: str, turns: Sequence[Any], budget: int) -> Tuple[List[Any], int]:
+        """The newest turns that fit in budget (oldest first) and their tokens."""
+        kept: List[Any] = []
+        used = 0
+        for turn in reversed(turns[-self.max_turns:]):
+            tokens = self._tokens_of_turn(scope, turn)
+            if used + tokens > budget:
+                break
+            kept.append(turn)
+            used += tokens
+        kept.reverse()
+        return kept, used
+
+    def build(self, prompt: str, system_prompt: str = "", history: Sequence[Any] = (),
+              retrieved: Sequence[str] = (), extra: str = "", scope: str = "default") -> BuiltContext:
+        """
+        Packs the context for `prompt`.
+
+        :param history:   Recent turns, oldest first (objects with id, prompt and response).
+        :param retrieved: Memory snippets, best first.
+        :param extra:     Text that must be kept, placed right before the prompt (e.g. tool output).
+        :param scope:     Key of the rolling summary (e.g. the memory scope).
+        """
+        prompt_part = f"{extra}\n{prompt}" if extra else prompt
+        fixed = self.count(system_prompt) + self.count(prompt_part)
+        # Room for the section headings
+        available = self.budget - fixed - 3 * HEADING_TOKENS
+        if available <= 0:
+            print(f"[ContextBuilder] Prompt alone uses {fixed} of {self.budget} tokens; no context added")
+
+        summary = self.summary(scope)
+        if summary is not None:
+            with self._lock:
+                self._summaries.move_to_end(scope)
+        turns = [turn for turn in history if summary is None or turn.id > summary.upto]
+
+        # Recent turns, newest first, within the history share
+        window_budget = max(0, int(available * self.history_share))
+        kept, used = self._window(scope, turns, window_budget)
+        if len(kept) < len(turns):
+            kept, used = self._window(scope, turns, int(window_budget * self.compact_to))
+        dropped = turns[:len(turns) - len(kept)]
+        if dropped:
+            summary = self._compact(scope, summary, dropped)
+
+        sections = []
+        if summary is not None and summary.text and available - used > 0:
+            text = truncate_tokens(summary.text, min(self.summary_tokens, available - used), self.count)
+            if text:
+                sections.append(f"Summary of the earlier conversation:\n{text}")
+                used += self.count(text)
+
+        snippets = []
+        for snippet in retrieved:
+            tokens = self.count(snippet) + 1
+            if used + tokens > available:
+                # The best snippet that does not fit is cut to the rest of the budget
+                snippet = truncate_tokens(snippet, available - used - 1, self.count)
+                if self.count(snippet) >= 20:
+                    snippets.append(snippet)
+                    used = available
+                break
+            snippets.append(snippet)
+            used += tokens
+        if snippets:
+            sections.append("Relevant earlier exchanges:\n" + "\n".join(snippets))
+        if kept:
+            sections.append("Recent conversation:\n" + "\n".join(format_turn(turn) for turn in kept))
+
+        context = "\n\n".join(sections)
+        return BuiltContext(
+            system_prompt=system_prompt, context=context, prompt=prompt_part,
+            tokens=fixed + (self.count(context) if context else 0),
+            turns=len(kept), summarized=len(dropped), snippets=len(snippets),
+        )
@@ -1,6 +1,13 @@
-from typing import Any, Optional
-import json
+import contextvars
+import threading
+from typing import Any, Dict, Optional, Tuple
 from agents.managers.manager_config import managers_config
+from modules.ai_modules.models.schemas import WorkflowChoice, workflow_params_model
+from modules.ai_modules.models.structured import (
+    StructuredOutputError, describe_error, extract_json, structured_stats, validate,
+)
+from modules.telemetry.tracing import tracer
+from workflows.run_journal import DISPATCHED, IN_PROGRESS, TAKEN_OVER, RunJournal
 
 class BaseManager:
     """
@@ -11,63 +18,197 @@ class BaseManager:
         model: Optional[Any] = None,
         name: str = "",
         role: str = "",
+        journal: Optional[RunJournal] = None,
 
     ):
         """
         :param model:   An object or function capable of processing text (i.e., must have a .generate(str)->str method).
-        :param memory:  An object to store and retrieve data (e.g., conversation history).
-        :param tools:   A list of tool objects/functions the agent can call.
+        :param name:    Manager name as used in managers_config.
+        :param role:    Manager role.
+        :param journal: Optional RunJournal; runs with a run_key are journaled, resumed and deduplicated.
         """
         self.model = model
         self.name = name
         self.role = role
-    
-    def run(self, text: str, prompt_type: str = 'json'):
+        self.journal = journal
+
+    def _workflow_info(self, workflow_name: str) -> Optional[dict]:
+        manager_data = managers_config.get(self.name, {})
+        return next((w for w in manager_data.get("workflows", []) if w["name"] == workflow_name), None)
+
+    def _check_choice(self, choice: WorkflowChoice) -> WorkflowChoice:
         """
-        Processes the response and passes parameters to the workflow.
+        Validates the chosen workflow and its params against managers_config.
+        Raises ValueError with the problems, which are sent back to the model.
         """
-        if self.model is not None and hasattr(self.model, "generate"):
-            raw_response = self.model.generate(text)
-            print("Raw response:", raw_response)
+        workflow_info = self._workflow_info(choice.workflow)
+        if workflow_info is None:
+            names = [w["name"] for w in managers_config.get(self.name, {}).get("workflows", [])]
+            raise ValueError(f"workflow must be one of {names}, not '{choice.workflow}'")
+        try:
+            params = workflow_params_model(self.name, workflow_info).model_validate(choice.params)
+        except ValueError as e:
+            raise ValueError(describe_error(e, prefix="params")) from e
+        return WorkflowChoice(workflow=choice.workflow, params=params.model_dump(exclude_none=True))
 
-            # Clean response if wrapped in ```json
-            if raw_response.startswith("```json"):
-                raw_response = raw_response.strip().replace("```json\n", "").replace("```", "")
+    def _prepare(self, workflow_name: Any, prepared: Dict[str, Any]):
+        """
+        Instantiates a workflow as soon as the model has named it and starts its
+        warm_up() on a thread, so its setup overlaps with the generation of the params.
+        The choice is not validated yet; an unused instance is simply dropped.
+        Called under the plan's lock, since hedged calls stream from several threads.
+        """
+        if not isinstance(workflow_name, str) or workflow_name in prepared:
+            return
+        workflow_info = self._workflow_info(workflow_name)
+        trigger = workflow_info["trigger"] if workflow_info else None
+        if not isinstance(trigger, type):
+            return
+        instance = prepared[workflow_name] = trigger()
+        warm_up = getattr(instance, "warm_up", None)
+        if warm_up is None:
+            return
 
-            try:
-                parsed_response = json.loads(raw_response)
-            except json.JSONDecodeError as e:
-                print(f"Failed to parse JSON: {e}")
-                return "Error: Unable to process the response."
+        def run():
+            with tracer.span("workflow.warm_up", workflow=workflow_name):
+                try:
+                    warm_up()
+                except Exception as e:
+                    # execute() repeats the setup and reports the error
+                    print(f"[BaseManager] Warm-up of '{workflow_name}' failed: {e}")
 
-            # Extract workflow and params
-            workflow_name = parsed_response.get("workflow")
-            params = parsed_response.get("params", {})
+        # Copy the context so the warm-up span joins the current trace
+        threading.Thread(target=contextvars.copy_context().run, args=(run,),
+                         name="workflow-warm-up", daemon=True).start()
 
-            manager_data = managers_config.get(self.name, {})
-            workflow_info = next(
-                (w for w in manager_data.get("workflows", []) if w["name"] == workflow_name),
-                None
-            )
+    def _plan(self, text: str, prepared: Optional[Dict[str, Any]] = None) -> Tuple[Optional[str], dict, Optional[str]]:
+        """
+        Asks the model which workflow to run.
+        Returns (workflow_name, params, error message).
 
-            if not workflow_info:
-                return f"No workflow named '{workflow_name}' found for {self.name}."
+        :param prepared: Receives {workflow_name: instance} for workflows warmed up
+                         while the answer was streaming; pass it on to _execute().
+        """
+        # Hedged calls report members from several threads, and an abandoned one
+        # keeps streaming after the plan is made; only the first report counts
+        lock = threading.Lock()
+        closed = False
+
+        def on_member(key: str, value: Any):
+            if key != "workflow" or prepared is None:
+                return
+            with lock:
+                if not closed:
+                    self._prepare(value, prepared)
+
+        try:
+            if "structured" in getattr(self.model, "prompt_types", ()):
+                choice = self.model.generate(text, prompt_type="structured", schema=WorkflowChoice,
+                                             check=self._check_choice, on_member=on_member)
+            else:
+                # Models without structured output: parse the text answer locally, without re-asking
+                raw_response = self.model.generate(text)
+                try:
+                    value, _ = extract_json(raw_response)
+                    choice = self._check_choice(validate(value, WorkflowChoice))
+                except ValueError as e:
+                    structured_stats.record("WorkflowChoice", "failed")
+                    raise StructuredOutputError(str(e)) from e
+        except StructuredOutputError as e:
+            print(f"[BaseManager] No valid workflow choice from the model: {e}")
+            return None, {}, "Error: Unable to process the response."
+        finally:
+            with lock:
+                closed = True
+
+        print(f"[BaseManager] {self.name} chose '{choice.workflow}' with {choice.params}")
+        return choice.workflow, choice.params, None
+
+    def _execute(self, workflow_name: str, params: dict,
+                 prepared: Optional[Dict[str, Any]] = None) -> Tuple[Any, bool]:
+        """
+        Executes a workflow from managers_config, reusing the instance warmed up
+        by _plan() when there is one.
+        Returns (result or error message, success).
+        """
+        workflow_info = self._workflow_info(workflow_name)
 
+        if not workflow_info:
+            return f"No workflow named '{workflow_name}' found for {self.name}.", False
+
+        workflow_instance = (prepared or {}).get(workflow_name)
+        if workflow_instance is None:
             workflow_class = workflow_info["trigger"]
             workflow_instance = workflow_class()
 
-            # Map params to workflow, include defaults for missing optional parameters
-            params_to_pass = {}
-            for param_name, param_type in workflow_info.get("params", {}).items():
-                params_to_pass[param_name] = params.get(param_name, "")
-
-            try:
-                result = workflow_instance.execute(**params_to_pass)
-                return result
-            except Exception as e:
-                print(f"Error executing workflow '{workflow_name}': {e}")
-                return f"Failed to execute the workflow: {str(e)}"
-        else:
+        # Map params to workflow, include defaults for missing optional parameters
+        params_to_pass = {}
+        for param_name, param_type in workflow_info.get("params", {}).items():
+            params_to_pass[param_name] = params.get(param_name, "")
+
+        try:
+            return workflow_instance.execute(**params_to_pass), True
+        except Exception as e:
+            print(f"Error executing workflow '{workflow_name}': {e}")
+            return f"Failed to execute the workflow: {str(e)}", False
+
+    def run(self, text: str, prompt_type: str = 'json', run_key: Optional[str] = None,
+            message_key: str = "", channel_id: Optional[int] = None):
+        """
+        Processes the response and passes parameters to the workflow.
+
+        When a journal is configured and a run_key is given, finished runs are served
+        from the journal and a run still in progress in this process (a duplicate
+        delivery) is not started again. Runs left unfinished by an earlier process
+        resume without asking the model again when their workflow was already chosen;
+        those interrupted after their workflow started are failed instead of
+        executed a second time.
+
+        The model's answer is streamed: once the workflow name is complete, that
+        workflow warms up (credentials, clients) while the params are generated.
+        """
+        if self.model is None or not hasattr(self.model, "generate"):
             return "No model is defined."
 
+        record = None
+        if self.journal is not None and run_key:
+            record = self.journal.begin(run_key, manager=self.name, task=text,
+                                        message_key=message_key, channel_id=channel_id)
+            if record.finished:
+                print(f"[BaseManager] Run {run_key} already {record.status}; serving journaled output")
+                return record.output
+            if record.claim == IN_PROGRESS:
+                print(f"[BaseManager] Run {run_key} is already in progress; not starting it again")
+                return "This request is already in progress."
+
+        resumed = record is not None and record.claim == TAKEN_OVER
+        if resumed and record.status == DISPATCHED:
+            # Interrupted mid-execution: the workflow may already have taken effect
+            error = (f"The '{record.workflow}' workflow was interrupted while running and was not repeated, "
+                     f"since it may already have taken effect. Please check and ask again if needed.")
+            print(f"[BaseManager] Run {run_key} was interrupted during execution; not executing it again")
+            self.journal.fail(record, error)
+            return error
+
+        prepared: Dict[str, Any] = {}
+        if resumed and record.workflow is not None:
+            print(f"[BaseManager] Resuming run {run_key} with workflow '{record.workflow}'")
+            workflow_name, params = record.workflow, record.params or {}
+        else:
+            workflow_name, params, error = self._plan(text, prepared)
+            if error is not None:
+                if record is not None:
+                    self.journal.fail(record, error)
+                return error
+            if record is not None:
+                self.journal.plan(record, workflow_name, params)
 
+        if record is not None:
+            self.journal.dispatch(record)
+        result, succeeded = self._execute(workflow_name, params, prepared)
+        if record is not None:
+            if succeeded:
+                self.journal.complete(record, result)
+            else:
+                self.journal.fail(record, result)
+        return result
@@ -1,6 +1,6 @@
 # agents/managers/manager_config.py
 
-from workflows.my_workflows.add_to_calendar import AddToCalendarWorkflow
+from workflows.my_workflows.add_to_calendar import AddToCalendarDagWorkflow
 
 def placeholder():
     pass
@@ -12,7 +12,7 @@ managers_config = {
         "workflows": [
             {
                 "name": "add to calendar",
-                "trigger": AddToCalendarWorkflow,  # reference the workflow class
+                "trigger": AddToCalendarDagWorkflow,  # reference the workflow class
                 "description": "Adds an event to the calendar.",
                 "params": {
                     "summary": "string",
@@ -0,0 +1,440 @@
+"""
+Memory Module
+
+Conversation memory for BaseAgent (memory.retrieve / memory.store) and the
+Discord bot: exchanges are stored per scope (a channel or user) in SQLite and
+found again with BM25 keyword search, optionally fused with vector search.
+
+Classes:
+    MemoryEntry: A stored exchange, as returned by search().
+    BM25Index: Incremental inverted index over one scope.
+    VectorIndex: Compact float16 embedding matrix over one scope (needs numpy).
+    ConversationMemory: SQLite store plus an LRU of resident per-scope indexes.
+    ScopedMemory: View of a ConversationMemory bound to one scope, with the
+                  retrieve/store interface BaseAgent expects (and latest/search
+                  for agents/context_builder.py).
+
+Configuration (environment):
+    MEMORY_PATH=data/memory.db        SQLite database
+    MEMORY_MAX_RESIDENT=4000000       Index entries (documents + postings) kept in RAM,
+                                      roughly 180k short exchanges or 40 MB
+
+Example Usage:
+    memory = ConversationMemory()
+    agent = BaseAgent(model=model, memory=memory.scoped("discord:1234"))
+    agent.run("When is the budget review?")   # earlier exchanges are added as context
+
+    # Hybrid retrieval with any embedding function returning a list of floats
+    memory = ConversationMemory(embed=my_embedding_function)
+
+Note:
+    Only the indexes are resident; texts stay in SQLite and are read for the
+    top-k results. A scope's index is built from SQLite the first time it is
+    searched and updated in place on every store. When the resident indexes
+    exceed MEMORY_MAX_RESIDENT, the least recently used scopes are dropped and
+    rebuilt on their next use.
+"""
+
+import heapq
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+DEFAULT_SCOPE = "default"
+
+_TOKEN = re.compile(r"\w+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do for from has have i if in is it its me my of on or our so "
+    "that the their then there these this to was we were what when which who will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if len(token) > 1 and token not in STOPWORDS]
+
+
+def _numpy():
+    # Imported here: numpy is only needed when an embedding function is configured
+    import numpy
+    return numpy
+
+
+class MemoryEntry(NamedTuple):
+    id: int
+    scope: str
+    prompt: str
+    response: str
+    created_at: float
+    score: float
+
+
+class BM25Index:
+    """
+    Args:
+        k1 (float): Term frequency saturation
+        b (float): Document length normalization
+        max_df (float): Terms occurring in more than this share of the documents are
+                        skipped when the query has rarer terms (they barely change
+                        the ranking but have the longest posting lists)
+        max_postings (int): When a query only has such common terms, only their newest
+                            max_postings occurrences are scored
+    """
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_df: float = 0.05, max_postings: int = 5000):
+        self.k1 = k1
+        self.b = b
+        self.max_df = max_df
+        self.max_postings = max_postings
+        self.ids = array("q")       # row id per document
+        self.lengths = array("I")   # terms per document
+        self.total_length = 0
+        self.postings: Dict[str, Tuple[array, array]] = {}  # term -> (documents, term frequencies)
+        self.posting_count = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def footprint(self) -> int:
+        return len(self.ids) + self.posting_count
+
+    def add(self, row_id: int, text: str):
+        self.add_many([(row_id, text)])
+
+    def add_many(self, documents: Iterable[Tuple[int, str]]):
+        """Appends (row id, text) documents; row ids must be increasing."""
+        ids, lengths, postings = self.ids, self.lengths, self.postings
+        for row_id, text in documents:
+            terms = Counter(tokenize(text))
+            document = len(ids)
+            length = sum(terms.values())
+            ids.append(row_id)
+            lengths.append(length)
+            self.total_length += length
+            for term, frequency in terms.items():
+                entry = postings.get(term)
+                if entry is None:
+                    entry = postings[term] = (array("I"), array("H"))
+                entry[0].append(document)
+                entry[1].append(frequency if frequency < 0xFFFF else 0xFFFF)
+            self.posting_count += len(terms)
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """(row id, score) of the k best documents; ties go to newer documents."""
+        count = len(self.ids)
+        if not count:
+            return []
+        found = [(term, self.postings[term]) for term in set(tokenize(query)) if term in self.postings]
+        rare = [(term, entry) for term, entry in found if len(entry[0]) <= self.max_df * count]
+        k1, lengths = self.k1, self.lengths
+        base = k1 * (1 - self.b)
+        scale = k1 * self.b / (self.total_length / count or 1)
+        limit = None if rare else self.max_postings
+        scores: Dict[int, float] = {}
+        for _, (documents, frequencies) in rare or found:
+            frequency_count = len(documents)
+            idf = math.log(1 + (count - frequency_count + 0.5) / (frequency_count + 0.5))
+            if limit is not None and frequency_count > limit:
+                documents, frequencies = documents[-limit:], frequencies[-limit:]
+            for document, frequency in zip(documents, frequencies):
+                scores[document] = scores.get(document, 0.0) + (
+                    idf * frequency * (k1 + 1) / (frequency + base + scale * lengths[document])
+                )
+        best = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], item[0]))
+        return [(self.ids[document], score) for document, score in best]
+
+
+class VectorIndex:
+    """Unit-length embeddings as rows of a float16 matrix that grows by doubling."""
+    def __init__(self, dimensions: int, chunk_rows: int = 16384):
+        np = _numpy()
+        self.dimensions = dimensions
+        self.chunk_rows = chunk_rows
+        self.ids = array("q")
+        self.matrix = np.zeros((64, dimensions), dtype=np.float16)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def footprint(self) -> int:
+        # Counted in the same unit as BM25 postings: a row costs about as much as its dimensions / 8 postings
+        return len(self.ids) * max(1, self.dimensions // 8)
+
+    @staticmethod
+    def encode(vector: Sequence[float]) -> bytes:
+        np = _numpy()
+        values = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(values))
+        return (values / norm if norm else values).astype(np.float16).tobytes()
+
+    def add(self, row_id: int, encoded: bytes):
+        np = _numpy()
+        row = np.frombuffer(encoded, dtype=np.float16)
+        if row.shape[0] != self.dimensions:
+            return  # embedding model changed; keep the old rows searchable
+        if len(self.ids) == self.matrix.shape[0]:
+            grown = np.zeros((self.matrix.shape[0] * 2, self.dimensions), dtype=np.float16)
+            grown[:len(self.ids)] = self.matrix
+            self.matrix = grown
+        self.matrix[len(self.ids)] = row
+        self.ids.append(row_id)
+
+    def search(self, encoded: bytes, k: int) -> List[Tuple[int, float]]:
+        np = _numpy()
+        count = len(self.ids)
+        query = np.frombuffer(encoded, dtype=np.float16).astype(np.float32)
+        if not count or query.shape[0] != self.dimensions:
+            return []
+        # Converted chunk by chunk, so a search never holds a float32 copy of the whole matrix
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, self.chunk_rows):
+            end = min(count, start + self.chunk_rows)
+            scores[start:end] = self.matrix[start:end].astype(np.float32) @ query
+        k = min(k, count)
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(self.ids[int(row)], float(scores[row])) for row in best]
+
+
+class _Shard:
+    """Resident indexes of one scope."""
+    def __init__(self):
+        self.bm25 = BM25Index()
+        self.vectors: Optional[VectorIndex] = None
+
+    @property
+    def footprint(self) -> int:
+        return self.bm25.footprint + (self.vectors.footprint if self.vectors is not None else 0)
+
+    def add(self, row_id: int, text: str, encoded: Optional[bytes]):
+        self.bm25.add(row_id, text)
+        if encoded is not None:
+            self.add_vector(row_id, encoded)
+
+    def add_vector(self, row_id: int, encoded: bytes):
+        if self.vectors is None:
+            self.vectors = VectorIndex(len(encoded) // 2)
+        self.vectors.add(row_id, encoded)
+
+
+class ConversationMemory:
+    """
+    Args:
+        path (str): SQLite database file (default: MEMORY_PATH or data/memory.db)
+        k (int): Relevant exchanges retrieve() adds as context
+        recent (int): Latest exchanges retrieve() always adds, for conversational continuity
+        max_resident (int): Index entries kept in RAM over all scopes (default: MEMORY_MAX_RESIDENT)
+        embed (callable): Optional text -> vector function; enables hybrid BM25 + vector search
+        max_characters (int): Characters of each prompt/response shown in the context
+    """
+    def __init__(self, path: Optional[str] = None, k: int = 4, recent: int = 2,
+                 max_resident: Optional[int] = None, embed: Optional[Callable[[str], Sequence[float]]] = None,
+                 max_characters: int = 600):
+        self.path = path or os.getenv("MEMORY_PATH", "data/memory.db")
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.k = k
+        self.recent = recent
+        self.max_resident = max_resident or int(os.getenv("MEMORY_MAX_RESIDENT", "4000000"))
+        self.embed = embed
+        self.max_characters = max_characters
+        self.loads = 0
+        self.evictions = 0
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                scope TEXT NOT NULL,
+                prompt TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                vector BLOB
+            );
+            CREATE INDEX IF NOT EXISTS entries_scope ON entries (scope, id);
+            """
+        )
+        self._shards: "OrderedDict[str, _Shard]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def scoped(self, scope: str) -> "ScopedMemory":
+        return ScopedMemory(self, scope)
+
+    # ---- Resident indexes ----------------------------------------------
+
+    def _embed(self, text: str) -> Optional[bytes]:
+        if self.embed is None:
+            return None
+        try:
+            return VectorIndex.encode(self.embed(text))
+        except Exception as e:
+            print(f"[ConversationMemory] Embedding failed, using keyword search only: {e}")
+            return None
+
+    def _shard(self, scope: str) -> _Shard:
+        """The scope's indexes, built from SQLite if not resident. Caller holds the lock."""
+        shard = self._shards.get(scope)
+        if shard is not None:
+            self._shards.move_to_end(scope)
+            return shard
+        started = time.perf_counter()
+        shard = _Shard()
+        cursor = self._conn.execute(
+            "SELECT id, prompt || char(10) || response, vector FROM entries WHERE scope = ? ORDER BY id", (scope,)
+        )
+        for rows in iter(lambda: cursor.fetchmany(4096), []):
+            shard.bm25.add_many((row_id, text) for row_id, text, _ in rows)
+            if self.embed is not None:
+                for row_id, _, vector in rows:
+                    if vector is not None:
+                        shard.add_vector(row_id, vector)
+        self._shards[scope] = shard
+        self.loads += 1
+        if len(shard.bm25) > 10000:
+            print(f"[ConversationMemory] Loaded {len(shard.bm25)} entries of '{scope}' "
+                  f"in {time.perf_counter() - started:.2f}s")
+        self._evict()
+        return shard
+
+    def _evict(self):
+        """Drops the least recently used scopes until the resident indexes fit (the newest always stays)."""
+        total = sum(shard.footprint for shard in self._shards.values())
+        while total > self.max_resident and len(self._shards) > 1:
+            _, shard = self._shards.popitem(last=False)
+            total -= shard.footprint
+            self.evictions += 1
+
+    # ---- Store and search ----------------------------------------------
+
+    def store(self, prompt: str, response: str, scope: str = DEFAULT_SCOPE) -> int:
+        """Adds an exchange; returns its row id."""
+        text = f"{prompt}\n{response}"
+        encoded = self._embed(text)
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "INSERT INTO entries (scope, prompt, response, created_at, vector) VALUES (?, ?, ?, ?, ?)",
+                    (scope, prompt, response, time.time(), encoded),
+                )
+            row_id = cursor.lastrowid
+            shard = self._shards.get(scope)
+            if shard is not None:
+                # Not resident: the row is picked up when the scope is loaded
+                shard.add(row_id, text, encoded)
+                self._evict()
+        return row_id
+
+    def _rows(self, row_ids: List[int]) -> Dict[int, tuple]:
+        if not row_ids:
+            return {}
+        rows = self._conn.execute(
+            f"SELECT id, scope, prompt, response, created_at FROM entries "
+            f"WHERE id IN ({', '.join('?' for _ in row_ids)})", row_ids
+        ).fetchall()
+        return {row[0]: row for row in rows}
+
+    def search(self, query: str, scope: str = DEFAULT_SCOPE, k: Optional[int] = None,
+               exclude: Sequence[int] = ()) -> List[MemoryEntry]:
+        """The k exchanges of the scope most relevant to the query, best first."""
+        k = k or self.k
+        encoded = self._embed(query)
+        with self._lock:
+            shard = self._shard(scope)
+            wanted = k + len(exclude)
+            keyword_hits = shard.bm25.search(query, wanted * 4 if encoded else wanted)
+            if encoded is not None and shard.vectors is not None:
+                # Reciprocal rank fusion of both rankings
+                fused: Dict[int, float] = {}
+                for ranking in (keyword_hits, shard.vectors.search(encoded, wanted * 4)):
+                    for rank, (row_id, _) in enumerate(ranking):
+                        fused[row_id] = fused.get(row_id, 0.0) + 1.0 / (60 + rank)
+                hits = sorted(fused.items(), key=lambda item: (-item[1], -item[0]))
+            else:
+                hits = keyword_hits
+            hits = [(row_id, score) for row_id, score in hits if row_id not in exclude][:k]
+            rows = self._rows([row_id for row_id, _ in hits])
+        return [MemoryEntry(*rows[row_id], score) for row_id, score in hits if row_id in rows]
+
+    def latest(self, scope: str = DEFAULT_SCOPE, count: Optional[int] = None) -> List[MemoryEntry]:
+        """The scope's most recent exchanges, oldest first."""
+        count = self.recent if count is None else count
+        if count <= 0:
+            return []
+        with self._lock:
+            shard = self._shard(scope)
+            row_ids = list(shard.bm25.ids[-count:])
+            rows = self._rows(row_ids)
+        return [MemoryEntry(*rows[row_id], 0.0) for row_id in row_ids if row_id in rows]
+
+    def _clip(self, text: str) -> str:
+        text = " ".join(text.split())
+        return text if len(text) <= self.max_characters else text[:self.max_characters - 3] + "..."
+
+    def retrieve(self, prompt: str, scope: str = DEFAULT_SCOPE, k: Optional[int] = None) -> str:
+        """
+        Context for a new prompt: the latest exchanges plus the most relevant
+        older ones, in chronological order. Empty when the scope has no history.
+        """
+        latest = self.latest(scope)
+        relevant = self.search(prompt, scope, k, exclude=[entry.id for entry in latest])
+        entries = sorted(relevant + latest, key=lambda entry: entry.id)
+        if not entries:
+            return ""
+        lines = ["Earlier conversation:"]
+        for entry in entries:
+            lines.append(f"User: {self._clip(entry.prompt)}")
+            lines.append(f"Assistant: {self._clip(entry.response)}")
+        return "\n".join(lines)
+
+    def forget(self, scope: str):
+        """Deletes all exchanges of a scope."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM entries WHERE scope = ?", (scope,))
+            self._shards.pop(scope, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "resident_scopes": len(self._shards),
+                "resident_entries": sum(len(shard.bm25) for shard in self._shards.values()),
+                "footprint": sum(shard.footprint for shard in self._shards.values()),
+                "max_resident": self.max_resident,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+    def close(self):
+        with self._lock:
+            self._shards.clear()
+            self._conn.close()
+
+
+class ScopedMemory:
+    """retrieve/store/search/latest of a ConversationMemory, bound to one scope."""
+    def __init__(self, memory: ConversationMemory, scope: str):
+        self.memory = memory
+        self.scope = scope
+
+    def retrieve(self, prompt: str, k: Optional[int] = None) -> str:
+        return self.memory.retrieve(prompt, self.scope, k)
+
+    def store(self, prompt: str, response: str) -> int:
+        return self.memory.store(prompt, response, self.scope)
+
+    def search(self, query: str, k: Optional[int] = None, exclude: Sequence[int] = ()) -> List[MemoryEntry]:
+        return self.memory.search(query, self.scope, k, exclude)
+
+    def latest(self, count: Optional[int] = None) -> List[MemoryEntry]:
+        return self.memory.latest(self.scope, count)
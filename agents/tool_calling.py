@@ -0,0 +1,208 @@
+"""
+Tool Calling Module
+
+Building blocks for BaseAgent.run_with_tools, where the model requests tool
+calls (OpenAI/DeepSeek function calling) and the agent executes them.
+
+Classes:
+    FunctionTool: Wraps a plain function as a tool, deriving the parameter schema
+                  from its signature.
+    ToolResultCache: TTL + LRU cache of tool results keyed by tool name and arguments.
+    ToolCallExecutor: Runs one turn's tool calls concurrently on a thread pool, with
+                      per-tool timeouts, caching and deduplication of identical calls.
+
+Tool attributes (any object can be a tool):
+    NAME          Function name shown to the model (required for tool calling)
+    DESCRIPTION   What the tool does
+    PARAMETERS    JSON schema of the arguments (default: a single "prompt" string,
+                  so tools written for BaseAgent.run(prompt) still work)
+    TIMEOUT       Seconds before the call is abandoned (default: executor timeout)
+    CACHE_TTL     Seconds a result may be reused for identical arguments; only set
+                  this for deterministic tools (default: not cached)
+    run(**arguments) -> Any
+
+Example Usage:
+    def convert_currency(amount: float, currency: str) -> str: ...
+
+    agent.add_tool(FunctionTool(convert_currency, description="Convert EUR amounts", cache_ttl=3600))
+    answer = agent.run_with_tools("What is 120 EUR in USD and in GBP?")
+"""
+
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from modules.telemetry.tracing import tracer
+
+DEFAULT_PARAMETERS = {
+    "type": "object",
+    "properties": {"prompt": {"type": "string", "description": "The request for the tool"}},
+    "required": ["prompt"],
+}
+
+JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean", list: "array", dict: "object"}
+
+
+class FunctionTool:
+    """
+    Args:
+        fn (callable): The function; its keyword arguments are the tool arguments
+        name (str): Tool name (default: the function name)
+        description (str): Tool description (default: the first docstring line)
+        parameters (dict): JSON schema (default: derived from the signature annotations)
+        timeout (float): Per-call timeout in seconds
+        cache_ttl (float): Seconds results are reused for identical arguments
+    """
+    def __init__(self, fn: Callable, name: Optional[str] = None, description: Optional[str] = None,
+                 parameters: Optional[dict] = None, timeout: Optional[float] = None,
+                 cache_ttl: Optional[float] = None):
+        self.fn = fn
+        self.NAME = name or fn.__name__
+        self.DESCRIPTION = description or (inspect.getdoc(fn) or "").split("\n")[0]
+        self.PARAMETERS = parameters or self._schema_from_signature(fn)
+        self.TIMEOUT = timeout
+        self.CACHE_TTL = cache_ttl
+
+    @staticmethod
+    def _schema_from_signature(fn: Callable) -> dict:
+        properties, required = {}, []
+        for name, parameter in inspect.signature(fn).parameters.items():
+            if parameter.kind in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD):
+                continue
+            properties[name] = {"type": JSON_TYPES.get(parameter.annotation, "string")}
+            if parameter.default is parameter.empty:
+                required.append(name)
+        return {"type": "object", "properties": properties, "required": required}
+
+    def run(self, **arguments) -> Any:
+        return self.fn(**arguments)
+
+
+def tool_spec(tool: Any) -> dict:
+    """The function-calling schema of a tool."""
+    return {
+        "type": "function",
+        "function": {
+            "name": tool.NAME,
+            "description": getattr(tool, "DESCRIPTION", "") or "",
+            "parameters": getattr(tool, "PARAMETERS", None) or DEFAULT_PARAMETERS,
+        },
+    }
+
+
+def _arguments_key(name: str, arguments: dict) -> str:
+    return name + ":" + json.dumps(arguments, sort_keys=True, default=str)
+
+
+class ToolResultCache:
+    """
+    Args:
+        max_entries (int): Entries kept; the least recently used are evicted first
+    """
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()  # key -> (expires, result)
+        self._lock = threading.Lock()
+
+    def get(self, name: str, arguments: dict) -> Optional[str]:
+        key = _arguments_key(name, arguments)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, name: str, arguments: dict, result: str, ttl: float):
+        key = _arguments_key(name, arguments)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class ToolCallExecutor:
+    """
+    Args:
+        max_workers (int): Tool calls running at the same time
+        default_timeout (float): Timeout for tools without TIMEOUT
+        cache (ToolResultCache): Result cache (default: a new one)
+    """
+    def __init__(self, max_workers: int = 8, default_timeout: float = 30.0,
+                 cache: Optional[ToolResultCache] = None):
+        self.default_timeout = default_timeout
+        self.cache = cache or ToolResultCache()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-tool")
+
+    @staticmethod
+    def _format(result: Any) -> str:
+        if isinstance(result, str):
+            return result
+        return json.dumps(result, default=str)
+
+    def _invoke(self, tool: Any, name: str, arguments: dict) -> str:
+        with tracer.span("tool.call", tool=name) as span:
+            started = time.perf_counter()
+            result = self._format(tool.run(**arguments))
+            span.set(characters=len(result))
+        ttl = getattr(tool, "CACHE_TTL", None)
+        if ttl:
+            self.cache.put(name, arguments, result, ttl)
+        print(f"[ToolCallExecutor] {name} finished in {time.perf_counter() - started:.2f}s")
+        return result
+
+    def execute(self, calls: List[Tuple[str, str, str]], tools: Dict[str, Any]) -> List[str]:
+        """
+        Runs (call id, tool name, JSON arguments) calls concurrently and returns
+        one result string per call, in order. Failures, timeouts and unknown tools
+        become error strings, so the model can react to them.
+        """
+        results: List[Optional[str]] = [None] * len(calls)
+        running: Dict[str, Tuple[Any, float, List[int]]] = {}  # key -> (future, deadline, call indexes)
+        for index, (_, name, raw_arguments) in enumerate(calls):
+            tool = tools.get(name)
+            if tool is None:
+                results[index] = f"Error: unknown tool '{name}'"
+                continue
+            try:
+                arguments = json.loads(raw_arguments or "{}")
+            except json.JSONDecodeError as e:
+                results[index] = f"Error: invalid JSON arguments for {name}: {e}"
+                continue
+            if getattr(tool, "CACHE_TTL", None):
+                cached = self.cache.get(name, arguments)
+                if cached is not None:
+                    results[index] = cached
+                    continue
+            key = _arguments_key(name, arguments)
+            if key in running:
+                # Identical call in the same turn: run it once
+                running[key][2].append(index)
+                continue
+            timeout = getattr(tool, "TIMEOUT", None) or self.default_timeout
+            future = self._pool.submit(self._invoke, tool, name, arguments)
+            running[key] = (future, time.monotonic() + timeout, [index])
+
+        for key, (future, deadline, indexes) in running.items():
+            name = calls[indexes[0]][1]
+            try:
+                result = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except TimeoutError:
+                future.cancel()
+                result = f"Error: {name} timed out"
+            except Exception as e:
+                result = f"Error: {name} failed: {e}"
+            for index in indexes:
+                results[index] = result
+        return results
@@ -0,0 +1,200 @@
+"""
+Tool Matcher Module
+
+Finds every tool whose trigger keyword occurs in a prompt, in one pass over the
+prompt, using an Aho-Corasick automaton over all keywords.
+
+Classes:
+    ToolMatch: A tool found in a prompt, with the keywords that triggered it.
+    ToolMatcher: The automaton. Tools can be added at any time; the trie grows on
+                 add() and the failure links are rebuilt lazily before the next match.
+
+Example Usage:
+    matcher = ToolMatcher(ignore_case=True, whole_words=True)
+    matcher.add(calendar_tool)            # TRIGGER_KEYWORD = "calendar"
+    matcher.add(search_tool)              # TRIGGER_KEYWORD = ("search", "look up")
+    for match in matcher.match("Look up the calendar for Friday"):
+        print(match.tool, match.keywords)
+
+Note:
+    A tool's keywords come from TRIGGER_KEYWORD, which may be a string or a
+    sequence of strings. Matching cost is O(len(prompt) + matches), independent
+    of the number of tools.
+"""
+
+from collections import deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+class ToolMatch(NamedTuple):
+    tool: Any
+    keywords: Tuple[str, ...]  # distinct keywords found, in order of first occurrence
+    count: int                 # total keyword occurrences
+    position: int              # start of the first occurrence
+    longest: int               # length of the longest keyword found
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def tool_keywords(tool: Any) -> List[str]:
+    keywords = getattr(tool, "TRIGGER_KEYWORD", None)
+    if keywords is None:
+        return []
+    if isinstance(keywords, str):
+        keywords = [keywords]
+    return [keyword for keyword in keywords if keyword]
+
+
+class ToolMatcher:
+    """
+    Args:
+        tools (list): Tools to register up front
+        ignore_case (bool): Match keywords case-insensitively
+        whole_words (bool): Only match keywords at word boundaries (like regex \\b)
+        linear_threshold (int): Up to this many keywords, scan with str.find per keyword
+                                instead of the automaton (C-level scans win for small sets)
+
+    The defaults reproduce the original `TRIGGER_KEYWORD in prompt` check.
+    """
+    def __init__(self, tools: Optional[Iterable[Any]] = None, ignore_case: bool = False, whole_words: bool = False,
+                 linear_threshold: int = 64):
+        self.ignore_case = ignore_case
+        self.whole_words = whole_words
+        self.linear_threshold = linear_threshold
+        self.tools: List[Any] = []
+        # Trie: per node the child transitions, the failure link and the patterns ending there
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._own: List[List[int]] = [[]]
+        self._out: List[Tuple[int, ...]] = [()]
+        self._patterns: List[Tuple[str, int, str]] = []  # (keyword as given, tool index, normalized keyword)
+        self._lengths: List[int] = []
+        self._delta: List[Dict[str, int]] = [{}]
+        self._dirty = False
+        for tool in tools or []:
+            self.add(tool)
+
+    def __len__(self) -> int:
+        return len(self.tools)
+
+    def _normalize(self, text: str) -> str:
+        return text.lower() if self.ignore_case else text
+
+    def add(self, tool: Any):
+        """Registers a tool; only the trie paths for its keywords are added."""
+        tool_index = len(self.tools)
+        self.tools.append(tool)
+        for keyword in tool_keywords(tool):
+            normalized = self._normalize(keyword)
+            node = 0
+            for char in normalized:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._own.append([])
+                    self._out.append(())
+                node = next_node
+            self._own[node].append(len(self._patterns))
+            self._patterns.append((keyword, tool_index, normalized))
+            self._lengths.append(len(normalized))
+            self._dirty = True
+
+    def _build(self):
+        """Breadth-first pass computing failure links and merged outputs."""
+        goto, fail, own, out = self._goto, self._fail, self._own, self._out
+        out[0] = tuple(own[0])
+        queue = deque()
+        for child in goto[0].values():
+            fail[child] = 0
+            out[child] = tuple(own[child])
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                fallback = goto[state].get(char, 0)
+                fail[child] = fallback if fallback != child else 0
+                out[child] = tuple(own[child]) + out[fail[child]]
+                queue.append(child)
+        # Transitions including the failure-link walks, filled in as characters are seen
+        self._delta = [dict(transitions) for transitions in goto]
+        self._dirty = False
+
+    def _occurrences(self, text: str) -> List[Tuple[int, int]]:
+        """(pattern id, start) for every keyword occurrence in the normalized text."""
+        if len(self._patterns) <= self.linear_threshold:
+            return self._occurrences_linear(text)
+        if self._dirty:
+            self._build()
+        goto, fail, out, delta = self._goto, self._fail, self._out, self._delta
+        lengths = self._lengths
+        found = []
+        state = 0
+        for index, char in enumerate(text):
+            next_state = delta[state].get(char)
+            if next_state is None:
+                fallback = state
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                next_state = delta[state][char] = goto[fallback].get(char, 0)
+            state = next_state
+            if out[state]:
+                for pattern_id in out[state]:
+                    found.append((pattern_id, index + 1 - lengths[pattern_id]))
+        return found
+
+    def _occurrences_linear(self, text: str) -> List[Tuple[int, int]]:
+        """Same result via str.find per keyword; faster than the automaton for few keywords."""
+        found = []
+        for pattern_id, (_, _, keyword) in enumerate(self._patterns):
+            start = text.find(keyword)
+            while start != -1:
+                found.append((pattern_id, start))
+                start = text.find(keyword, start + 1)
+        return found
+
+    def _at_word_boundaries(self, text: str, keyword: str, start: int) -> bool:
+        end = start + len(keyword)
+        if _is_word_char(keyword[0]) and start > 0 and _is_word_char(text[start - 1]):
+            return False
+        if _is_word_char(keyword[-1]) and end < len(text) and _is_word_char(text[end]):
+            return False
+        return True
+
+    def match(self, text: str) -> List[ToolMatch]:
+        """
+        All tools triggered by `text`, best first: longest keyword, then most
+        occurrences, then earliest occurrence, then registration order.
+        """
+        haystack = self._normalize(text)
+        patterns = self._patterns
+        found: Dict[int, list] = {}  # tool index -> [keywords, count, position, longest]
+        for pattern_id, start in self._occurrences(haystack):
+            keyword, tool_index, normalized = patterns[pattern_id]
+            if self.whole_words and not self._at_word_boundaries(haystack, normalized, start):
+                continue
+            entry = found.get(tool_index)
+            if entry is None:
+                found[tool_index] = [[keyword], 1, start, len(keyword)]
+                continue
+            if keyword not in entry[0]:
+                entry[0].append(keyword)
+            entry[1] += 1
+            entry[2] = min(entry[2], start)
+            entry[3] = max(entry[3], len(keyword))
+        ranked = sorted(found.items(), key=lambda item: (-item[1][3], -item[1][1], item[1][2], item[0]))
+        return [
+            ToolMatch(self.tools[tool_index], tuple(keywords), count, position, longest)
+            for tool_index, (keywords, count, position, longest) in ranked
+        ]
+
+    def best(self, text: str) -> Optional[Any]:
+        matches = self.match(text)
+        return matches[0].tool if matches else None
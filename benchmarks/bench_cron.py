@@ -0,0 +1,98 @@
+# benchmarks/bench_cron.py
+"""
+Measures cron compile and next-fire cost for thousands of random expressions.
+
+Compares CronExpression.next_after (bitset field jumps) against a reference
+minute-by-minute scan over a small sample, and checks both agree.
+
+Usage:
+    uv run python -m benchmarks.bench_cron --count 5000
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from modules.triggers.cron import CronExpression
+
+
+def random_field(rng: random.Random, low: int, high: int) -> str:
+    kind = rng.random()
+    if kind < 0.35:
+        return "*"
+    if kind < 0.5:
+        return f"*/{rng.randint(2, max(2, (high - low) // 2))}"
+    if kind < 0.7:
+        return str(rng.randint(low, high))
+    if kind < 0.85:
+        start = rng.randint(low, high)
+        end = rng.randint(start, high)
+        return f"{start}-{end}"
+    values = sorted(rng.sample(range(low, high + 1), rng.randint(2, 4)))
+    return ",".join(str(v) for v in values)
+
+
+def random_expression(rng: random.Random) -> str:
+    return " ".join([
+        random_field(rng, 0, 59),
+        random_field(rng, 0, 23),
+        random_field(rng, 1, 28),
+        random_field(rng, 1, 12),
+        random_field(rng, 0, 6),
+    ])
+
+
+def scan_next(cron: CronExpression, after: datetime) -> datetime:
+    """Reference implementation: test every minute until one matches."""
+    candidate = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    while not cron.matches(candidate):
+        candidate += timedelta(minutes=1)
+    return candidate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=5000, help="Number of expressions")
+    parser.add_argument("--fires", type=int, default=20, help="Consecutive next-fire calls per expression")
+    parser.add_argument("--scan-sample", type=int, default=50, help="Expressions to compare against the minute scan")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    expressions = [random_expression(rng) for _ in range(args.count)]
+    start_time = datetime(2025, 1, 1, 0, 0)
+
+    t0 = time.perf_counter()
+    compiled = [CronExpression(expr) for expr in expressions]
+    compile_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for cron in compiled:
+        when = start_time
+        for _ in range(args.fires):
+            when = cron.next_after(when)
+    next_s = time.perf_counter() - t0
+    calls = args.count * args.fires
+
+    sample = compiled[:args.scan_sample]
+    t0 = time.perf_counter()
+    jump_results = [cron.next_after(start_time) for cron in sample]
+    jump_sample_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    scan_results = [scan_next(cron, start_time) for cron in sample]
+    scan_sample_s = time.perf_counter() - t0
+    mismatches = sum(a != b for a, b in zip(jump_results, scan_results))
+
+    print(f"Expressions:        {args.count}")
+    print(f"Compile:            {compile_s * 1e3:.1f} ms total, {compile_s / args.count * 1e6:.1f} us/expr")
+    print(f"next_after:         {next_s * 1e3:.1f} ms for {calls} calls, {next_s / calls * 1e6:.2f} us/call")
+    print(f"Minute scan sample: {scan_sample_s / len(sample) * 1e6:.1f} us/call "
+          f"vs {jump_sample_s / len(sample) * 1e6:.2f} us/call ({len(sample)} expressions)")
+    print(f"Mismatches:         {mismatches}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
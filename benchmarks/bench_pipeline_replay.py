@@ -0,0 +1,207 @@
+# benchmarks/bench_pipeline_replay.py
+"""
+Deterministic performance regression check for the bot pipeline.
+
+Feeds the anonymized corpus in benchmarks/corpus/messages.jsonl through
+executive_director_bot.handle_message, with every DeepSeek request served from
+a recorded cassette (see modules/ai_modules/models/cassette.py) and workflows
+replaced by no-op stand-ins. Measures the pipeline's own CPU time (best of
+--repeat runs) and the number of LLM calls, and fails (exit code 1) when:
+  - CPU time exceeds the baseline by more than --tolerance,
+  - more LLM calls are made than in the baseline, or
+  - a request has no recording (the prompts changed: re-record).
+
+First run:
+    No cassette or baseline is committed. When the cassette is missing it is
+    recorded against the offline stand-in (benchmarks/openai_standin.py with
+    benchmarks/standin_script.json), and when the baseline is missing the first
+    replay is written as the baseline. Both files land in benchmarks/corpus/;
+    later runs check against them. Delete them (or pass --record --standin and
+    --update-baseline) after changing prompts or the stand-in script.
+
+Usage:
+    # Record the cassette from the live API (or DEEPSEEK_BASE_URL pointing at a server)
+    uv run python -m benchmarks.bench_pipeline_replay --record
+    # Record the cassette from the offline stand-in
+    uv run python -m benchmarks.bench_pipeline_replay --record --standin
+    # Accept the current numbers as the baseline
+    uv run python -m benchmarks.bench_pipeline_replay --update-baseline
+    # Check for regressions (records the cassette and the baseline on first run)
+    uv run python -m benchmarks.bench_pipeline_replay
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+from benchmarks.fake_discord import FakeAuthor, FakeChannel, FakeGuild, FakeMessage
+from benchmarks.load_pipeline import install_standin_workflows
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+STANDIN_SCRIPT = os.path.join(os.path.dirname(__file__), "standin_script.json")
+
+
+def load_corpus(path):
+    with open(path, "r") as f:
+        return [json.loads(line)["content"] for line in f if line.strip()]
+
+
+async def run_corpus(bot_module, corpus):
+    """Handles every corpus message once; returns the errors raised"""
+    guild, author = FakeGuild(), FakeAuthor()
+    errors = []
+    for content in corpus:
+        message = FakeMessage(content, channel=FakeChannel(), guild=guild, author=author)
+        try:
+            await bot_module.handle_message(message)
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+    return errors
+
+
+def run_once(bot_module, corpus, cassette):
+    from agents.memory import ConversationMemory
+    from workflows.run_journal import RunJournal
+
+    # Fresh journal and memory per run, so earlier runs are not served as
+    # duplicates and every run builds the same prompts
+    journal_dir = tempfile.mkdtemp(prefix="bench_replay_")
+    bot_module.run_journal = RunJournal(path=os.path.join(journal_dir, "run_journal.db"))
+    bot_module.conversation_memory = ConversationMemory(path=os.path.join(journal_dir, "memory.db"))
+    calls_before = Counter(cassette.calls)
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            cpu_started, wall_started = time.process_time(), time.perf_counter()
+            errors = asyncio.run(run_corpus(bot_module, corpus))
+            cpu, wall = time.process_time() - cpu_started, time.perf_counter() - wall_started
+    finally:
+        bot_module.run_journal.close()
+        bot_module.conversation_memory.close()
+    calls = Counter(cassette.calls)
+    calls.subtract(calls_before)
+    return cpu, wall, dict(calls), errors
+
+
+def start_standin():
+    """Offline stand-in answering instantly from the script; the DeepSeek client is pointed at it"""
+    from benchmarks.openai_standin import LatencyModel, ResponseBook, StandinServer
+    server = StandinServer(ResponseBook(STANDIN_SCRIPT), LatencyModel.parse("constant:0")).start()
+    # Must be set before the DeepSeek client is first created
+    os.environ["DEEPSEEK_BASE_URL"] = server.url
+    os.environ.setdefault("DEEPSEEK_API_KEY", "standin")
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=os.path.join(CORPUS_DIR, "messages.jsonl"))
+    parser.add_argument("--cassette", default=os.path.join(CORPUS_DIR, "deepseek.jsonl.gz"))
+    parser.add_argument("--baseline", default=os.path.join(CORPUS_DIR, "baseline.json"))
+    parser.add_argument("--repeat", type=int, default=5, help="Runs to take the best CPU time of")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed CPU time increase (0.25 = 25%%)")
+    parser.add_argument("--latency", choices=("zero", "recorded"), default="zero",
+                        help="Replay latency (recorded makes wall time realistic)")
+    parser.add_argument("--record", action="store_true", help="Record a new cassette from the live API")
+    parser.add_argument("--standin", action="store_true", help="With --record: record from the offline stand-in")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the measured numbers as baseline")
+    args = parser.parse_args()
+
+    from modules.ai_modules.models import deepseek
+    from modules.ai_modules.models.cassette import Cassette
+
+    install_standin_workflows(0.0)
+    corpus = load_corpus(args.corpus)
+
+    first_run = not args.record and not os.path.exists(args.cassette)
+    server = start_standin() if first_run or (args.record and args.standin) else None
+    from modules.app_actions.discord import executive_director_bot as bot_module
+
+    if args.record or first_run:
+        if os.path.exists(args.cassette):
+            os.remove(args.cassette)
+        if first_run:
+            print(f"No cassette at {args.cassette}; recording one against the offline stand-in")
+        cassette = Cassette(args.cassette, mode="record")
+        deepseek.use_cassette(cassette)
+        try:
+            runs = [run_once(bot_module, corpus, cassette)]
+        finally:
+            cassette.close()
+            if server is not None:
+                server.stop()
+
+    if not args.record:
+        cassette = Cassette(args.cassette, mode="replay", latency=args.latency)
+        deepseek.use_cassette(cassette)
+        runs = [run_once(bot_module, corpus, cassette) for _ in range(args.repeat)]
+        cassette.close()
+
+    cpu = min(run[0] for run in runs)
+    wall = min(run[1] for run in runs)
+    calls = runs[0][2]
+    errors = [error for run in runs for error in run[3]]
+
+    print(f"Corpus:      {len(corpus)} messages ({args.corpus})")
+    print(f"Cassette:    {args.cassette} ({'recorded' if args.record else f'{len(cassette)} interactions'})")
+    print(f"CPU time:    {cpu * 1e3:.1f} ms (best of {len(runs)}), {cpu / len(corpus) * 1e3:.2f} ms/message")
+    print(f"Wall time:   {wall * 1e3:.1f} ms")
+    print(f"LLM calls:   {sum(calls.values())} {calls}")
+    if any(run[2] != calls for run in runs):
+        print(f"WARNING: call counts differ between runs: {[run[2] for run in runs]}")
+
+    if args.record:
+        print(f"Recorded {len(cassette)} interactions; run with --update-baseline to accept the numbers")
+        return
+
+    failures = []
+    if cassette.misses or errors:
+        failures.append(f"{cassette.misses} cassette misses, {len(errors)} errors (re-record with --record?)")
+        for error in sorted(set(errors))[:5]:
+            print(f"  error: {error}")
+
+    if not args.update_baseline and not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; writing this run as the baseline")
+        args.update_baseline = True
+
+    if args.update_baseline:
+        if failures:
+            raise SystemExit(f"FAIL: {failures[0]}; baseline not written")
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "cpu_seconds": round(cpu, 6),
+                "calls": calls,
+                "messages": len(corpus),
+                "python": platform.python_version(),
+                "updated_at": datetime.now().isoformat(timespec="seconds"),
+            }, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    limit = baseline["cpu_seconds"] * (1 + args.tolerance)
+    print(f"Baseline:    {baseline['cpu_seconds'] * 1e3:.1f} ms CPU, {sum(baseline['calls'].values())} LLM calls")
+    if cpu > limit:
+        failures.append(f"CPU time {cpu * 1e3:.1f} ms exceeds baseline {baseline['cpu_seconds'] * 1e3:.1f} ms "
+                        f"+{args.tolerance:.0%}")
+    for endpoint, count in calls.items():
+        if count > baseline["calls"].get(endpoint, 0):
+            failures.append(f"{endpoint} calls increased from {baseline['calls'].get(endpoint, 0)} to {count}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        raise SystemExit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/bench_tool_matcher.py
+"""
+Compares tool selection cost for 10, 100 and 1000 registered tools.
+
+  linear first   the original loop: first tool with `TRIGGER_KEYWORD in prompt`
+  linear all     the same loop collecting every triggered tool
+  matcher        ToolMatcher (Aho-Corasick), every triggered tool, ranked
+
+Also reports the automaton build time and checks that the matcher finds the
+same tools as the linear scan.
+
+Usage:
+    uv run python -m benchmarks.bench_tool_matcher
+    uv run python -m benchmarks.bench_tool_matcher --tools 10 100 1000 5000 --prompt-words 200
+"""
+
+import argparse
+import random
+import time
+
+from agents.tool_matcher import ToolMatcher
+
+WORDS = (
+    "calendar meeting schedule invoice email report search weather reminder task project budget "
+    "contract travel flight hotel expense summary translate document spreadsheet call note draft "
+    "review deploy ticket customer order payment refund shipping inventory vendor".split()
+)
+
+FILLER = (
+    "please could you the a for on with and to of in next this my our team about before after "
+    "tomorrow friday monday morning afternoon quick check make sure thanks also then it we".split()
+)
+
+
+class KeywordTool:
+    def __init__(self, keyword: str):
+        self.TRIGGER_KEYWORD = keyword
+
+
+def make_tools(count: int, rng: random.Random):
+    tools = []
+    for index in range(count):
+        words = rng.sample(WORDS, rng.randint(1, 2))
+        tools.append(KeywordTool(f"{' '.join(words)} {index}" if index >= len(WORDS) else words[0]))
+    return tools
+
+
+def make_prompts(tools, count: int, words: int, rng: random.Random):
+    prompts = []
+    for _ in range(count):
+        text = [rng.choice(FILLER) for _ in range(words)]
+        for tool in rng.sample(tools, min(3, len(tools))):
+            text.insert(rng.randrange(len(text)), tool.TRIGGER_KEYWORD)
+        prompts.append(" ".join(text))
+    return prompts
+
+
+def linear_first(tools, prompt):
+    for tool in tools:
+        if hasattr(tool, "TRIGGER_KEYWORD") and tool.TRIGGER_KEYWORD in prompt:
+            return tool
+    return None
+
+
+def linear_all(tools, prompt):
+    return [tool for tool in tools if hasattr(tool, "TRIGGER_KEYWORD") and tool.TRIGGER_KEYWORD in prompt]
+
+
+def timed(fn, prompts, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for prompt in prompts:
+            fn(prompt)
+        best = min(best, time.perf_counter() - started)
+    return best / len(prompts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tools", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--prompts", type=int, default=200)
+    parser.add_argument("--prompt-words", type=int, default=80)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'tools':>6} {'build ms':>9} {'linear first us':>16} {'linear all us':>14} {'matcher us':>11} {'speedup':>8}")
+    for count in args.tools:
+        rng = random.Random(args.seed)
+        tools = make_tools(count, rng)
+        prompts = make_prompts(tools, args.prompts, args.prompt_words, rng)
+
+        started = time.perf_counter()
+        matcher = ToolMatcher(tools)
+        matcher.match("")  # builds the failure links
+        build = time.perf_counter() - started
+
+        for prompt in prompts[:20]:
+            expected = {id(tool) for tool in linear_all(tools, prompt)}
+            found = {id(match.tool) for match in matcher.match(prompt)}
+            if expected != found:
+                raise SystemExit(f"Mismatch for {count} tools on prompt: {prompt[:80]}...")
+
+        first = timed(lambda p: linear_first(tools, p), prompts, args.repeat)
+        every = timed(lambda p: linear_all(tools, p), prompts, args.repeat)
+        automaton = timed(matcher.match, prompts, args.repeat)
+        print(f"{count:>6} {build * 1e3:>9.2f} {first * 1e6:>16.1f} {every * 1e6:>14.1f} "
+              f"{automaton * 1e6:>11.1f} {every / automaton:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
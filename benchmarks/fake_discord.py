@@ -0,0 +1,105 @@
+# benchmarks/fake_discord.py
+"""
+Minimal stand-ins for the discord.py objects the bot pipeline touches.
+
+Only the attributes and coroutines used by executive_director_bot are
+implemented. FakeChannel records everything sent to it with timestamps, so a
+harness can measure when replies went out.
+"""
+
+import asyncio
+import itertools
+import os
+import shutil
+import time
+from typing import List, Optional
+
+_ids = itertools.count(10_000)
+
+
+def next_id() -> int:
+    return next(_ids)
+
+
+class FakeGuild:
+    def __init__(self, guild_id: Optional[int] = None, name: str = "Apricot Labs"):
+        self.id = guild_id if guild_id is not None else next_id()
+        self.name = name
+
+
+class FakeAuthor:
+    def __init__(self, name: str = "Max", author_id: Optional[int] = None, bot: bool = False):
+        self.id = author_id if author_id is not None else next_id()
+        self.name = name
+        self.bot = bot
+
+    def __str__(self):
+        return self.name
+
+
+class FakeChannel:
+    """
+    Collects sent messages as (perf_counter timestamp, content) tuples.
+
+    Args:
+        send_latency (float): Seconds each send() takes, to mimic the Discord API
+    """
+    def __init__(self, channel_id: Optional[int] = None, send_latency: float = 0.0):
+        self.id = channel_id if channel_id is not None else next_id()
+        self.send_latency = send_latency
+        self.sent: List[tuple] = []
+
+    async def send(self, content=None, **kwargs):
+        if self.send_latency:
+            await asyncio.sleep(self.send_latency)
+        self.sent.append((time.perf_counter(), content))
+        return FakeMessage(content or "", channel=self)
+
+
+class FakeAttachment:
+    """
+    Attachment backed by a local file (or in-memory bytes).
+
+    Args:
+        filename (str): Name reported to the bot; the extension decides how it is handled
+        source_path (str): Local file copied on save()
+        data (bytes): Contents used when no source_path is given
+        content_type (str): MIME type, as Discord reports it
+    """
+    def __init__(self, filename: str, source_path: Optional[str] = None, data: bytes = b"",
+                 content_type: Optional[str] = None):
+        self.id = next_id()
+        self.filename = filename
+        self.source_path = source_path
+        self.data = data
+        self.content_type = content_type
+        if source_path:
+            self.size = os.path.getsize(source_path)
+        else:
+            self.size = len(data)
+
+    async def read(self) -> bytes:
+        if self.source_path:
+            with open(self.source_path, "rb") as f:
+                return f.read()
+        return self.data
+
+    async def save(self, fp, **kwargs):
+        if self.source_path:
+            shutil.copyfile(self.source_path, fp)
+        else:
+            with open(fp, "wb") as f:
+                f.write(self.data)
+        return self.size
+
+
+class FakeMessage:
+    def __init__(self, content: str, channel: Optional[FakeChannel] = None, guild: Optional[FakeGuild] = None,
+                 author: Optional[FakeAuthor] = None, attachments: Optional[List[FakeAttachment]] = None,
+                 message_id: Optional[int] = None):
+        self.id = message_id if message_id is not None else next_id()
+        self.content = content
+        self.channel = channel or FakeChannel()
+        self.guild = guild or FakeGuild()
+        self.author = author or FakeAuthor()
+        self.attachments = attachments or []
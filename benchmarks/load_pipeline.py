@@ -0,0 +1,206 @@
+# benchmarks/load_pipeline.py
+"""
+End-to-end load test for the Discord bot pipeline, fully offline.
+
+Starts the OpenAI-compatible stand-in (benchmarks/openai_standin.py), points
+the DeepSeek client at it, and feeds fake Discord messages into
+executive_director_bot.handle_message at a fixed arrival rate
+(evaluate_message -> delegate_task -> BaseManager.run -> workflow).
+
+Arrivals are open-loop: message i is due at start + i / rate whether or not
+earlier messages have finished, and end-to-end latency is measured from that
+due time, so queueing inside the bot shows up in the numbers.
+Messages are handled concurrently: the bot awaits model calls and manager runs
+through asyncio.to_thread, so concurrency is bounded by the loop's default
+executor (--threads). Queue wait, from the due time until handle_message
+starts, is reported as its own stage; it grows when the event loop is blocked.
+Per-stage latencies come from the tracer spans (message, deepseek.chat,
+json.parse, manager.dispatch, transcription, ...).
+
+Workflows are replaced by a no-op stand-in (see --workflow-latency) unless
+--real-workflows is given. The run journal is written to a temporary file.
+
+Usage:
+    uv run python -m benchmarks.load_pipeline --rate 2 --duration 30 --latency lognormal:0.4,0.5
+    uv run python -m benchmarks.load_pipeline --base-url http://127.0.0.1:8089 --messages prompts.txt
+    uv run python -m benchmarks.load_pipeline --audio samples/voice.ogg --rate 0.5
+"""
+
+import argparse
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+import tempfile
+import time
+from collections import defaultdict
+
+from benchmarks.fake_discord import FakeAttachment, FakeAuthor, FakeChannel, FakeGuild, FakeMessage
+from benchmarks.load_webhook import percentile
+from benchmarks.openai_standin import LatencyModel, ResponseBook, StandinServer
+
+DEFAULT_PROMPTS = [
+    "Schedule a meeting with the design team next Monday at 10am",
+    "Put the dentist appointment on my calendar for Friday at 3pm",
+    "Block two hours tomorrow morning for the quarterly report",
+    "Add the product launch review on the 14th at 2pm in room B",
+]
+
+
+def install_standin_workflows(latency: float):
+    """Replace every configured workflow with a no-op that sleeps for `latency` seconds"""
+    from agents.managers.manager_config import managers_config
+    from workflows.base_workflow import Workflow
+
+    class StandinWorkflow(Workflow):
+        def execute(self, **params):
+            if latency:
+                time.sleep(latency)
+            return f"Done (stand-in): {params.get('summary') or 'ok'}"
+
+    for manager in managers_config.values():
+        for workflow in manager.get("workflows", []):
+            workflow["trigger"] = StandinWorkflow
+
+
+async def handle_one(bot_module, tracer, message, due):
+    error = None
+    queue_wait = time.perf_counter() - due
+    try:
+        with tracer.trace(message_id=message.id, channel_id=message.channel.id):
+            await bot_module.handle_message(message)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finished = time.perf_counter()
+    first_reply = message.channel.sent[0][0] - due if message.channel.sent else None
+    return finished - due, first_reply, error, queue_wait
+
+
+def build_message(prompt, guild, author, audio, send_latency):
+    attachments = []
+    if audio:
+        attachments.append(FakeAttachment(os.path.basename(audio), source_path=audio, content_type="audio/ogg"))
+    return FakeMessage(prompt, channel=FakeChannel(send_latency=send_latency), guild=guild,
+                       author=author, attachments=attachments)
+
+
+async def run_load(bot_module, tracer, prompts, rate, duration, audio, send_latency):
+    guild, author = FakeGuild(), FakeAuthor()
+    total = max(1, int(rate * duration))
+    tasks = []
+    started = time.perf_counter()
+    for index in range(total):
+        due = started + index / rate
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        message = build_message(prompts[index % len(prompts)], guild, author, audio, send_latency)
+        tasks.append(asyncio.create_task(handle_one(bot_module, tracer, message, due)))
+    results = await asyncio.gather(*tasks)
+    return time.perf_counter() - started, results
+
+
+def format_percentiles(values):
+    ordered = sorted(values)
+    return ", ".join(f"p{p}={percentile(ordered, p) * 1e3:9.1f}" for p in (50, 95, 99))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=2.0, help="Messages per second")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of arrivals")
+    parser.add_argument("--warmup", type=int, default=1, help="Messages handled before measuring")
+    parser.add_argument("--messages", help="Text file with one prompt per line (default: built-in prompts)")
+    parser.add_argument("--audio", help="Audio file attached to every message (exercises transcription)")
+    parser.add_argument("--base-url", help="Use an already running OpenAI-compatible server")
+    parser.add_argument("--latency", default="lognormal:0.4,0.5", help="Stand-in latency spec")
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--script", default=os.path.join(os.path.dirname(__file__), "standin_script.json"))
+    parser.add_argument("--recorded", help="JSONL of recorded responses for the stand-in")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of stand-in requests given a 429")
+    parser.add_argument("--send-latency", type=float, default=0.0, help="Seconds per channel.send()")
+    parser.add_argument("--workflow-latency", type=float, default=0.0, help="Seconds per stand-in workflow")
+    parser.add_argument("--real-workflows", action="store_true", help="Run the configured workflows")
+    parser.add_argument("--threads", type=int, default=32,
+                        help="Default executor size: messages whose model calls and runs proceed at once")
+    parser.add_argument("--trace-jsonl", help="Also append finished spans to this JSONL file")
+    args = parser.parse_args()
+
+    prompts = DEFAULT_PROMPTS
+    if args.messages:
+        with open(args.messages, "r") as f:
+            prompts = [line.strip() for line in f if line.strip()]
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server = StandinServer(
+            ResponseBook(args.script, args.recorded), LatencyModel.parse(args.latency, args.seed), args.token_delay,
+            throttle_rate=args.throttle_rate, retry_after=0.5,
+        ).start()
+        base_url = server.url
+    # Must be set before the DeepSeek client is first created
+    os.environ["DEEPSEEK_BASE_URL"] = base_url
+    os.environ.setdefault("DEEPSEEK_API_KEY", "standin")
+
+    from modules.telemetry.tracing import tracer
+    tracer.enabled = True
+    tracer.jsonl_path = args.trace_jsonl
+    stage_durations = defaultdict(list)
+    tracer.listeners.append(lambda span: stage_durations[span.name].append(span.duration))
+
+    from modules.app_actions.discord import executive_director_bot as bot_module
+    from agents.memory import ConversationMemory
+    from workflows.run_journal import RunJournal
+    journal_dir = tempfile.mkdtemp(prefix="load_pipeline_")
+    bot_module.run_journal = RunJournal(path=os.path.join(journal_dir, "run_journal.db"))
+    bot_module.conversation_memory = ConversationMemory(path=os.path.join(journal_dir, "memory.db"))
+    if not args.real_workflows:
+        install_standin_workflows(args.workflow_latency)
+
+    async def run():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(args.threads))
+        guild, author = FakeGuild(), FakeAuthor()
+        for index in range(args.warmup):
+            message = build_message(prompts[index % len(prompts)], guild, author, args.audio, args.send_latency)
+            await handle_one(bot_module, tracer, message, time.perf_counter())
+        stage_durations.clear()
+        requests_before = server.requests if server else 0
+        elapsed, results = await run_load(
+            bot_module, tracer, prompts, args.rate, args.duration, args.audio, args.send_latency
+        )
+        return elapsed, results, (server.requests - requests_before) if server else None
+
+    try:
+        elapsed, results, llm_requests = asyncio.run(run())
+    finally:
+        bot_module.run_journal.close()
+        bot_module.conversation_memory.close()
+        if server is not None:
+            server.stop()
+
+    completed = [r for r in results if r[2] is None]
+    errors = [r[2] for r in results if r[2] is not None]
+    print(f"LLM endpoint:   {base_url}" + ("" if args.base_url else f" (stand-in, latency {args.latency})"))
+    print(f"Messages:       {len(results)} at {args.rate:g}/s offered, {len(completed)} ok, {len(errors)} failed")
+    print(f"Elapsed:        {elapsed:.2f}s ({args.threads} executor threads)")
+    print(f"Throughput:     {len(completed) / elapsed:.2f} msg/s")
+    if llm_requests is not None:
+        print(f"LLM requests:   {llm_requests} ({llm_requests / max(1, len(results)):.1f} per message)")
+    from modules.ai_modules.models.deepseek import get_rate_limiter
+    print(f"Rate limiter:   {get_rate_limiter().snapshot()}")
+    if completed:
+        print(f"End-to-end (ms, from arrival): {format_percentiles([r[0] for r in completed])}")
+        print(f"Queue wait (ms, arrival to handling): {format_percentiles([r[3] for r in completed])}")
+        first_replies = [r[1] for r in completed if r[1] is not None]
+        if first_replies:
+            print(f"First reply (ms, from arrival): {format_percentiles(first_replies)}")
+    print("Per stage (ms):")
+    for name, durations in sorted(stage_durations.items(), key=lambda item: -sum(item[1])):
+        print(f"  {name:<24} n={len(durations):<6} {format_percentiles(durations)}")
+    for error in sorted(set(errors))[:5]:
+        print(f"  error: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# benchmarks/load_webhook.py
+"""
+Load test for WebhookTrigger.
+
+Opens many keep-alive connections and sends signed deliveries as fast as the
+server acknowledges them, then reports throughput and latency percentiles.
+By default a WebhookTrigger with a no-op workflow is started in a separate
+process so client and server do not share a GIL.
+
+Usage:
+    uv run python -m benchmarks.load_webhook --requests 50000 --connections 64
+    uv run python -m benchmarks.load_webhook --url http://127.0.0.1:8081/webhook --secret s3cret
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import multiprocessing
+import time
+import urllib.parse
+import uuid
+from collections import Counter
+
+
+def noop_workflow(event):
+    return None
+
+
+def run_server(port: int, secret: str, ready):
+    from modules.triggers.executor import TriggerExecutor
+    from modules.triggers.webhook import WebhookTrigger
+
+    trigger = WebhookTrigger(
+        workflow=noop_workflow, port=port, secret=secret, executor=TriggerExecutor(max_workers=8)
+    )
+    trigger.start()
+    ready.set()
+    while True:
+        time.sleep(60)
+
+
+def percentile(ordered, pct):
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+async def client(host, port, path, secret, count, duplicate_ratio, latencies, statuses, counter):
+    reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps({"event": "load_test", "value": 42}).encode("utf-8")
+    signature = "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    try:
+        for _ in range(count):
+            n = next(counter)
+            delivery_id = f"dup-{n // 2}" if duplicate_ratio and (n % int(1 / duplicate_ratio) < 2) else uuid.uuid4().hex
+            request = (
+                f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\nX-Delivery-ID: {delivery_id}\r\n"
+                f"X-Signature-256: {signature}\r\n\r\n"
+            ).encode("latin-1") + body
+            started = time.perf_counter()
+            writer.write(request)
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            if length:
+                await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+            statuses[int(head.split(b" ", 2)[1])] += 1
+    finally:
+        writer.close()
+
+
+async def run_load(url, secret, total, connections, duplicate_ratio):
+    parsed = urllib.parse.urlparse(url)
+    latencies, statuses = [], Counter()
+    counter = iter(range(total))
+    per_connection = [total // connections + (1 if i < total % connections else 0) for i in range(connections)]
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        client(parsed.hostname, parsed.port, parsed.path, secret, count, duplicate_ratio, latencies, statuses, counter)
+        for count in per_connection if count
+    ))
+    elapsed = time.perf_counter() - started
+    return elapsed, sorted(latencies), statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Target webhook URL (default: start a local server)")
+    parser.add_argument("--port", type=int, default=18081, help="Port for the local server")
+    parser.add_argument("--secret", default="load-test-secret")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.0,
+                        help="Fraction of deliveries that reuse a delivery ID (e.g. 0.1)")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        ready = multiprocessing.Event()
+        server = multiprocessing.Process(target=run_server, args=(args.port, args.secret, ready), daemon=True)
+        server.start()
+        ready.wait(timeout=10)
+        time.sleep(0.2)
+        url = f"http://127.0.0.1:{args.port}/webhook"
+
+    try:
+        elapsed, latencies, statuses = asyncio.run(
+            run_load(url, args.secret, args.requests, args.connections, args.duplicate_ratio)
+        )
+    finally:
+        if server is not None:
+            server.terminate()
+
+    print(f"Target:       {url}")
+    print(f"Requests:     {len(latencies)} over {args.connections} connections in {elapsed:.2f}s")
+    print(f"Throughput:   {len(latencies) / elapsed:,.0f} req/s")
+    print("Latency (ms): " + ", ".join(
+        f"p{p}={percentile(latencies, p) * 1e3:.2f}" for p in (50, 95, 99)
+    ) + f", max={latencies[-1] * 1e3:.2f}")
+    print(f"Statuses:     {dict(sorted(statuses.items()))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+# benchmarks/openai_standin.py
+"""
+Offline stand-in for the OpenAI-compatible chat/completions API.
+
+Lets the pipeline run without the live DeepSeek API, with controllable
+latency and deterministic answers.
+
+Endpoints (with or without a /v1 or /beta prefix):
+    POST /chat/completions   non-streaming and streaming (SSE) responses
+    POST /completions        plain and fill-in-the-middle completions
+    POST /messages           Anthropic Messages API (non-streaming), for ClaudeModel
+    GET  /models             model list (useful as a connection warm-up)
+
+Responses, in order of precedence:
+    1. Recorded: JSONL file of {"messages": [...], "content": "..."} entries;
+       a request whose messages match exactly gets the recorded content.
+    2. Scripted: JSON file with a list of rules
+       {"match": "<regex>", "response": "<text>"}. The regex is searched in
+       the system prompt followed by the last user message; the first match
+       wins. In the response, {last_user} is replaced by the last user message
+       and {last_user_json} by the same text escaped for use inside a JSON string.
+    3. Fallback: echo of the last user message.
+
+Latency specs (seconds):
+    constant:0.3 | uniform:0.1,0.6 | normal:0.4,0.1 | lognormal:0.4,0.5
+    (lognormal takes the median and the sigma of the underlying normal)
+    For streams the sampled latency is the time to first token and
+    --token-delay is added between chunks.
+
+Throttling: --throttle-rate 0.1 answers 10% of completion requests with
+429 and a Retry-After header, to exercise client-side retries.
+
+Usage:
+    uv run python -m benchmarks.openai_standin --port 8089 --latency lognormal:0.4,0.5 \\
+        --script benchmarks/standin_script.json
+    DEEPSEEK_BASE_URL=http://127.0.0.1:8089 uv run main.py
+    (likewise ANTHROPIC_BASE_URL, OPENAI_BASE_URL=http://127.0.0.1:8089/v1, OLLAMA_BASE_URL)
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+
+class LatencyModel:
+    """Samples response latencies from a named distribution."""
+    def __init__(self, kind: str = "constant", params: Optional[List[float]] = None, seed: Optional[int] = None):
+        self.kind = kind
+        self.params = params or [0.0]
+        self._random = random.Random(seed)
+
+    @classmethod
+    def parse(cls, spec: str, seed: Optional[int] = None) -> "LatencyModel":
+        kind, _, values = spec.partition(":")
+        params = [float(value) for value in values.split(",")] if values else [0.0]
+        expected = {"constant": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if kind not in expected or len(params) != expected[kind]:
+            raise ValueError(f"Invalid latency spec '{spec}'")
+        return cls(kind, params, seed)
+
+    def sample(self) -> float:
+        r = self._random
+        if self.kind == "constant":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = r.uniform(*self.params)
+        elif self.kind == "normal":
+            value = r.gauss(*self.params)
+        else:
+            median, sigma = self.params
+            value = r.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+        return max(0.0, value)
+
+
+def _messages_key(messages: List[dict]) -> str:
+    canonical = json.dumps(
+        [{"role": m.get("role"), "content": m.get("content")} for m in messages],
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseBook:
+    """Chooses the reply content for a request."""
+    def __init__(self, script_path: Optional[str] = None, recorded_path: Optional[str] = None):
+        self.rules = []
+        if script_path:
+            with open(script_path, "r") as f:
+                for rule in json.load(f):
+                    self.rules.append((re.compile(rule["match"], re.IGNORECASE | re.DOTALL), rule["response"]))
+        self.recorded: Dict[str, str] = {}
+        if recorded_path:
+            with open(recorded_path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.recorded[_messages_key(entry["messages"])] = entry["content"]
+
+    def reply(self, messages: List[dict]) -> str:
+        if self.recorded:
+            recorded = self.recorded.get(_messages_key(messages))
+            if recorded is not None:
+                return recorded
+        system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+        last_user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+        haystack = f"{system}\n{last_user}"
+        for pattern, response in self.rules:
+            if pattern.search(haystack):
+                return (response
+                        .replace("{last_user_json}", json.dumps(last_user)[1:-1])
+                        .replace("{last_user}", last_user))
+        return last_user
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class StandinServer:
+    """
+    Minimal asyncio HTTP/1.1 server speaking the OpenAI chat/completions API.
+
+    Args:
+        book (ResponseBook): Source of reply contents
+        latency (LatencyModel): Latency (time to first token for streams)
+        token_delay (float): Seconds between streamed chunks
+        host (str): Interface to bind
+        port (int): Port to bind (0 = pick a free port)
+        throttle_rate (float): Fraction of completion requests answered with 429
+        retry_after (float): Retry-After seconds sent with those 429s
+    """
+    def __init__(self, book: ResponseBook, latency: LatencyModel, token_delay: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0, throttle_rate: float = 0.0, retry_after: float = 1.0):
+        self.book = book
+        self.latency = latency
+        self.token_delay = token_delay
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.throttled = 0
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    # ---- Protocol helpers ----------------------------------------------
+
+    @staticmethod
+    def _json_response(writer, status: int, payload: dict, extra_headers: bytes = b""):
+        body = json.dumps(payload).encode("utf-8")
+        writer.write(
+            b"HTTP/1.1 %d OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n"
+            b"Connection: keep-alive\r\n%s\r\n" % (status, len(body), extra_headers) + body
+        )
+
+    @staticmethod
+    def _chunk(writer, data: bytes):
+        writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+    def _usage(self, prompt_text: str, content: str) -> dict:
+        prompt_tokens, completion_tokens = estimate_tokens(prompt_text), estimate_tokens(content)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    # ---- Endpoints -----------------------------------------------------
+
+    async def _chat(self, writer, request: dict):
+        messages = request.get("messages", [])
+        content = self.book.reply(messages)
+        # Honour assistant prefix completion: the reply continues after the prefix
+        if messages and messages[-1].get("role") == "assistant" and messages[-1].get("prefix"):
+            prefix = messages[-1].get("content") or ""
+            content = content[len(prefix):] if content.startswith(prefix) else content
+        stop = request.get("stop")
+        for marker in ([stop] if isinstance(stop, str) else stop or []):
+            if marker in content:
+                content = content[:content.index(marker)]
+        model = request.get("model", "standin")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        prompt_text = "".join(m.get("content") or "" for m in messages)
+
+        await asyncio.sleep(self.latency.sample())
+        if not request.get("stream"):
+            self._json_response(writer, 200, {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": self._usage(prompt_text, content),
+            })
+            return
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+            b"Transfer-Encoding: chunked\r\nConnection: keep-alive\r\n\r\n"
+        )
+        pieces = re.findall(r"\S+\s*|\s+", content) or [""]
+        for index, piece in enumerate(pieces):
+            delta = {"content": piece}
+            if index == 0:
+                delta["role"] = "assistant"
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                     "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+            self._chunk(writer, f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            await writer.drain()
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+        final = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                 "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                 "usage": self._usage(prompt_text, content)}
+        self._chunk(writer, f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+        self._chunk(writer, b"data: [DONE]\n\n")
+        writer.write(b"0\r\n\r\n")
+
+    async def _completion(self, writer, request: dict):
+        prompt = request.get("prompt", "")
+        content = self.book.reply([{"role": "user", "content": prompt}])
+        await asyncio.sleep(self.latency.sample())
+        self._json_response(writer, 200, {
+            "id": f"cmpl-{uuid.uuid4().hex[:24]}", "object": "text_completion", "created": int(time.time()),
+            "model": request.get("model", "standin"),
+            "choices": [{"index": 0, "text": content, "finish_reason": "stop", "logprobs": None}],
+            "usage": self._usage(prompt, content),
+        })
+
+    async def _messages(self, writer, request: dict):
+        """Anthropic Messages API: system prompt is a top-level field, content may be blocks."""
+        def text_of(content):
+            if isinstance(content, list):
+                return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+            return content or ""
+
+        messages = [{"role": m.get("role"), "content": text_of(m.get("content"))} for m in request.get("messages", [])]
+        if request.get("system"):
+            messages.insert(0, {"role": "system", "content": text_of(request["system"])})
+        content = self.book.reply(messages)
+        # A trailing assistant message is a prefill: the reply continues after it
+        if messages and messages[-1]["role"] == "assistant":
+            prefill = messages[-1]["content"]
+            content = content[len(prefill):] if content.startswith(prefill) else content
+        for marker in request.get("stop_sequences") or []:
+            if marker in content:
+                content = content[:content.index(marker)]
+        await asyncio.sleep(self.latency.sample())
+        usage = self._usage("".join(m["content"] for m in messages), content)
+        self._json_response(writer, 200, {
+            "id": f"msg_{uuid.uuid4().hex[:24]}", "type": "message", "role": "assistant",
+            "model": request.get("model", "standin"),
+            "content": [{"type": "text", "text": content}],
+            "stop_reason": "end_turn", "stop_sequence": None,
+            "usage": {"input_tokens": usage["prompt_tokens"], "output_tokens": usage["completion_tokens"]},
+        })
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                lines = head[:-4].decode("latin-1").split("\r\n")
+                method, target, _ = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", "0"))
+                body = await reader.readexactly(length) if length else b""
+                self.requests += 1
+
+                path = re.sub(r"^/(v1|beta)(?=/)", "", target.split("?", 1)[0])
+                if method == "POST" and self.throttle_rate and random.random() < self.throttle_rate:
+                    self.throttled += 1
+                    self._json_response(writer, 429, {"error": {"message": "Rate limit reached (stand-in)"}},
+                                        b"Retry-After: %g\r\n" % self.retry_after)
+                elif method == "POST" and path == "/chat/completions":
+                    await self._chat(writer, json.loads(body or b"{}"))
+                elif method == "POST" and path == "/completions":
+                    await self._completion(writer, json.loads(body or b"{}"))
+                elif method == "POST" and path == "/messages":
+                    await self._messages(writer, json.loads(body or b"{}"))
+                elif method == "GET" and path == "/models":
+                    self._json_response(writer, 200, {"object": "list", "data": [
+                        {"id": "deepseek-chat", "object": "model", "created": 0, "owned_by": "standin"}
+                    ]})
+                else:
+                    self._json_response(writer, 404, {"error": {"message": f"Unknown endpoint {path}"}})
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        finally:
+            writer.close()
+
+    # ---- Lifecycle -----------------------------------------------------
+
+    async def serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+
+    def start(self) -> "StandinServer":
+        """Serve from a daemon thread; returns once the port is bound."""
+        threading.Thread(target=lambda: asyncio.run(self.serve()), daemon=True).start()
+        self._ready.wait(timeout=10)
+        return self
+
+    def stop(self):
+        if self._loop is not None and self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default="constant:0", help="Latency spec, e.g. lognormal:0.4,0.5")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument("--script", help="JSON file with scripted response rules")
+    parser.add_argument("--recorded", help="JSONL file with recorded responses")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds for throttled requests")
+    args = parser.parse_args()
+
+    server = StandinServer(
+        ResponseBook(args.script, args.recorded), LatencyModel.parse(args.latency, args.seed),
+        args.token_delay, args.host, args.port, args.throttle_rate, args.retry_after,
+    )
+    print(f"[standin] Serving OpenAI-compatible API on http://{args.host}:{args.port}")
+    asyncio.run(server.serve())
+
+
+if __name__ == "__main__":
+    main()
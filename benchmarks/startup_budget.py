@@ -0,0 +1,110 @@
+# benchmarks/startup_budget.py
+"""
+Startup budget check for the CLI entry point.
+
+Imports a module in a fresh interpreter with `-X importtime`, and fails
+(exit code 1) if:
+  - the cumulative import time of the module exceeds the budget, or
+  - any heavy dependency was imported (these must stay lazy).
+
+Also reports wall-clock time and peak RSS of the bare import, so before/after
+numbers can be compared when changing module loading.
+
+Usage:
+    uv run python -m benchmarks.startup_budget
+    uv run python -m benchmarks.startup_budget --module main --budget-ms 150 --runs 5
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("discord", "openai", "whisper", "torch", "googleapiclient", "google.oauth2", "numpy", "requests")
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+MEASURE_RSS = (
+    "import resource, sys, time; t = time.perf_counter(); import {module}; "
+    "e = time.perf_counter() - t; "
+    "print(e, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, file=sys.stderr)"
+)
+
+
+def parse_importtime(stderr: str):
+    """Returns {module: cumulative microseconds} for every import in the trace"""
+    cumulative = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            cumulative[match.group(4)] = int(match.group(2))
+    return cumulative
+
+
+def measure(module: str):
+    trace = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    if trace.returncode != 0:
+        raise SystemExit(f"Importing {module} failed:\n{trace.stderr[-2000:]}")
+    imports = parse_importtime(trace.stderr)
+
+    started = time.perf_counter()
+    probe = subprocess.run(
+        [sys.executable, "-c", MEASURE_RSS.format(module=module)],
+        capture_output=True, text=True,
+    )
+    process_s = time.perf_counter() - started
+    import_s, max_rss = probe.stderr.strip().splitlines()[-1].split()
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss_mb = int(max_rss) / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return imports, float(import_s), process_s, rss_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="Module to import (default: main)")
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="Cumulative import time budget")
+    parser.add_argument("--runs", type=int, default=3, help="Runs to take the best of (reduces noise)")
+    args = parser.parse_args()
+
+    best = None
+    for _ in range(args.runs):
+        result = measure(args.module)
+        if best is None or result[0].get(args.module, 0) < best[0].get(args.module, 0):
+            best = result
+    imports, import_s, process_s, rss_mb = best
+
+    cumulative_ms = imports.get(args.module, 0) / 1000
+    heavy = sorted(
+        name for name in imports
+        if any(name == heavy or name.startswith(heavy + ".") for heavy in HEAVY_MODULES)
+    )
+    slowest = sorted(imports.items(), key=lambda item: item[1], reverse=True)[:10]
+
+    print(f"Module:              {args.module}")
+    print(f"Cumulative import:   {cumulative_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"Import wall time:    {import_s * 1e3:.1f} ms")
+    print(f"Process start+exit:  {process_s * 1e3:.1f} ms")
+    print(f"Peak RSS:            {rss_mb:.1f} MB")
+    print(f"Modules imported:    {len(imports)}")
+    print("Slowest imports (cumulative):")
+    for name, micros in slowest:
+        print(f"  {micros / 1000:8.1f} ms  {name}")
+
+    failures = []
+    if cumulative_ms > args.budget_ms:
+        failures.append(f"import time {cumulative_ms:.1f} ms exceeds budget of {args.budget_ms:.0f} ms")
+    if heavy:
+        failures.append(f"heavy modules imported at startup: {', '.join(heavy[:10])}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        raise SystemExit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
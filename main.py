@@ -1,14 +1,13 @@
 # main.py
 
+# Heavy dependencies (discord, openai, whisper/torch, Google API client) are
+# imported inside the menu actions that need them, so the menu starts instantly.
+# Run benchmarks/startup_budget.py after touching the imports below.
+
 import os
 import json
 import time
 import webbrowser
-from connections.google.google_oauth_client import GoogleOAuthClient
-from modules.app_actions.discord.executive_director_bot import bot
-from agents.base_agent import BaseAgent
-from modules.ai_modules.models.deepseek import DeepSeekModel
-from workflows.my_workflows.entrypoint import OnDiscordMessageWorkflow
 TOKENS_DIR = "tokens"
 
 
@@ -66,6 +65,8 @@ def run_google_oauth(scopes: list, app_name: str) -> None:
         print("ERROR: CLIENT_ID or CLIENT_SECRET not set in environment.")
         return
 
+    from connections.google.google_oauth_client import GoogleOAuthClient
+
     client = GoogleOAuthClient(
         CLIENT_ID, CLIENT_SECRET, REDIRECT_URI, AUTH_ENDPOINT, TOKEN_ENDPOINT, SCOPES
     )
@@ -91,6 +92,8 @@ def run_google_oauth(scopes: list, app_name: str) -> None:
 
 
 def main():
+    from dotenv import load_dotenv
+    load_dotenv()
     while True:
         print("\n========== MAIN MENU ==========")
         print("1. Set 3rd party integrations")
@@ -104,6 +107,7 @@ def main():
             setup_integrations_submenu()
         elif choice == '2':
             print("Starting scheduled workflow system...")
+            from workflows.my_workflows.entrypoint import OnDiscordMessageWorkflow
             OnDiscordMessageWorkflow.execute(OnDiscordMessageWorkflow)
             # Assuming trigger is implemented
             print("Press Ctrl+C to stop.")
@@ -113,6 +117,8 @@ def main():
             except KeyboardInterrupt:
                 print("\nStopping...")
         elif choice =='3':
+            from agents.base_agent import BaseAgent
+            from modules.ai_modules.models.deepseek import DeepSeekModel
             system_prompt = "You are an AI agent and will give me a mock json list of"
             # Now bring in our DeepSeekModel
             deepseek_model = DeepSeekModel(
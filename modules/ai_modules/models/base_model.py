@@ -0,0 +1,142 @@
+"""
+Base Model Module
+
+Shared `generate` / `agenerate` interface for the chat model providers
+(claude.py, openai.py, ollama.py), matching DeepSeekModel.
+
+A provider implements `chat(messages, system_prompt, json_mode, prefix, stop)`;
+the prompt helpers and the `generate` dispatch are built on top of it.
+Providers list the prompt types they support in `prompt_types`, so the router
+only sends a call to a provider that can serve it.
+"""
+
+import asyncio
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from modules.ai_modules.models.rate_limit import RateLimiter
+from modules.ai_modules.models.structured import collect_stream, expects_list, run_structured
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def shared_rate_limiter(prefix: str) -> RateLimiter:
+    """One rate limiter per provider, configured from <PREFIX>_RPM, <PREFIX>_TPM, ..."""
+    with _limiters_lock:
+        limiter = _limiters.get(prefix)
+        if limiter is None:
+            limiter = _limiters[prefix] = RateLimiter.from_env(prefix)
+        return limiter
+
+
+def parse_json_response(content: str):
+    """Parses a JSON answer, tolerating a ```json fence around it."""
+    content = content.strip()
+    if content.startswith("```"):
+        content = content.strip("`")
+        if content.startswith("json"):
+            content = content[4:]
+    return json.loads(content)
+
+
+class BaseLanguageModel:
+    """
+    Args:
+        model_name (str): Provider model id (default: <env_prefix>_MODEL, then default_model)
+        system_prompt (str): System prompt used by generate()
+        prompt_type (str): Prompt type callers should use with this model
+    """
+    provider = "base"
+    env_prefix = ""
+    default_model = ""
+    prompt_types = ("conversation", "json", "structured", "prompt")
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        system_prompt: str = "You are a helpful assistant. Respond succinctly.",
+        prompt_type: str = "conversation"
+    ):
+        self.model_name = model_name or os.getenv(f"{self.env_prefix}_MODEL") or self.default_model
+        self.system_prompt = system_prompt
+        self.prompt_type = prompt_type
+
+    def chat(self, messages: List[Dict[str, str]], system_prompt: str = "", json_mode: bool = False,
+             prefix: str = "", stop: Optional[List[str]] = None) -> str:
+        """Sends one chat request and returns the text of the answer (without the prefix)."""
+        raise NotImplementedError
+
+    def prompt(self, prompt: str) -> str:
+        return self.chat([{"role": "user", "content": prompt}])
+
+    def conversational_prompt(self, messages: List[Dict[str, str]], system_prompt: Optional[str] = None) -> str:
+        try:
+            return self.chat(messages, system_prompt=self.system_prompt if system_prompt is None else system_prompt)
+        except Exception as e:
+            raise Exception(f"Error in conversational prompt: {str(e)}")
+
+    def json_prompt(self, prompt: str, system_prompt: str = "") -> dict:
+        content = self.chat([{"role": "user", "content": prompt}], system_prompt=system_prompt, json_mode=True)
+        return parse_json_response(content)
+
+    def structured_prompt(self, prompt: str, schema: Any, system_prompt: Optional[str] = None, max_reasks: int = 1,
+                          check: Optional[Callable[[Any], Any]] = None,
+                          on_member: Optional[Callable[[str, Any], None]] = None) -> Any:
+        """
+        Answer validated against `schema`, like DeepSeekModel.structured_prompt.
+        `chat` does not stream, so on_member is called once the whole answer is in.
+        """
+        system_prompt = self.system_prompt if system_prompt is None else system_prompt
+        json_mode = not expects_list(schema)
+        if json_mode and "json" not in (system_prompt + prompt).lower():
+            system_prompt += "\nRespond in JSON."
+
+        def ask(conversation: List[Dict[str, str]]) -> str:
+            answer = self.chat(conversation, system_prompt=system_prompt, json_mode=json_mode)
+            return answer if on_member is None else collect_stream([answer], on_member)
+
+        return run_structured(ask, [{"role": "user", "content": prompt}], schema, max_reasks=max_reasks, check=check)
+
+    def prefix_prompt(self, prompt: str, prefix: str, no_prefix: bool = False) -> str:
+        content = self.chat([{"role": "user", "content": prompt}], prefix=prefix)
+        return content if no_prefix else prefix + content
+
+    def prefix_then_stop_prompt(self, prompt: str, prefix: str, suffix: str) -> str:
+        return self.chat([{"role": "user", "content": prompt}], prefix=prefix, stop=[suffix])
+
+    def fill_in_the_middle_prompt(self, prompt: str, suffix: str) -> str:
+        raise NotImplementedError(f"{self.provider} does not support fill-in-the-middle")
+
+    def generate(self, text: str,
+                 prompt_type: str = "conversation",
+                 prefix: str = "",
+                 suffix: str = "",
+                 no_prefix: bool = False,
+                 schema: Any = None,
+                 check: Optional[Callable[[Any], Any]] = None,
+                 on_member: Optional[Callable[[str, Any], None]] = None
+                 ):
+        """Same prompt types as DeepSeekModel.generate, limited to `prompt_types`."""
+        if prompt_type not in self.prompt_types:
+            raise ValueError(f"{self.provider} does not support prompt type '{prompt_type}'")
+        if prompt_type == "conversation":
+            return self.conversational_prompt([{"role": "user", "content": text}])
+        elif prompt_type == "json":
+            return self.json_prompt(prompt=text, system_prompt=self.system_prompt)
+        elif prompt_type == "structured":
+            return self.structured_prompt(prompt=text, schema=schema, check=check, on_member=on_member)
+        elif prompt_type == "prefix_stop":
+            return self.prefix_then_stop_prompt(prompt=text, prefix=prefix, suffix=suffix)
+        elif prompt_type == "prefix":
+            return self.prefix_prompt(prompt=text, prefix=prefix, no_prefix=no_prefix)
+        elif prompt_type == "fill_in":
+            return self.fill_in_the_middle_prompt(prompt=text, suffix=suffix)
+        elif prompt_type == "prompt":
+            return self.prompt(prompt=text)
+
+    async def agenerate(self, text: str, **kwargs):
+        """generate() on a worker thread, so event loops are not blocked."""
+        return await asyncio.to_thread(self.generate, text, **kwargs)
@@ -0,0 +1,218 @@
+"""
+Cassette Module
+
+Record and replay of LLM requests, so pipeline runs can be repeated
+deterministically without the live API.
+
+Classes:
+    Cassette: Records request/response pairs (with latency) to a gzip JSONL file,
+              or serves them back in replay mode.
+    CassetteMiss: Raised in replay mode for a request that was never recorded.
+
+Configuration (environment):
+    DEEPSEEK_CASSETTE_MODE=record|replay   Enable the cassette (off when unset)
+    DEEPSEEK_CASSETTE_PATH=path            Cassette file (default: data/cassettes/deepseek.jsonl.gz)
+    DEEPSEEK_CASSETTE_LATENCY=zero|recorded
+                                           Replay instantly, or sleep for the recorded latency
+
+Example Usage:
+    from modules.ai_modules.models import deepseek
+    from modules.ai_modules.models.cassette import Cassette
+
+    deepseek.use_cassette(Cassette("benchmarks/corpus/deepseek.jsonl.gz", mode="replay"))
+
+Note:
+    Requests are matched on a hash of their parameters. Dates and weekday names
+    inside system prompts are masked before hashing, because the prompts embed
+    today's date; a cassette recorded yesterday still replays today.
+    A request recorded several times is answered with its recordings in order.
+    Streamed answers are recorded as their text deltas and replayed as the same
+    deltas (see stream()).
+"""
+
+import copy
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterator, List, Optional
+
+MODES = ("record", "replay")
+LATENCIES = ("zero", "recorded")
+
+_VOLATILE = re.compile(
+    r"\d{4}-\d{2}-\d{2}|\b(?:Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday)\b"
+)
+
+
+class CassetteMiss(KeyError):
+    """No recorded response matches the request."""
+
+
+def _rebuild(endpoint: str, payload: dict):
+    """Turns a recorded response back into the openai type the caller expects."""
+    if endpoint == "chat":
+        from openai.types.chat import ChatCompletion
+        return ChatCompletion.model_validate(payload)
+    from openai.types import Completion
+    return Completion.model_validate(payload)
+
+
+class Cassette:
+    """
+    Args:
+        path (str): gzip JSONL file holding one recorded interaction per line
+        mode (str): "record" (call the API and append) or "replay" (serve from the file)
+        latency (str): In replay mode, "zero" or "recorded" (sleep as long as the original call took)
+
+    Attributes:
+        calls (Counter): Requests seen per endpoint
+        misses (int): Replay requests without a recording
+    """
+    def __init__(self, path: str, mode: str = "replay", latency: str = "zero"):
+        if mode not in MODES:
+            raise ValueError(f"Invalid cassette mode '{mode}', expected one of {MODES}")
+        if latency not in LATENCIES:
+            raise ValueError(f"Invalid cassette latency '{latency}', expected one of {LATENCIES}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.calls = Counter()
+        self.misses = 0
+        self._entries: Dict[str, List[dict]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._file = None
+        self._lock = threading.Lock()
+        if mode == "replay":
+            self._load()
+
+    @classmethod
+    def from_env(cls) -> Optional["Cassette"]:
+        mode = os.getenv("DEEPSEEK_CASSETTE_MODE", "").strip().lower()
+        if not mode or mode == "off":
+            return None
+        return cls(
+            os.getenv("DEEPSEEK_CASSETTE_PATH", "data/cassettes/deepseek.jsonl.gz"),
+            mode=mode,
+            latency=os.getenv("DEEPSEEK_CASSETTE_LATENCY", "zero").strip().lower(),
+        )
+
+    @staticmethod
+    def request_key(endpoint: str, request: dict) -> str:
+        request = copy.deepcopy(request)
+        for message in request.get("messages") or []:
+            if message.get("role") == "system" and isinstance(message.get("content"), str):
+                message["content"] = _VOLATILE.sub("<date>", message["content"])
+        canonical = json.dumps({"endpoint": endpoint, "request": request}, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Cassette {self.path} does not exist; record it first")
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], []).append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def call(self, endpoint: str, request: dict, send: Callable):
+        """
+        Returns the response for `request`: from the cassette in replay mode,
+        otherwise from `send()`, which is then recorded.
+        """
+        key = self.request_key(endpoint, request)
+        with self._lock:
+            self.calls[endpoint] += 1
+        if self.mode == "replay":
+            return self._replay(endpoint, key)
+
+        started = time.perf_counter()
+        response = send()
+        elapsed = time.perf_counter() - started
+        self._append({
+            "key": key,
+            "endpoint": endpoint,
+            "request": request,
+            "response": response.model_dump(mode="json"),
+            "latency": round(elapsed, 4),
+        })
+        return response
+
+    def stream(self, endpoint: str, request: dict, send: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """
+        Like call() for streamed answers: yields the text deltas of `send()` and
+        records them, or replays recorded deltas. With recorded latency the first
+        delta waits for the recorded time to first delta and the rest are spread
+        over the remaining time.
+        """
+        key = self.request_key(endpoint, request)
+        with self._lock:
+            self.calls[endpoint] += 1
+        if self.mode == "replay":
+            entry = self._next_entry(endpoint, key)
+            deltas = entry["response"]["deltas"]
+            first = entry.get("first_latency") or 0.0
+            gap = max(0.0, (entry.get("latency") or 0.0) - first) / max(1, len(deltas) - 1)
+            for index, delta in enumerate(deltas):
+                if self.latency == "recorded":
+                    time.sleep(first if index == 0 else gap)
+                yield delta
+            return
+
+        started = time.perf_counter()
+        first = None
+        deltas: List[str] = []
+        for delta in send():
+            if first is None:
+                first = time.perf_counter() - started
+            deltas.append(delta)
+            yield delta
+        self._append({
+            "key": key,
+            "endpoint": endpoint,
+            "request": request,
+            "response": {"deltas": deltas},
+            "latency": round(time.perf_counter() - started, 4),
+            "first_latency": round(first or 0.0, 4),
+        })
+
+    def _next_entry(self, endpoint: str, key: str) -> dict:
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                raise CassetteMiss(f"No recorded {endpoint} response for request {key} in {self.path}")
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            return entries[index % len(entries)]
+
+    def _replay(self, endpoint: str, key: str):
+        entry = self._next_entry(endpoint, key)
+        if self.latency == "recorded" and entry.get("latency"):
+            time.sleep(entry["latency"])
+        return _rebuild(endpoint, entry["response"])
+
+    def _append(self, entry: dict):
+        line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = gzip.open(self.path, "at", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            self._entries.setdefault(entry["key"], []).append(entry)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
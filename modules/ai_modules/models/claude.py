@@ -0,0 +1,94 @@
+"""
+Claude Model Module
+
+Claude through the Anthropic Messages API, called with httpx (already
+installed as a dependency of openai) instead of the Anthropic SDK.
+
+Classes:
+    ClaudeModel: generate()/agenerate() like DeepSeekModel. Prefix prompts use
+                 assistant prefill; JSON prompts prefill "{".
+
+Configuration (environment):
+    ANTHROPIC_API_KEY      API key
+    ANTHROPIC_BASE_URL     Endpoint (default: https://api.anthropic.com)
+    ANTHROPIC_MODEL        Model id (default: claude-3-5-haiku-latest)
+    ANTHROPIC_RPM, ...     Rate limits, see rate_limit.py
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional
+
+from modules.ai_modules.models.base_model import BaseLanguageModel, shared_rate_limiter
+from modules.telemetry.tracing import tracer
+
+CLAUDE_MODEL = "claude-3-5-haiku-latest"
+ANTHROPIC_VERSION = "2023-06-01"
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Returns the shared httpx client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import httpx
+                _client = httpx.Client(
+                    base_url=os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com"),
+                    headers={
+                        "x-api-key": os.getenv("ANTHROPIC_API_KEY", ""),
+                        "anthropic-version": ANTHROPIC_VERSION,
+                        "content-type": "application/json",
+                    },
+                    timeout=httpx.Timeout(120.0, connect=10.0),
+                )
+    return _client
+
+
+def messages_create(**payload) -> dict:
+    """Every Messages API request goes through here, so it is traced and rate limited in one place."""
+    def send():
+        response = get_client().post("/v1/messages", json=payload)
+        response.raise_for_status()  # HTTPStatusError carries the response, so 429s/5xx are retried
+        return response.json()
+
+    with tracer.span("claude.messages", model=payload.get("model")) as span:
+        body = shared_rate_limiter("ANTHROPIC").call(payload, send)
+        usage = body.get("usage") or {}
+        span.set(prompt_tokens=usage.get("input_tokens"), completion_tokens=usage.get("output_tokens"))
+        return body
+
+
+class ClaudeModel(BaseLanguageModel):
+    provider = "claude"
+    env_prefix = "ANTHROPIC"
+    default_model = CLAUDE_MODEL
+    prompt_types = ("conversation", "json", "structured", "prompt", "prefix", "prefix_stop")
+    max_tokens = 1024
+
+    def chat(self, messages: List[Dict[str, str]], system_prompt: str = "", json_mode: bool = False,
+             prefix: str = "", stop: Optional[List[str]] = None) -> str:
+        # The Messages API takes the system prompt separately
+        system_parts = [m["content"] for m in messages if m.get("role") == "system"]
+        if system_prompt:
+            system_parts.insert(0, system_prompt)
+        conversation = [
+            {"role": m["role"], "content": m["content"]} for m in messages if m.get("role") in ("user", "assistant")
+        ]
+        prefill = prefix or ("{" if json_mode else "")
+        if prefill:
+            conversation.append({"role": "assistant", "content": prefill})
+
+        payload = {"model": self.model_name, "max_tokens": self.max_tokens, "messages": conversation}
+        if system_parts:
+            payload["system"] = "\n\n".join(system_parts)
+        if stop:
+            payload["stop_sequences"] = stop
+
+        body = messages_create(**payload)
+        text = "".join(block.get("text", "") for block in body.get("content", []) if block.get("type") == "text")
+        # A JSON prefill is part of the answer; an explicit prefix is handled by the caller
+        return "{" + text if json_mode and not prefix else text
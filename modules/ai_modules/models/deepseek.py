@@ -1,20 +1,147 @@
-from openai import OpenAI
 import os
 import json
+import asyncio
+import atexit
+import threading
+import time
 from dotenv import load_dotenv
-from typing import List, Dict, Optional
+from typing import Any, Callable, Iterator, List, Dict, Optional
+from modules.telemetry.tracing import tracer
+from modules.ai_modules.models.cassette import Cassette
+from modules.ai_modules.models.rate_limit import RateLimiter
+from modules.ai_modules.models.structured import collect_stream, expects_list, run_structured
 
 # Load environment variables
 load_dotenv()
 
-# Initialize DeepSeek client
-client = OpenAI(
-    api_key=os.getenv("DEEPSEEK_API_KEY"), base_url="https://api.deepseek.com/beta"
-)
-
 DEEPSEEK_V3_MODEL = "deepseek-chat"
 
+_client = None
+_client_lock = threading.Lock()
+_limiter = None
+
+_UNSET = object()
+_cassette = _UNSET  # Cassette, None, or _UNSET until read from the environment
+
+
+def get_client():
+    """
+    Returns the shared DeepSeek client, creating it on first use.
+    The openai package and its HTTP stack are only imported at that point.
+    DEEPSEEK_BASE_URL overrides the endpoint (e.g. to point at a local stand-in server).
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(
+                    api_key=os.getenv("DEEPSEEK_API_KEY"),
+                    base_url=os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/beta"),
+                    max_retries=0,  # retries are handled by the rate limiter
+                )
+    return _client
+
+
+def warm_up():
+    """
+    Creates the client and opens a pooled connection (TLS handshake included)
+    ahead of the first request, with a cheap model list call.
+    """
+    get_client().models.list()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Returns the shared rate limiter (configured by DEEPSEEK_RPM, DEEPSEEK_TPM,
+    DEEPSEEK_MAX_CONCURRENCY, DEEPSEEK_LATENCY_TARGET and DEEPSEEK_MAX_RETRIES).
+    """
+    global _limiter
+    if _limiter is None:
+        with _client_lock:
+            if _limiter is None:
+                _limiter = RateLimiter.from_env("DEEPSEEK")
+    return _limiter
+
+
+def _record_usage(span, response):
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        span.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+
+
+def use_cassette(cassette: Optional[Cassette]):
+    """
+    Records or replays every request through `cassette` (None turns it off).
+    Without a call to this, DEEPSEEK_CASSETTE_MODE decides.
+    """
+    global _cassette
+    _cassette = cassette
+    if cassette is not None:
+        atexit.register(cassette.close)
+
+
+def get_cassette() -> Optional[Cassette]:
+    if _cassette is _UNSET:
+        use_cassette(Cassette.from_env())
+    return _cassette
+
+
+def _send(endpoint: str, create, kwargs: dict):
+    limiter = get_rate_limiter()
+
+    def upstream():
+        return limiter.call(kwargs, lambda: create(**kwargs))
+
+    cassette = get_cassette()
+    # Streams are passed through; only complete responses can be recorded
+    if cassette is None or kwargs.get("stream"):
+        return upstream()
+    return cassette.call(endpoint, kwargs, upstream)
+
+
+def chat_completion(**kwargs):
+    """Every chat completion request goes through here, so it is traced and recorded in one place."""
+    with tracer.span("deepseek.chat", model=kwargs.get("model")) as span:
+        response = _send("chat", lambda **kw: get_client().chat.completions.create(**kw), kwargs)
+        _record_usage(span, response)
+        return response
+
+
+def chat_stream(**kwargs) -> Iterator[str]:
+    """
+    Streams a chat completion as its text deltas. Rate limited, traced and recorded
+    like chat_completion; the span covers the whole stream and notes the time to
+    the first delta.
+    """
+    request = {**kwargs, "stream": True}
 
+    def upstream():
+        # The limiter holds the concurrency slot until the stream is fully read
+        stream = get_rate_limiter().stream(request, lambda: get_client().chat.completions.create(**request))
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    cassette = get_cassette()
+    with tracer.span("deepseek.chat", model=request.get("model"), stream=True) as span:
+        started = time.perf_counter()
+        deltas = upstream() if cassette is None else cassette.stream("chat", request, upstream)
+        count = 0
+        for delta in deltas:
+            if not count:
+                span.set(first_delta=round(time.perf_counter() - started, 4))
+            count += 1
+            yield delta
+        span.set(deltas=count)
+
+
+def completion(**kwargs):
+    """Every (FIM) completion request goes through here, so it is traced and recorded in one place."""
+    with tracer.span("deepseek.completion", model=kwargs.get("model")) as span:
+        response = _send("completion", lambda **kw: get_client().completions.create(**kw), kwargs)
+        _record_usage(span, response)
+        return response
 
 
 class DeepSeekModel:
@@ -22,6 +149,9 @@ class DeepSeekModel:
     A simple wrapper around DeepSeek to fit the typical `model.generate(prompt)` interface.
     You can expand it to handle additional methods if needed.
     """
+    provider = "deepseek"
+    prompt_types = ("conversation", "json", "structured", "prefix_stop", "prefix", "fill_in", "prompt")
+
     def __init__(
         self,
         model_name: str = DEEPSEEK_V3_MODEL,
@@ -36,7 +166,7 @@ class DeepSeekModel:
         """
         Send a prompt to DeepSeek and get detailed benchmarking response.
         """
-        response = client.chat.completions.create(
+        response = chat_completion(
             model=model, messages=[{"role": "user", "content": prompt}], stream=False
         )
         return response.choices[0].message.content
@@ -54,7 +184,7 @@ class DeepSeekModel:
             prompt="def fib(a):",
             suffix="    return fib(a-1) + fib(a-2)",
         """
-        response = client.completions.create(model=model, prompt=prompt, suffix=suffix)
+        response = completion(model=model, prompt=prompt, suffix=suffix)
         return prompt + response.choices[0].text + suffix
 
 
@@ -72,12 +202,62 @@ class DeepSeekModel:
         """
         messages = [{"role":"system", "content": system_prompt},{"role": "user", "content": prompt}]
 
-        response = client.chat.completions.create(
+        response = chat_completion(
             model=model, messages=messages, response_format={"type": "json_object"}
         )
         return json.loads(response.choices[0].message.content)
 
 
+    def structured_prompt(
+        self,
+        prompt: str,
+        schema: Any,
+        system_prompt: Optional[str] = None,
+        max_reasks: int = 1,
+        check: Optional[Callable[[Any], Any]] = None,
+        model: str = DEEPSEEK_V3_MODEL,
+        on_member: Optional[Callable[[str, Any], None]] = None,
+    ) -> Any:
+        """
+        Send a prompt to DeepSeek and get an answer validated against a schema.
+
+        Uses JSON mode for object schemas. Defective JSON is repaired locally;
+        only answers that cannot be repaired or fail validation are sent back
+        with a targeted correction (see structured.py).
+
+        Args:
+            prompt: The user prompt to send
+            schema: pydantic model or type (e.g. List[Intent]) the answer must match
+            system_prompt: System prompt (default: the model's system prompt)
+            max_reasks: Correction prompts before giving up
+            check: Extra validation; raise ValueError to ask for a correction
+            model: The model to use, defaults to deepseek-chat
+            on_member: Streams the answer and calls on_member(key, value) for each
+                       top-level member as soon as it is complete (unvalidated)
+
+        Returns:
+            The validated object
+
+        Raises:
+            StructuredOutputError: No valid answer after max_reasks corrections
+        """
+        system_prompt = self.system_prompt if system_prompt is None else system_prompt
+        # JSON mode only produces objects, and needs the word "json" in the prompt
+        json_mode = not expects_list(schema)
+        if json_mode and "json" not in (system_prompt + prompt).lower():
+            system_prompt += "\nRespond in JSON."
+        messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}]
+
+        def ask(conversation: List[Dict[str, str]]) -> str:
+            request = {"model": model, "messages": conversation}
+            if json_mode:
+                request["response_format"] = {"type": "json_object"}
+            if on_member is not None:
+                return collect_stream(chat_stream(**request), on_member)
+            return chat_completion(**request, stream=False).choices[0].message.content
+
+        return run_structured(ask, messages, schema, max_reasks=max_reasks, check=check)
+
     def prefix_prompt(
         self, prompt: str, prefix: str, model: str = DEEPSEEK_V3_MODEL, no_prefix: bool = False
     ) -> str:
@@ -97,7 +277,7 @@ class DeepSeekModel:
             {"role": "assistant", "content": prefix, "prefix": True},
         ]
 
-        response = client.chat.completions.create(model=model, messages=messages)
+        response = chat_completion(model=model, messages=messages)
         if no_prefix:
             return response.choices[0].message.content
         else:
@@ -123,7 +303,7 @@ class DeepSeekModel:
             {"role": "user", "content": prompt},
             {"role": "assistant", "content": prefix, "prefix": True},
         ]
-        response = client.chat.completions.create(
+        response = chat_completion(
             model=model, messages=messages, stop=[suffix]
         )
         return response.choices[0].message.content
@@ -151,19 +331,46 @@ class DeepSeekModel:
                 {"role": "system", "content": system_prompt},
                 *messages,
             ]
-            response = client.chat.completions.create(
+            response = chat_completion(
                 model=model, messages=messages, stream=False
             )
             return response.choices[0].message.content
         except Exception as e:
             raise Exception(f"Error in conversational prompt: {str(e)}")
 
+    def tool_chat(
+        self,
+        messages: List[Dict],
+        tools: Optional[List[dict]] = None,
+        model: str = DEEPSEEK_V3_MODEL,
+    ):
+        """
+        Send a chat with function tools to DeepSeek.
+
+        Args:
+            messages: Conversation so far, including assistant tool calls and tool results
+            tools: Function-calling schemas the model may call
+            model: The model to use, defaults to deepseek-chat
+
+        Returns:
+            tuple: (assistant message with .content and .tool_calls, usage)
+        """
+        messages = [{"role": "system", "content": self.system_prompt}, *messages]
+        request = {"model": model, "messages": messages, "stream": False}
+        if tools:
+            request["tools"] = tools
+        response = chat_completion(**request)
+        return response.choices[0].message, response.usage
+
     def generate(self, text: str, 
                  prompt_type:str = "conversation",
                  prefix: str = "",
                  suffix: str = "",
-                 no_prefix: bool = False
-                 ) -> str:
+                 no_prefix: bool = False,
+                 schema: Any = None,
+                 check: Optional[Callable[[Any], Any]] = None,
+                 on_member: Optional[Callable[[str, Any], None]] = None
+                 ) -> Any:
         """
         This is the main entry point that the agent will call.
         For a simple usage, we treat `text` as a single user message
@@ -171,7 +378,9 @@ class DeepSeekModel:
         
         ### Valid prompt types:
         - conversation
-        - json
+        - json (returns a dict)
+        - structured (returns an object validated against `schema`, see structured_prompt;
+          streamed when `on_member` is given)
         - prefix_stop
         - prefix
         - fill_in
@@ -186,6 +395,9 @@ class DeepSeekModel:
             )
         elif prompt_type == "json":
             return self.json_prompt(prompt=text, system_prompt=self.system_prompt)
+        elif prompt_type == "structured":
+            return self.structured_prompt(prompt=text, schema=schema, check=check, model=self.model_name,
+                                          on_member=on_member)
         elif prompt_type == "prefix_stop":
             return self.prefix_then_stop_prompt(prompt=text, prefix=prefix, suffix=suffix)
         elif prompt_type == "prefix":
@@ -193,4 +405,8 @@ class DeepSeekModel:
         elif prompt_type == "fill_in":
             return self.fill_in_the_middle_prompt(prompt=text, suffix=suffix)
         elif prompt_type == "prompt":
-            return self.prompt(prompt=text)
\ No newline at end of file
+            return self.prompt(prompt=text)
+
+    async def agenerate(self, text: str, **kwargs):
+        """generate() on a worker thread, so event loops are not blocked."""
+        return await asyncio.to_thread(self.generate, text, **kwargs)
@@ -0,0 +1,19 @@
+"""
+Ollama Model Module
+
+Local models served by Ollama, through its OpenAI-compatible /v1 endpoint.
+
+Configuration (environment):
+    OLLAMA_BASE_URL     Endpoint (default: http://localhost:11434/v1)
+    OLLAMA_MODEL        Model id (default: llama3.2)
+"""
+
+from modules.ai_modules.models.openai import OpenAIModel
+
+
+class OllamaModel(OpenAIModel):
+    provider = "ollama"
+    env_prefix = "OLLAMA"
+    default_model = "llama3.2"
+    default_base_url = "http://localhost:11434/v1"
+    default_api_key = "ollama"  # required by the client, ignored by Ollama
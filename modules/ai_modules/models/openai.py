@@ -0,0 +1,72 @@
+"""
+OpenAI Model Module
+
+Chat models behind an OpenAI-compatible chat/completions endpoint.
+
+Classes:
+    OpenAIModel: OpenAI (or any compatible server, via OPENAI_BASE_URL).
+
+Configuration (environment):
+    OPENAI_API_KEY      API key
+    OPENAI_BASE_URL     Endpoint (default: https://api.openai.com/v1)
+    OPENAI_MODEL        Model id (default: gpt-4o-mini)
+    OPENAI_RPM, ...     Rate limits, see rate_limit.py
+
+Note:
+    OllamaModel (ollama.py) reuses this class with Ollama's /v1 endpoint.
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional
+
+from modules.ai_modules.models.base_model import BaseLanguageModel, shared_rate_limiter
+from modules.telemetry.tracing import tracer
+
+_clients: Dict[str, object] = {}
+_clients_lock = threading.Lock()
+
+
+class OpenAIModel(BaseLanguageModel):
+    provider = "openai"
+    env_prefix = "OPENAI"
+    default_model = "gpt-4o-mini"
+    default_base_url = "https://api.openai.com/v1"
+    default_api_key = ""
+
+    def client(self):
+        """The provider's shared client; the openai package is imported on first use."""
+        client = _clients.get(self.provider)
+        if client is None:
+            with _clients_lock:
+                client = _clients.get(self.provider)
+                if client is None:
+                    from openai import OpenAI
+                    client = _clients[self.provider] = OpenAI(
+                        api_key=os.getenv(f"{self.env_prefix}_API_KEY") or self.default_api_key,
+                        base_url=os.getenv(f"{self.env_prefix}_BASE_URL", self.default_base_url),
+                        max_retries=0,  # retries are handled by the rate limiter
+                    )
+        return client
+
+    def chat(self, messages: List[Dict[str, str]], system_prompt: str = "", json_mode: bool = False,
+             prefix: str = "", stop: Optional[List[str]] = None) -> str:
+        if prefix:
+            raise ValueError(f"{self.provider} does not support prefix completion")
+        request = {
+            "model": self.model_name,
+            "messages": ([{"role": "system", "content": system_prompt}] if system_prompt else []) + list(messages),
+        }
+        if json_mode:
+            request["response_format"] = {"type": "json_object"}
+        if stop:
+            request["stop"] = stop
+
+        with tracer.span(f"{self.provider}.chat", model=self.model_name) as span:
+            response = shared_rate_limiter(self.env_prefix).call(
+                request, lambda: self.client().chat.completions.create(**request)
+            )
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                span.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+        return response.choices[0].message.content
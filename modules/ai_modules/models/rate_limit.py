@@ -0,0 +1,373 @@
+"""
+Rate Limit Module
+
+Client-side flow control for LLM API calls.
+
+Classes:
+    TokenBucket: Requests- or tokens-per-minute budget with reservation semantics.
+    AdaptiveConcurrency: AIMD limit on in-flight requests; halves on 429s (or slow
+                         responses), grows by one per window of successful calls.
+    RetryPolicy: Jittered exponential backoff that honours Retry-After.
+    SingleFlight: Identical concurrent calls share one upstream request.
+    RateLimiter: Combines the above around a send() callable.
+
+Configuration (environment, with the prefix passed to RateLimiter.from_env):
+    <PREFIX>_RPM=60                Requests per minute (unlimited when unset)
+    <PREFIX>_TPM=100000            Tokens per minute (unlimited when unset)
+    <PREFIX>_MAX_CONCURRENCY=16    Upper bound for the adaptive concurrency limit
+    <PREFIX>_LATENCY_TARGET=20     Seconds; slower responses count as congestion
+    <PREFIX>_MAX_RETRIES=4         Retries after the first attempt
+
+Example Usage:
+    limiter = RateLimiter.from_env("DEEPSEEK")
+    response = limiter.call(request, lambda: client.chat.completions.create(**request))
+    for chunk in limiter.stream(request, lambda: client.chat.completions.create(**request, stream=True)):
+        ...
+
+Note:
+    Errors are classified by duck typing (status_code, response.headers), so
+    this module works with the openai exceptions without importing openai.
+"""
+
+import email.utils
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from modules.telemetry.tracing import tracer
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+RETRYABLE_ERRORS = ("APIConnectionError", "APITimeoutError", "ConnectError", "ReadTimeout", "RemoteProtocolError")
+
+
+class TokenBucket:
+    """
+    Args:
+        per_minute (float): Refill rate
+        burst (float): Capacity (default: one minute's worth)
+
+    Callers reserve before they have the budget and sleep for the returned time,
+    so waiting callers are served in arrival order without a wake-up loop.
+    """
+    def __init__(self, per_minute: float, burst: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst or per_minute
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Takes `amount` (possibly into debt) and returns the seconds to wait before using it."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= min(amount, self.capacity)
+            return max(0.0, -self.tokens / self.rate)
+
+    def acquire(self, amount: float = 1.0) -> float:
+        wait = self.reserve(amount)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def adjust(self, delta: float):
+        """Returns (positive) or charges (negative) tokens once the real cost is known."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens + delta)
+
+
+class AdaptiveConcurrency:
+    """
+    Additive-increase/multiplicative-decrease limit on concurrent requests.
+
+    Args:
+        initial (int): Starting limit
+        minimum (int): Lowest limit
+        maximum (int): Highest limit
+        latency_target (float): Responses slower than this count as congestion (None: only 429s do)
+        backoff (float): Factor applied to the limit on congestion
+        decrease_interval (float): Minimum seconds between decreases, so one burst of
+                                   429s halves the limit once instead of collapsing it
+    """
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 16,
+                 latency_target: Optional[float] = None, backoff: float = 0.5, decrease_interval: float = 1.0):
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.decrease_interval = decrease_interval
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency: float, throttled: bool = False):
+        with self._condition:
+            self.in_flight -= 1
+            congested = throttled or (self.latency_target is not None and latency > self.latency_target)
+            if congested:
+                now = time.monotonic()
+                if now - self._last_decrease >= self.decrease_interval:
+                    self.limit = max(self.minimum, self.limit * self.backoff)
+                    self._last_decrease = now
+            else:
+                # +1 per `limit` successful calls, i.e. roughly one step per round trip
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+
+class RetryPolicy:
+    """
+    Args:
+        max_retries (int): Retries after the first attempt
+        base_delay (float): Backoff for the first retry
+        max_delay (float): Cap on the exponential backoff
+        max_retry_after (float): Give up instead of waiting longer than this for Retry-After
+    """
+    def __init__(self, max_retries: int = 4, base_delay: float = 0.5, max_delay: float = 20.0,
+                 max_retry_after: float = 120.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    @staticmethod
+    def status_of(error: BaseException) -> Optional[int]:
+        status = getattr(error, "status_code", None)
+        if status is None:
+            status = getattr(getattr(error, "response", None), "status_code", None)
+        return status
+
+    @staticmethod
+    def retry_after(error: BaseException) -> Optional[float]:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        if not headers:
+            return None
+        value = headers.get("retry-after-ms")
+        if value:
+            try:
+                return float(value) / 1000
+            except ValueError:
+                pass
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                parsed = email.utils.parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return None
+            return max(0.0, parsed.timestamp() - time.time())
+
+    def is_retryable(self, error: BaseException) -> bool:
+        status = self.status_of(error)
+        if status is not None:
+            return status in RETRYABLE_STATUS
+        return isinstance(error, (ConnectionError, TimeoutError)) or type(error).__name__ in RETRYABLE_ERRORS
+
+    def delay(self, attempt: int, error: BaseException) -> Optional[float]:
+        """Seconds to wait before retry number `attempt` (0-based), or None to give up."""
+        if attempt >= self.max_retries or not self.is_retryable(error):
+            return None
+        retry_after = self.retry_after(error)
+        if retry_after is not None:
+            if retry_after > self.max_retry_after:
+                return None
+            return retry_after + random.uniform(0, self.base_delay)
+        # Full jitter keeps clients that failed together from retrying together
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers with the same key get its outcome."""
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]):
+        """Returns (result, shared) where shared tells whether another caller's call was reused."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.waiters += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+        try:
+            flight.result = fn()
+            return flight.result, False
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+
+def request_fingerprint(request: dict) -> str:
+    canonical = json.dumps(request, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(request: dict, completion_tokens: int = 256) -> int:
+    """Rough token cost of a request (4 characters per token) before its usage is known."""
+    characters = len(request.get("prompt") or "") + len(request.get("suffix") or "")
+    for message in request.get("messages") or []:
+        content = message.get("content")
+        characters += len(content) if isinstance(content, str) else len(json.dumps(content, default=str))
+    return characters // 4 + (request.get("max_tokens") or completion_tokens)
+
+
+class RateLimiter:
+    """
+    Args:
+        requests_per_minute (float): Request budget (None: unlimited)
+        tokens_per_minute (float): Token budget (None: unlimited)
+        concurrency (AdaptiveConcurrency): In-flight limit
+        retry (RetryPolicy): Retry policy for throttling and transient errors
+        single_flight (bool): Share one upstream call among identical concurrent requests
+    """
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 concurrency: Optional[AdaptiveConcurrency] = None, retry: Optional[RetryPolicy] = None,
+                 single_flight: bool = True):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.concurrency = concurrency or AdaptiveConcurrency()
+        self.retry = retry or RetryPolicy()
+        self.flights = SingleFlight() if single_flight else None
+        self.stats = {"calls": 0, "upstream": 0, "retries": 0, "throttled": 0, "deduplicated": 0, "failed": 0}
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, prefix: str) -> "RateLimiter":
+        def number(name, cast=float):
+            value = os.getenv(f"{prefix}_{name}")
+            return cast(value) if value else None
+
+        maximum = number("MAX_CONCURRENCY", int) or 16
+        retries = number("MAX_RETRIES", int)
+        return cls(
+            requests_per_minute=number("RPM"),
+            tokens_per_minute=number("TPM"),
+            concurrency=AdaptiveConcurrency(initial=min(4, maximum), maximum=maximum,
+                                            latency_target=number("LATENCY_TARGET")),
+            retry=RetryPolicy(max_retries=4 if retries is None else retries),
+        )
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    def snapshot(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["concurrency_limit"] = round(self.concurrency.limit, 2)
+        stats["in_flight"] = self.concurrency.in_flight
+        return stats
+
+    def call(self, request: dict, send: Callable[[], Any]):
+        """Sends `request` via send(), subject to the budgets, retries and deduplication."""
+        self._count("calls")
+        if self.flights is None or request.get("stream"):
+            return self._send_with_retries(request, send)
+        response, shared = self.flights.do(
+            request_fingerprint(request), lambda: self._send_with_retries(request, send)
+        )
+        if shared:
+            self._count("deduplicated")
+        return response
+
+    def stream(self, request: dict, send: Callable[[], Iterable]) -> Iterator:
+        """
+        Like call() for streamed responses: yields the items of the stream send()
+        opens. The concurrency slot is held until the stream is exhausted or closed,
+        and the whole stream duration is reported as the request's latency.
+        Retries apply to opening the stream only.
+        """
+        self._count("calls")
+        response, started, _ = self._open(request, send)
+        try:
+            yield from response
+        finally:
+            self.concurrency.release(time.perf_counter() - started)
+            close = getattr(response, "close", None)
+            if close is not None:
+                close()  # return the connection when the consumer stops early
+
+    def _send_with_retries(self, request: dict, send: Callable[[], Any]):
+        response, started, cost = self._open(request, send)
+        self.concurrency.release(time.perf_counter() - started)
+
+        usage = getattr(response, "usage", None)
+        if self.tokens is not None and usage is not None and getattr(usage, "total_tokens", None):
+            self.tokens.adjust(cost - usage.total_tokens)
+        return response
+
+    def _open(self, request: dict, send: Callable[[], Any]):
+        """
+        send() within the budgets, with retries. Returns (response, start time, token
+        estimate) with the concurrency slot still held; the caller releases it.
+        """
+        attempt = 0
+        while True:
+            cost = estimate_tokens(request)
+            waited = max(self.requests.reserve(1) if self.requests else 0.0,
+                         self.tokens.reserve(cost) if self.tokens else 0.0)
+            if waited:
+                with tracer.span("llm.throttle", seconds=round(waited, 3)):
+                    time.sleep(waited)
+
+            self.concurrency.acquire()
+            self._count("upstream")
+            started = time.perf_counter()
+            try:
+                response = send()
+            except Exception as e:
+                status = RetryPolicy.status_of(e)
+                self.concurrency.release(time.perf_counter() - started, throttled=status == 429)
+                if status == 429:
+                    self._count("throttled")
+                delay = self.retry.delay(attempt, e)
+                if delay is None:
+                    self._count("failed")
+                    raise
+                self._count("retries")
+                print(f"[RateLimiter] Attempt {attempt + 1} failed ({status or type(e).__name__}); "
+                      f"retrying in {delay:.2f}s")
+                with tracer.span("llm.backoff", attempt=attempt + 1, status=status, seconds=round(delay, 3)):
+                    time.sleep(delay)
+                attempt += 1
+                continue
+            return response, started, cost
@@ -0,0 +1,306 @@
+"""
+Router Module
+
+Latency-aware routing of model calls across providers.
+
+Classes:
+    LatencyStats: Rolling window of latencies and outcomes for one provider at one call site.
+    ModelRouter: generate()/agenerate() like DeepSeekModel, sent to the provider
+                 that is currently fastest and healthiest for its call site, with
+                 hedging and failover.
+
+Functions:
+    build_model: The model for a call site; a plain DeepSeekModel unless
+                 MODEL_PROVIDERS lists several providers.
+
+Routing:
+    - Providers are ranked by recent median latency, inflated by their error rate.
+      Providers with too few samples keep their configured order, behind
+      measured providers that are faster than `default_latency`; a share
+      (`explore_rate`) of calls goes to them first so they get measured.
+    - A provider whose recent error rate exceeds `max_error_rate` is skipped for
+      `cooldown` seconds (it is still used when nothing else is left).
+    - Hedging: when the primary has not answered after the `hedge_percentile`
+      of its recent latencies, the same call is also sent to the next provider;
+      the first answer wins and the other is abandoned (its latency is not
+      recorded, since it is only a lower bound).
+    - Failover: when a call fails, the next provider is tried.
+
+Configuration (environment):
+    MODEL_PROVIDERS=deepseek,claude    Providers in order of preference (default: deepseek)
+
+Example Usage:
+    model = build_model(system_prompt="...", call_site="manager")
+    answer = model.generate("Add lunch on Friday to my calendar")
+    print(router_stats())
+
+Note:
+    Provider calls run on a dedicated thread pool. An abandoned (hedged or
+    timed out) call finishes in the background and its answer is discarded.
+    generate() is for code outside an event loop; async callers await agenerate().
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from modules.telemetry.tracing import tracer
+
+PROVIDERS = {
+    "deepseek": ("modules.ai_modules.models.deepseek", "DeepSeekModel"),
+    "claude": ("modules.ai_modules.models.claude", "ClaudeModel"),
+    "openai": ("modules.ai_modules.models.openai", "OpenAIModel"),
+    "ollama": ("modules.ai_modules.models.ollama", "OllamaModel"),
+}
+
+_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="model-router")
+
+
+class LatencyStats:
+    """Rolling window of (latency, ok) samples."""
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+        self.open_until = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self.samples.append((latency, ok))
+
+    @property
+    def count(self) -> int:
+        return len(self.samples)
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self.samples:
+                return 0.0
+            return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            latencies = sorted(latency for latency, ok in self.samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(round(pct / 100 * (len(latencies) - 1))))]
+
+    def snapshot(self) -> dict:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "samples": self.count,
+            "error_rate": round(self.error_rate(), 3),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "circuit_open": self.open_until > time.monotonic(),
+        }
+
+
+# Shared by all routers, so a router built per message still learns from earlier calls
+_stats: Dict[Tuple[str, str], LatencyStats] = {}
+_stats_lock = threading.Lock()
+
+
+def stats_for(call_site: str, provider: str) -> LatencyStats:
+    with _stats_lock:
+        stats = _stats.get((call_site, provider))
+        if stats is None:
+            stats = _stats[(call_site, provider)] = LatencyStats()
+        return stats
+
+
+def router_stats() -> Dict[str, Dict[str, dict]]:
+    """{call_site: {provider: snapshot}} for every call site seen so far."""
+    with _stats_lock:
+        items = list(_stats.items())
+    report: Dict[str, Dict[str, dict]] = {}
+    for (call_site, provider), stats in items:
+        report.setdefault(call_site, {})[provider] = stats.snapshot()
+    return report
+
+
+class ModelRouter:
+    """
+    Args:
+        providers (dict): Provider name -> model with generate(); insertion order is the preference
+        call_site (str): Key for the latency statistics
+        prompt_type (str): Prompt type callers should use with this model
+        hedge_percentile (float): Latency percentile of the primary after which a backup is sent (None: no hedging)
+        min_hedge_delay (float): Lower bound for the hedge delay
+        min_samples (int): Samples before a provider is ranked and hedged by its own latency
+        default_latency (float): Assumed latency of providers with too few samples
+        max_error_rate (float): Error rate above which a provider is skipped for `cooldown` seconds
+        cooldown (float): Seconds an unhealthy provider is skipped
+        explore_rate (float): Share of calls sent first to a provider with too few samples
+    """
+    def __init__(self, providers: Dict[str, object], call_site: str = "default", prompt_type: str = "conversation",
+                 hedge_percentile: Optional[float] = 95.0, min_hedge_delay: float = 0.05, min_samples: int = 10,
+                 default_latency: float = 5.0, max_error_rate: float = 0.5, cooldown: float = 30.0,
+                 explore_rate: float = 0.05):
+        if not providers:
+            raise ValueError("ModelRouter needs at least one provider")
+        self.providers = providers
+        self.call_site = call_site
+        self.prompt_type = prompt_type
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self.default_latency = default_latency
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        self.explore_rate = explore_rate
+        self.hedges = 0
+        self.failovers = 0
+
+    @property
+    def prompt_types(self) -> Tuple[str, ...]:
+        """Prompt types at least one provider supports, so callers can check them like on a single model."""
+        types = {}
+        for model in self.providers.values():
+            types.update(dict.fromkeys(getattr(model, "prompt_types", ())))
+        return tuple(types)
+
+    def _stats(self, provider: str) -> LatencyStats:
+        return stats_for(self.call_site, provider)
+
+    def rank(self, prompt_type: str):
+        """Providers able to serve `prompt_type`, best first."""
+        now = time.monotonic()
+        ranked = []
+        for index, (name, model) in enumerate(self.providers.items()):
+            if prompt_type not in getattr(model, "prompt_types", (prompt_type,)):
+                continue
+            stats = self._stats(name)
+            median = stats.percentile(50) if stats.count >= self.min_samples else None
+            if median is None:
+                estimate = self.default_latency * (1 + index)
+            else:
+                estimate = median * (1 + 4 * stats.error_rate())
+            ranked.append((stats.open_until > now, estimate, index, name))
+        ranked.sort()
+        order = [name for *_, name in ranked]
+        if self.explore_rate and random.random() < self.explore_rate:
+            unmeasured = [name for is_open, _, _, name in ranked[1:]
+                          if not is_open and self._stats(name).count < self.min_samples]
+            if unmeasured:
+                order.remove(unmeasured[0])
+                order.insert(0, unmeasured[0])
+        return order
+
+    def _hedge_delay(self, provider: str) -> Optional[float]:
+        if self.hedge_percentile is None:
+            return None
+        stats = self._stats(provider)
+        if stats.count < self.min_samples:
+            return None
+        delay = stats.percentile(self.hedge_percentile)
+        return None if delay is None else max(self.min_hedge_delay, delay)
+
+    def _record(self, provider: str, latency: float, ok: bool):
+        stats = self._stats(provider)
+        stats.record(latency, ok)
+        if not ok and stats.count >= self.min_samples and stats.error_rate() > self.max_error_rate:
+            stats.open_until = time.monotonic() + self.cooldown
+            print(f"[ModelRouter] {provider} is failing at {self.call_site}; skipping it for {self.cooldown:.0f}s")
+
+    async def agenerate(self, text: str, prompt_type: Optional[str] = None, **kwargs):
+        """Like DeepSeekModel.agenerate; prompt_type defaults to the router's prompt_type."""
+        prompt_type = prompt_type or self.prompt_type
+        order = self.rank(prompt_type)
+        if not order:
+            raise ValueError(f"No provider supports prompt type '{prompt_type}'")
+        loop = asyncio.get_running_loop()
+        pending: Dict[asyncio.Future, Tuple[str, float]] = {}
+        last_error: Optional[BaseException] = None
+
+        def launch():
+            name = order.pop(0)
+            model = self.providers[name]
+            call = functools.partial(model.generate, text, prompt_type=prompt_type, **kwargs)
+            # Copy the context so spans recorded by the provider join the current trace
+            future = loop.run_in_executor(_pool, functools.partial(contextvars.copy_context().run, call))
+            pending[future] = (name, time.perf_counter())
+            return name
+
+        primary = launch()
+        hedged = False
+        with tracer.span("router.generate", call_site=self.call_site, primary=primary) as span:
+            while pending:
+                timeout = None
+                if not hedged and order and len(pending) == 1:
+                    (current, started), = pending.values()
+                    delay = self._hedge_delay(current)
+                    if delay is not None:
+                        timeout = max(0.0, started + delay - time.perf_counter())
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    self.hedges += 1
+                    span.set(hedged_to=launch())
+                    continue
+
+                for future in done:
+                    name, started = pending.pop(future)
+                    latency = time.perf_counter() - started
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        self._record(name, latency, ok=False)
+                        last_error = e
+                        print(f"[ModelRouter] {name} failed at {self.call_site}: {e}")
+                        continue
+                    self._record(name, latency, ok=True)
+                    for other in pending:
+                        # The loser's latency is censored (only a lower bound), so it is not recorded
+                        other.cancel()
+                    span.set(provider=name)
+                    return result
+
+                if not pending and order:
+                    self.failovers += 1
+                    span.set(failover_to=launch())
+        raise last_error
+
+    def generate(self, text: str, prompt_type: Optional[str] = None, **kwargs):
+        """
+        Synchronous entry point, compatible with DeepSeekModel.generate.
+        prompt_type defaults to the router's prompt_type.
+
+        Raises RuntimeError when called from inside a running event loop, which
+        it would block; await agenerate() there, or call this via asyncio.to_thread.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.agenerate(text, prompt_type=prompt_type, **kwargs))
+        raise RuntimeError(
+            "ModelRouter.generate() would block the running event loop; "
+            "await agenerate() or call generate() through asyncio.to_thread()"
+        )
+
+
+def load_provider(name: str):
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown model provider '{name}', expected one of {sorted(PROVIDERS)}")
+    module_name, class_name = PROVIDERS[name]
+    module = __import__(module_name, fromlist=[class_name])
+    return getattr(module, class_name)
+
+
+def build_model(system_prompt: str, call_site: str, prompt_type: str = "conversation", providers=None, **router_options):
+    """
+    Returns the model for a call site: the single configured provider, or a
+    ModelRouter over all of them (MODEL_PROVIDERS, default: deepseek).
+    """
+    if providers is None:
+        providers = [p.strip() for p in os.getenv("MODEL_PROVIDERS", "deepseek").split(",") if p.strip()]
+    models = {name: load_provider(name)(system_prompt=system_prompt, prompt_type=prompt_type) for name in providers}
+    if len(models) == 1:
+        return next(iter(models.values()))
+    return ModelRouter(models, call_site=call_site, prompt_type=prompt_type, **router_options)
@@ -0,0 +1,80 @@
+"""
+Schemas Module
+
+pydantic models for the structured answers of the pipeline, validated by
+structured.run_structured.
+
+Classes:
+    Intent: One part of a message with its intent.
+    Delegation: The manager a task is assigned to.
+    WorkflowChoice: The workflow a manager picked and its params.
+
+Functions:
+    workflow_params_model: pydantic model of one workflow's params, built from its
+                           managers_config entry once and cached.
+
+Note:
+    Models are compiled at import (BaseModel classes) or on first use (workflow
+    params), so validating an answer never rebuilds a schema.
+"""
+
+import threading
+from datetime import datetime
+from typing import Annotated, Any, Dict, List, Literal, Optional, Tuple
+
+from pydantic import AfterValidator, BaseModel, Field, create_model
+
+
+class Intent(BaseModel):
+    content: str = Field(description="Part of the prompt relevant to the intent")
+    intent: Literal["general", "delegate_tasks"]
+
+
+Intents = List[Intent]
+
+
+class Delegation(BaseModel):
+    manager: str = Field(description="Manager name, e.g. Eric")
+    task: str = Field(description="Task description with resolved absolute dates")
+
+
+class WorkflowChoice(BaseModel):
+    workflow: str
+    params: Dict[str, Any] = Field(default_factory=dict)
+
+
+def _rfc3339(value: str) -> str:
+    try:
+        datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError("must be an RFC3339 date-time, e.g. 2025-01-31T14:00:00+01:00")
+    return value
+
+
+RFC3339 = Annotated[str, AfterValidator(_rfc3339)]
+
+_params_models: Dict[Tuple[str, str], type] = {}
+_params_lock = threading.Lock()
+
+
+def _field(description: str):
+    """(type, default) of a param from its managers_config description, e.g. "string (optional)"."""
+    optional = "optional" in description
+    annotation = RFC3339 if "RFC3339" in description else str
+    if optional:
+        return Optional[annotation], None
+    return annotation, ...
+
+
+def workflow_params_model(manager: str, workflow: dict) -> type:
+    """The params model of a managers_config workflow entry."""
+    key = (manager, workflow["name"])
+    model = _params_models.get(key)
+    if model is None:
+        with _params_lock:
+            model = _params_models.get(key)
+            if model is None:
+                fields = {name: _field(description) for name, description in workflow.get("params", {}).items()}
+                class_name = "".join(part.capitalize() for part in workflow["name"].split()) + "Params"
+                model = _params_models[key] = create_model(class_name, **fields)
+    return model
@@ -0,0 +1,418 @@
+"""
+Structured Output Module
+
+Turns model answers into validated objects: a tolerant local JSON extractor
+first, and a targeted re-ask only when local repair is not enough.
+
+Classes:
+    StructuredOutputError: The answer could not be turned into the schema.
+    StructuredStats: Per-schema counts of clean, repaired, re-asked and failed answers.
+    IncrementalObject: Reports the top-level members of a streamed JSON object as
+                       soon as each one is complete.
+
+Functions:
+    extract_json: Parses JSON out of a model answer, repairing common defects.
+    validate: Validates a parsed value against a pydantic model or type.
+    collect_stream: Joins streamed deltas into the answer, reporting completed members on the way.
+    run_structured: The ask -> parse -> validate -> (re-ask) loop used by the models'
+                    structured_prompt().
+
+Local repair handles:
+    - ```json fences and text before or after the JSON
+    - single-quoted strings, unquoted keys, Python True/False/None, trailing commas
+    - raw newlines inside strings
+    - answers cut off mid-way (open strings and brackets are closed)
+
+Example Usage:
+    from modules.ai_modules.models.schemas import Delegation
+    delegation = DeepSeekModel().structured_prompt(task, Delegation, system_prompt=prompt)
+    print(delegation.manager, structured_stats.snapshot())
+
+Note:
+    This module imports pydantic only on first validation, but the schemas it
+    validates against (schemas.py) import it at module level, so it is loaded
+    as soon as a schema is imported (e.g. by BaseManager). Outcomes are also
+    exported as the structured_output_total counter on /metrics.
+    Members reported while streaming are unvalidated hints (e.g. to warm up the
+    chosen workflow early); the complete answer is still parsed and validated.
+"""
+
+import json
+import threading
+import typing
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from modules.telemetry.tracing import tracer
+
+CLEAN = "clean"          # valid JSON matching the schema on the first answer
+REPAIRED = "repaired"    # fixed locally, no extra model call
+REASKED = "reasked"      # valid after one or more correction prompts
+FAILED = "failed"        # still invalid after the last correction
+
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+class StructuredOutputError(ValueError):
+    """The model answer could not be parsed or validated."""
+
+
+class StructuredStats:
+    def __init__(self):
+        self._counts: Dict[Tuple[str, str], int] = {}
+        self._reasks: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, schema: str, outcome: str, reasks: int = 0):
+        with self._lock:
+            self._counts[(schema, outcome)] = self._counts.get((schema, outcome), 0) + 1
+            self._reasks[schema] = self._reasks.get(schema, 0) + reasks
+        tracer.metrics.increment("structured_output_total", "Structured model outputs by outcome.",
+                                 schema=schema, outcome=outcome)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """{schema: counts, re-asks sent and repair / re-ask / failure rates}"""
+        with self._lock:
+            counts = dict(self._counts)
+            reasks = dict(self._reasks)
+        report: Dict[str, dict] = {}
+        for (schema, outcome), count in counts.items():
+            report.setdefault(schema, {CLEAN: 0, REPAIRED: 0, REASKED: 0, FAILED: 0})[outcome] = count
+        for schema, entry in report.items():
+            total = sum(entry.values())
+            entry["reasks_sent"] = reasks.get(schema, 0)
+            entry["repair_rate"] = round(entry[REPAIRED] / total, 3)
+            entry["reask_rate"] = round((entry[REASKED] + entry[FAILED]) / total, 3)
+            entry["failure_rate"] = round(entry[FAILED] / total, 3)
+        return report
+
+
+structured_stats = StructuredStats()
+
+
+# ---- Tolerant extraction -------------------------------------------------
+
+def _json_start(text: str) -> int:
+    starts = [index for index in (text.find("{"), text.find("[")) if index != -1]
+    return min(starts) if starts else -1
+
+
+def _strip_trailing_comma(out: List[str]):
+    while out and out[-1] in " \t\r\n":
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def repair_json(text: str) -> str:
+    """
+    Rewrites the JSON value at the start of `text` into strict JSON in one pass:
+    converts single quotes and Python literals, drops trailing commas, escapes raw
+    newlines in strings, ignores text after the value and closes a truncated value.
+    """
+    out: List[str] = []
+    closers: List[str] = []
+    quote = None  # quote character of the string being copied
+    index, length = 0, len(text)
+    while index < length:
+        char = text[index]
+        if quote is not None:
+            if char == "\\" and index + 1 < length:
+                following = text[index + 1]
+                # \' is not a JSON escape
+                out.append("'" if following == "'" else char + following)
+                index += 2
+                continue
+            if char == quote:
+                out.append('"')
+                quote = None
+            elif char == '"':
+                out.append('\\"')
+            elif char == "\n":
+                out.append("\\n")
+            elif char == "\t":
+                out.append("\\t")
+            else:
+                out.append(char)
+            index += 1
+            continue
+
+        if char in "\"'":
+            quote = char
+            out.append('"')
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+            out.append(char)
+        elif char in "}]":
+            _strip_trailing_comma(out)
+            if closers:
+                closers.pop()
+                out.append(char)
+            if not closers:
+                return "".join(out)  # anything after the value is ignored
+        elif char.isalpha():
+            end = index
+            while end < length and (text[end].isalnum() or text[end] == "_"):
+                end += 1
+            word = text[index:end]
+            following = end
+            while following < length and text[following] in " \t":
+                following += 1
+            if following < length and text[following] == ":":
+                out.append(f'"{word}"')  # unquoted key
+            else:
+                out.append(_LITERALS.get(word, word))
+            index = end
+            continue
+        else:
+            out.append(char)
+        index += 1
+
+    # Truncated answer: close the open string and brackets
+    if quote is not None:
+        if out and out[-1] == "\\":
+            out.pop()
+        out.append('"')
+    _strip_trailing_comma(out)
+    if out and out[-1] == ":":
+        out.append("null")
+    for closer in reversed(closers):
+        _strip_trailing_comma(out)
+        out.append(closer)
+    return "".join(out)
+
+
+def extract_json(text: Any) -> Tuple[Any, bool]:
+    """
+    (value, repaired) for a model answer. Strict JSON parses on the fast path;
+    otherwise the first JSON object or array in the text is repaired and parsed.
+    """
+    if not isinstance(text, str):
+        return text, False  # already parsed (e.g. json_prompt's dict)
+    try:
+        return json.loads(text), False
+    except ValueError:
+        pass
+    start = _json_start(text)
+    if start == -1:
+        raise StructuredOutputError("The answer contains no JSON object or array.")
+    try:
+        return json.loads(repair_json(text[start:])), True
+    except ValueError as e:
+        raise StructuredOutputError(f"The answer is not valid JSON ({e}).") from e
+
+
+# ---- Streaming -------------------------------------------------------------
+
+class IncrementalObject:
+    """
+    Scans a JSON object while it streams in and returns each top-level member as
+    soon as its value is complete, e.g. {"workflow": ...} while "params" is still
+    being generated. Every character is looked at once.
+
+    Text before the object is skipped. Members that are not strict JSON are not
+    reported; repair is left to extract_json on the complete answer.
+    """
+    def __init__(self):
+        self.text = ""
+        self.done = False       # the object is closed (or the answer is not an object)
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._expect = "key"    # key, colon, value or comma, at depth 1
+        self._start: Optional[int] = None
+        self._key: Optional[str] = None
+
+    def _member(self, end: int, members: List[Tuple[str, Any]]):
+        try:
+            members.append((self._key, json.loads(self.text[self._start:end])))
+        except ValueError:
+            pass
+        self._start = None
+        self._expect = "comma"
+
+    def feed(self, delta: str) -> List[Tuple[str, Any]]:
+        """Adds a delta; returns the (key, value) members it completed."""
+        members: List[Tuple[str, Any]] = []
+        self.text += delta
+        if self.done:
+            return members
+        text = self.text
+        for index in range(self._position, len(text)):
+            char = text[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._start is not None:
+                        if self._expect == "key":
+                            try:
+                                self._key = json.loads(text[self._start:index + 1])
+                            except ValueError:
+                                self._key = None
+                            self._start = None
+                            self._expect = "colon"
+                        elif self._expect == "value":
+                            self._member(index + 1, members)
+                continue
+
+            if self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                elif char == "[":
+                    self.done = True
+                    break
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect in ("key", "value"):
+                    self._start = index
+            elif char in "{[":
+                if self._depth == 1 and self._expect == "value":
+                    self._start = index
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._expect == "value" and self._start is not None:
+                    self._member(index + 1, members)
+                elif self._depth == 0:
+                    if self._expect == "value" and self._start is not None:
+                        self._member(index, members)
+                    self.done = True
+                    break
+            elif self._depth == 1:
+                if char == ":" and self._expect == "colon":
+                    self._expect = "value"
+                elif char == ",":
+                    if self._expect == "value" and self._start is not None:
+                        self._member(index, members)
+                    self._expect = "key"
+                elif self._expect == "value" and self._start is None and not char.isspace():
+                    self._start = index  # number or literal
+        self._position = len(text)
+        return members
+
+
+def collect_stream(deltas: Iterable[str], on_member: Optional[Callable[[str, Any], None]] = None) -> str:
+    """Joins the deltas of a streamed answer, calling on_member(key, value) for each completed top-level member."""
+    if on_member is None:
+        return "".join(deltas)
+    parser = IncrementalObject()
+    for delta in deltas:
+        for key, value in parser.feed(delta):
+            on_member(key, value)
+    return parser.text
+
+
+# ---- Validation ----------------------------------------------------------
+
+_adapters: Dict[Any, Any] = {}
+_adapters_lock = threading.Lock()
+
+
+def _adapter(schema: Any):
+    """A cached pydantic TypeAdapter for types that are not BaseModel classes (e.g. List[Intent])."""
+    adapter = _adapters.get(schema)
+    if adapter is None:
+        from pydantic import TypeAdapter
+        with _adapters_lock:
+            adapter = _adapters.get(schema)
+            if adapter is None:
+                adapter = _adapters[schema] = TypeAdapter(schema)
+    return adapter
+
+
+def schema_name(schema: Any) -> str:
+    name = getattr(schema, "__name__", None)
+    if name and typing.get_origin(schema) is None:
+        return name
+    arguments = ", ".join(schema_name(argument) for argument in typing.get_args(schema))
+    return f"{getattr(typing.get_origin(schema), '__name__', 'type')}[{arguments}]"
+
+
+def expects_list(schema: Any) -> bool:
+    return typing.get_origin(schema) in (list, List)
+
+
+def validate(value: Any, schema: Any) -> Any:
+    """Validates a parsed value; raises pydantic's ValidationError (a ValueError)."""
+    if expects_list(schema) and isinstance(value, dict) and len(value) == 1:
+        # JSON mode makes some models wrap a list: {"items": [...]}
+        (inner,) = value.values()
+        if isinstance(inner, list):
+            value = inner
+    if hasattr(schema, "model_validate"):
+        return schema.model_validate(value)
+    return _adapter(schema).validate_python(value)
+
+
+def describe_error(error: Exception, prefix: str = "") -> str:
+    """One line per problem, with the field path when pydantic reports one."""
+    errors = getattr(error, "errors", None)
+    if callable(errors):
+        lines = []
+        for problem in errors():
+            location = ".".join(str(part) for part in problem.get("loc", ()))
+            location = f"{prefix}.{location}" if prefix and location else (location or prefix)
+            lines.append(f"- {location or 'value'}: {problem.get('msg')}")
+        return "\n".join(lines)
+    message = str(error)
+    if message.startswith("- "):
+        return message  # already described, e.g. by a check
+    return f"- {prefix + ': ' if prefix else ''}{message}"
+
+
+def correction_prompt(error: Exception) -> str:
+    return (
+        "Your previous answer could not be used:\n"
+        f"{describe_error(error)}\n"
+        "Reply with the corrected JSON only, keeping everything that was correct."
+    )
+
+
+# ---- The structured call -------------------------------------------------
+
+def run_structured(ask: Callable[[List[Dict[str, str]]], str], messages: List[Dict[str, str]], schema: Any,
+                   max_reasks: int = 1, check: Optional[Callable[[Any], Any]] = None) -> Any:
+    """
+    Asks, parses and validates; on failure sends the errors back as a targeted
+    correction, at most `max_reasks` times.
+
+    :param ask:      Sends the messages and returns the answer text.
+    :param messages: The conversation so far; corrections are appended to a copy.
+    :param check:    Extra validation of the validated object; raise ValueError to
+                     trigger a correction, or return a replacement object.
+    """
+    name = schema_name(schema)
+    messages = list(messages)
+    error: Optional[Exception] = None
+    for attempt in range(max_reasks + 1):
+        answer = ask(messages)
+        with tracer.span("json.parse", stage=name, attempt=attempt) as span:
+            try:
+                value, repaired = extract_json(answer)
+                result = validate(value, schema)
+                if check is not None:
+                    checked = check(result)
+                    result = result if checked is None else checked
+            except ValueError as e:
+                error = e
+                span.set(outcome="invalid", error=str(e)[:200])
+            else:
+                outcome = REASKED if attempt else (REPAIRED if repaired else CLEAN)
+                span.set(outcome=outcome)
+                structured_stats.record(name, outcome, reasks=attempt)
+                return result
+        if attempt < max_reasks:
+            problems = describe_error(error).replace("\n", " ")
+            print(f"[Structured] {name} answer invalid, asking for a correction: {problems}")
+            messages += [
+                {"role": "assistant", "content": answer if isinstance(answer, str) else json.dumps(answer)},
+                {"role": "user", "content": correction_prompt(error)},
+            ]
+    structured_stats.record(name, FAILED, reasks=max_reasks)
+    raise StructuredOutputError(f"{name}: no valid answer after {max_reasks} corrections:\n{describe_error(error)}")
@@ -1,6 +1,47 @@
-import whisper
+import threading
+from typing import Dict, List
+
+# Loaded whisper models not in use, per model name. A model is used by one
+# transcription at a time (decoding installs hooks on the model), so parallel
+# transcriptions each check out their own instance.
+_idle_models: Dict[str, List] = {}
+_models_lock = threading.Lock()
+
+
+def _checkout(model_str):
+    with _models_lock:
+        idle = _idle_models.get(model_str)
+        if idle:
+            return idle.pop()
+    # Imported here: whisper pulls in PyTorch, which takes seconds to load
+    import whisper
+    return whisper.load_model(model_str)
+
+
+def _checkin(model_str, model):
+    with _models_lock:
+        _idle_models.setdefault(model_str, []).append(model)
+
 
 def transcribe_audio(file, model_str):
-    model = whisper.load_model(model_str)
-    result = model.transcribe(file)
-    return result
\ No newline at end of file
+    """Transcribes an audio file, reusing a loaded model when one is free."""
+    model = _checkout(model_str)
+    try:
+        return model.transcribe(file)
+    finally:
+        _checkin(model_str, model)
+
+
+def preload(model_str, copies=1, dummy_inference=True):
+    """
+    Loads `copies` instances of a model ahead of the first voice note, and runs
+    one inference on a second of silence so PyTorch initializes its kernels.
+    """
+    models = [_checkout(model_str) for _ in range(copies)]
+    try:
+        if dummy_inference and models:
+            import numpy
+            models[0].transcribe(numpy.zeros(16000, dtype=numpy.float32))
+    finally:
+        for model in models:
+            _checkin(model_str, model)
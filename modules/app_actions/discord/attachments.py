@@ -0,0 +1,140 @@
+"""
+Attachments Module
+
+Turns the attachments of a Discord message into text for evaluate_message.
+
+Classes:
+    AttachmentResult: Transcript (or error) of one attachment.
+
+Functions:
+    select_attachments: Splits attachments into those to process and those skipped,
+                        using the content type and size Discord reports, before
+                        anything is downloaded.
+    process_attachments: Downloads and transcribes the selected attachments concurrently.
+    merge_message: Combines the message text and the transcripts into one prompt.
+
+Configuration (environment):
+    ATTACHMENT_MAX_BYTES=26214400   Larger attachments are skipped (default 25 MB)
+    ATTACHMENT_CONCURRENCY=4        Downloads in flight per message
+    TRANSCRIBE_CONCURRENCY=2        Transcriptions running at once, across messages
+    WHISPER_MODEL=tiny              Whisper model used for voice notes
+
+Example Usage:
+    results = await process_attachments(message.attachments)
+    prompt = merge_message(message.content, results)
+
+Note:
+    Each attachment is transcribed as soon as its own download finishes, so
+    downloads and transcriptions overlap. Files go to a temporary directory per
+    message, named by attachment id, and are removed afterwards.
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from modules.ai_modules.speech_to_text import transcribe_audio
+from modules.telemetry.tracing import tracer
+
+AUDIO_EXTENSIONS = (".ogg", ".mp3", ".wav", ".m4a", ".webm")
+
+DEFAULT_MAX_BYTES = 25 * 1024 * 1024
+
+# Shared by all messages (and event loops), so concurrent messages do not oversubscribe the CPU
+_transcribe_slots: Optional[threading.BoundedSemaphore] = None
+_slots_lock = threading.Lock()
+
+
+def whisper_model() -> str:
+    return os.getenv("WHISPER_MODEL", "tiny")
+
+
+class AttachmentResult(NamedTuple):
+    filename: str
+    text: Optional[str]   # transcript, None on failure
+    error: Optional[str]
+
+
+def is_audio(attachment) -> bool:
+    content_type = (getattr(attachment, "content_type", None) or "").split(";")[0].strip().lower()
+    if content_type:
+        return content_type.startswith("audio/")
+    return attachment.filename.lower().endswith(AUDIO_EXTENSIONS)
+
+
+def select_attachments(attachments: Iterable, max_bytes: Optional[int] = None) -> Tuple[list, List[str]]:
+    """(attachments to process, reasons for the skipped ones)"""
+    max_bytes = max_bytes or int(os.getenv("ATTACHMENT_MAX_BYTES", str(DEFAULT_MAX_BYTES)))
+    selected, skipped = [], []
+    for attachment in attachments:
+        if not is_audio(attachment):
+            skipped.append(f"{attachment.filename}: unsupported type {attachment.content_type or 'unknown'}")
+        elif attachment.size > max_bytes:
+            skipped.append(f"{attachment.filename}: {attachment.size} bytes exceeds {max_bytes}")
+        else:
+            selected.append(attachment)
+    return selected, skipped
+
+
+def _transcribe(path: str, model: str) -> str:
+    """Runs on a worker thread; waits for a free transcription slot."""
+    global _transcribe_slots
+    if _transcribe_slots is None:
+        with _slots_lock:
+            if _transcribe_slots is None:
+                _transcribe_slots = threading.BoundedSemaphore(int(os.getenv("TRANSCRIBE_CONCURRENCY", "2")))
+    with _transcribe_slots:
+        with tracer.span("transcription", model=model) as span:
+            text = (transcribe_audio(path, model).get("text") or "").strip()
+            span.set(characters=len(text))
+    return text
+
+
+async def _process_one(attachment, directory: str, downloads: asyncio.Semaphore) -> AttachmentResult:
+    # Named by id: attachment filenames are user-controlled and need not be unique
+    path = os.path.join(directory, f"{attachment.id}{os.path.splitext(attachment.filename)[1]}")
+    try:
+        async with downloads:
+            with tracer.span("attachment.download", size=attachment.size):
+                await attachment.save(path)
+        text = await asyncio.to_thread(_transcribe, path, whisper_model())
+        return AttachmentResult(attachment.filename, text, None)
+    except Exception as e:
+        print(f"[Attachments] {attachment.filename} failed: {e}")
+        return AttachmentResult(attachment.filename, None, str(e))
+
+
+async def process_attachments(attachments: Iterable, max_bytes: Optional[int] = None,
+                              concurrency: Optional[int] = None) -> List[AttachmentResult]:
+    """Transcripts of the message's audio attachments, in attachment order."""
+    selected, skipped = select_attachments(attachments, max_bytes)
+    concurrency = concurrency or int(os.getenv("ATTACHMENT_CONCURRENCY", "4"))
+    for reason in skipped:
+        print(f"[Attachments] Skipped {reason}")
+    if not selected:
+        return []
+
+    directory = tempfile.mkdtemp(prefix="attachments-")
+    downloads = asyncio.Semaphore(concurrency)
+    try:
+        with tracer.span("attachments", count=len(selected), skipped=len(skipped)):
+            return list(await asyncio.gather(*(_process_one(a, directory, downloads) for a in selected)))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def merge_message(content: str, results: List[AttachmentResult]) -> str:
+    """
+    The message text followed by the transcripts. A lone voice note without text
+    is passed on as is; otherwise each transcript is labelled with its file name.
+    """
+    transcripts = [result for result in results if result.text]
+    content = (content or "").strip()
+    if not content and len(transcripts) == 1:
+        return transcripts[0].text
+    parts = [content] if content else []
+    parts += [f"Voice note ({result.filename}): {result.text}" for result in transcripts]
+    return "\n\n".join(parts)
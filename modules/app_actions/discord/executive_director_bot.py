@@ -1,12 +1,19 @@
-import json
+import asyncio
 import os
 import discord
 from discord.ext import commands
 from dotenv import load_dotenv
-from modules.ai_modules.models.deepseek import DeepSeekModel
-from modules.ai_modules.speech_to_text import transcribe_audio
+from modules.ai_modules.models.router import build_model
+from modules.ai_modules.models.schemas import Delegation, Intents
+from modules.ai_modules.models.structured import StructuredOutputError
+from modules.app_actions.discord.attachments import merge_message, process_attachments
+from modules.app_actions.discord.warm_up import WarmUp
 from agents.managers.base_manager import BaseManager
 from agents.managers.manager_config import managers_config
+from agents.context_builder import ContextBuilder, memory_parts
+from agents.memory import ConversationMemory
+from workflows.run_journal import RunJournal
+from modules.telemetry.tracing import tracer
 from datetime import datetime
 
 
@@ -21,6 +28,16 @@ intents.messages = True  # Enable message-related events
 intents.message_content = True  # Needed to read message content
 bot = commands.Bot(command_prefix="!", intents=intents)
 
+# Journal of delegated workflow runs, for crash resume and duplicate deliveries
+run_journal = RunJournal()
+
+# Earlier exchanges per channel, added as context to general questions
+conversation_memory = ConversationMemory()
+context_builder = ContextBuilder()
+
+# Models, connections and credentials loaded at startup; messages wait for it
+warm_up = WarmUp.from_env()
+
 hierarchy = '''
 **Hierarchy**
 Apricot Labs exists of:
@@ -37,9 +54,36 @@ async def show_workforce(ctx):
     await ctx.send(hierarchy)
 
 # Events
+@bot.event
+async def setup_hook():
+    # Runs before the gateway connection, so the warm-up overlaps with connecting
+    warm_up.start()
+
+# on_ready fires again after every gateway reconnect; interrupted runs are resumed once per process,
+# and only runs left by earlier processes (the journal's own ones are still being handled)
+runs_resumed = False
+
 @bot.event
 async def on_ready():
+    global runs_resumed
     print(f'Bot connected as {bot.user}')
+    await warm_up.wait()
+    if not runs_resumed:
+        runs_resumed = True
+        await resume_incomplete_runs()
+
+async def resume_incomplete_runs():
+    """Finish workflow runs that were interrupted by a restart"""
+    for record in run_journal.abandoned():
+        channel = bot.get_channel(record.channel_id) if record.channel_id else None
+        print(f"[Bot] Resuming interrupted run {record.key} for {record.manager}")
+        manager_instance = build_manager(record.manager)
+        manager_result = await asyncio.to_thread(
+            manager_instance.run,
+            text=record.task, run_key=record.key, message_key=record.message_key, channel_id=record.channel_id,
+        )
+        if channel is not None:
+            await channel.send(f"**{record.manager}:** {manager_result}")
 
 @bot.event
 async def on_message(message):
@@ -55,41 +99,78 @@ async def on_message(message):
         print("Unauthorized guild")
         return
 
+    # Messages arriving during startup are queued here rather than served cold
+    await warm_up.wait()
+
+    # Every span recorded while handling this message shares one trace id
+    with tracer.trace(message_id=message.id, channel_id=message.channel.id):
+        await handle_message(message)
+
+async def handle_message(message):
     # Print the message content for debugging
     print(str(message.content))
 
-    # Process attachments
+    # Serve duplicate deliveries of an already handled message from the journal
+    message_key = RunJournal.message_key("discord", message.guild.id, message.channel.id, message.id)
+    journaled_runs = run_journal.for_message(message_key)
+    if journaled_runs:
+        print(f"[Bot] Message {message.id} was already handled; serving {len(journaled_runs)} journaled runs")
+        for record in journaled_runs:
+            if record.finished:
+                await message.channel.send(f"**{record.manager}:** {record.output}")
+        return
+
+    # Text and voice notes are evaluated together, in one routing pass
+    text = "" if message.content.startswith("!") else message.content
     if message.attachments:
-        for attachment in message.attachments:
-            # Check if the attachment is an audio file (e.g., .ogg, .mp3)
-            if attachment.filename.endswith(('.ogg', '.mp3', '.wav')):
-                # Save the file to the local project directory
-                file_path = f"{attachment.filename}"
-                await attachment.save(file_path)
-                print(f"Downloaded voice message: {file_path}")
-                transcription = transcribe_audio(file_path, 'tiny')
-                text = transcription.get('text')
-                #evaluate transribed message
-                await evaluate_message(text, message.channel)
-                os.remove(file_path)
-                return
-
-    # Process non-command messages
-    if not message.content.startswith("!"):
-        await evaluate_message(message.content, message.channel)
+        results = await process_attachments(message.attachments)
+        text = merge_message(text, results)
+    if text.strip():
+        await evaluate_message(text, message.channel, message_key)
 
 
 def conversation_from_message(message, system_prompt):
-    messages = [
-        {
-            "role": "user",
-            "content": message
-        }
-    ]
-    results = DeepSeekModel.conversational_prompt(DeepSeekModel, messages=messages, system_prompt=system_prompt)
-    return results
-
-async def evaluate_message(message, channel):
+    model = build_model(call_site="conversation", system_prompt=system_prompt, prompt_type="conversation")
+    return model.generate(message, prompt_type="conversation")
+
+def structured_from_message(message, system_prompt, schema, check=None, call_site="intent"):
+    """Model answer validated against `schema` (repaired locally or re-asked when invalid)"""
+    model = build_model(call_site=call_site, system_prompt=system_prompt, prompt_type="structured")
+    return model.generate(message, prompt_type="structured", schema=schema, check=check)
+
+def build_context(memory, content, system_prompt):
+    """Prompt with the channel's earlier conversation; may ask the summary model, so it runs off the event loop"""
+    with tracer.span("context.build") as span:
+        history, retrieved = memory_parts(memory, content, context_builder.max_turns)
+        context = context_builder.build(content, system_prompt=system_prompt, history=history,
+                                        retrieved=retrieved, scope=memory.scope)
+        span.set(tokens=context.tokens, turns=context.turns, summarized=context.summarized)
+    return context
+
+def build_manager(manager):
+    name = managers_config[manager]['name']
+    role = managers_config[manager]['role']
+    manager_model = build_model(
+        call_site="manager",
+        system_prompt=f"""
+        You are {name}, the {role} of Apricot Labs.
+
+        Context:
+        - Today is {datetime.now().strftime('%A')}, {datetime.now().strftime('%Y-%m-%d')}.
+        - Use this information to resolve any relative time references in the task description (e.g., "next Monday" should be resolved to the specific date).
+
+        Instructions:
+        - Your role is to generate a JSON response with the workflow name or names that best match the prompt.
+        - If no end time is specified, set the end time to 1 hour later by default.
+        - Only respond with the key "workflow" and the name of that workflow as described in the workflow overview below:
+
+        {managers_config[manager]} 
+        """,
+        prompt_type="json"
+    )
+    return BaseManager(model=manager_model, role=role, name=name, journal=run_journal)
+
+async def evaluate_message(message, channel, message_key=None):
     system_prompt = '''
                     You are gonna analyse the intent of an input prompt.
 
@@ -108,21 +189,15 @@ async def evaluate_message(message, channel):
                         }
                     ]
                     '''
-    # Get the JSON string response
-    json_response = conversation_from_message(message, system_prompt)
-    
-    # Clean the response by removing markdown code blocks
-    cleaned_response = json_response.strip().replace('```json\n', '').replace('```', '').replace('\n', '')
-    
     try:
-        # Parse the JSON string into a Python list
-        results = json.loads(cleaned_response)
+        # Parsed and validated list of intents; model calls run off the event loop
+        results = await asyncio.to_thread(structured_from_message, message, system_prompt, Intents, call_site="intent")
         print("Parsed results:", results)
 
         # Process the results
-        for result in results:
-            intent = result.get("intent")
-            content = result.get("content")
+        for index, result in enumerate(results):
+            intent = result.intent
+            content = result.content
             
             print(f"Processing intent: {intent}, content: {content}")
             
@@ -135,42 +210,34 @@ async def evaluate_message(message, channel):
                 **Instructions**
                 - Workers under you cannot be contacted directly by the user, you will offer to pass a message to them.
                 '''
-                response = conversation_from_message(message=content, system_prompt=system_prompt)
+                # Earlier conversation in this channel, packed into the token budget
+                memory = conversation_memory.scoped(f"discord:{channel.id}")
+                context = await asyncio.to_thread(build_context, memory, content, system_prompt)
+                response = await asyncio.to_thread(conversation_from_message,
+                                                   message=context.text, system_prompt=system_prompt)
+                memory.store(content, response)
                 await channel.send(response)
             elif intent == "delegate_tasks":
                 delegation_response = await delegate_task(content)
-                manager = delegation_response.get("manager")
-                task = delegation_response.get("task")
+                manager = delegation_response.manager
+                task = delegation_response.task
                 await channel.send(f"**Luna:** @*{manager}* {task}")
-                name = managers_config[manager]['name']
-                role = managers_config[manager]['role']
-                manager_model = DeepSeekModel(
-                    system_prompt=f"""
-                    You are {name}, the {role} of Apricot Labs.
-
-                    Context:
-                    - Today is {datetime.now().strftime('%A')}, {datetime.now().strftime('%Y-%m-%d')}.
-                    - Use this information to resolve any relative time references in the task description (e.g., "next Monday" should be resolved to the specific date).
-
-                    Instructions:
-                    - Your role is to generate a JSON response with the workflow name or names that best match the prompt.
-                    - If no end time is specified, set the end time to 1 hour later by default.
-                    - Only respond with the key "workflow" and the name of that workflow as described in the workflow overview below:
-
-                    {managers_config[manager]} 
-                    """,
-                    prompt_type="json"
-                )
-                manager_instance = BaseManager(model=manager_model, role=role, name=name)
-                manager_result = manager_instance.run(text=task)
+                manager_instance = build_manager(manager)
+                run_key = RunJournal.idempotency_key(message_key, index) if message_key else None
+                # Off the event loop: the run waits on the model, the journal and the workflow
+                with tracer.span("manager.dispatch", manager=manager):
+                    manager_result = await asyncio.to_thread(
+                        manager_instance.run,
+                        text=task, run_key=run_key, message_key=message_key or "", channel_id=channel.id,
+                    )
                 await channel.send(f"**{manager}:** {manager_result}")
             await channel.send(f"**Luna:** All requests executed")
                 
                 
         return "I'm not sure how to handle that."
         
-    except json.JSONDecodeError as e:
-        print(f"Failed to parse JSON: {e}")
+    except StructuredOutputError as e:
+        print(f"Failed to get a valid answer: {e}")
         return "Error processing your request. Please try again."
 
 async def delegate_task(task):
@@ -204,6 +271,11 @@ async def delegate_task(task):
     }}
     '''
 
-    result = DeepSeekModel.json_prompt(DeepSeekModel, prompt=task, system_prompt=system_prompt)
+    def known_manager(delegation):
+        if delegation.manager not in managers_config:
+            raise ValueError(f"manager must be one of {list(managers_config)}, not '{delegation.manager}'")
+
+    result = await asyncio.to_thread(structured_from_message, task, system_prompt, Delegation,
+                                     check=known_manager, call_site="delegation")
     return result
 
@@ -0,0 +1,137 @@
+"""
+Warm Up Module
+
+Pays the bot's cold-start costs at startup instead of on the first messages:
+Whisper weights and kernel initialization, the TLS connection to the DeepSeek
+endpoint, and the Google client import, credentials and discovery document.
+
+Classes:
+    WarmUp: Runs the warm-up components in parallel, reports their timings and
+            gates message handling until they are done.
+
+Functions:
+    warm_whisper, warm_deepseek, warm_google: The components.
+
+Configuration (environment):
+    WARMUP_COMPONENTS=whisper,deepseek,google   Components to run ("" disables warm-up)
+    WARMUP_TIMEOUT=120                          Seconds a message waits before being served cold
+
+Example Usage:
+    warm_up = WarmUp.from_env()
+    warm_up.start()           # from setup_hook, while the gateway connects
+    await warm_up.wait()      # in on_message
+
+Note:
+    A failing component is reported and skipped; its work then happens on first
+    use, as without warm-up. wait() returns at once when start() was never
+    called, so harnesses calling handle_message directly are not gated.
+"""
+
+import asyncio
+import os
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from modules.telemetry.tracing import tracer
+
+
+def warm_whisper():
+    """One loaded model per transcription slot, plus a dummy inference."""
+    from modules.ai_modules.speech_to_text import preload
+    from modules.app_actions.discord.attachments import whisper_model
+    preload(whisper_model(), copies=int(os.getenv("TRANSCRIBE_CONCURRENCY", "2")))
+
+
+def warm_deepseek():
+    from modules.ai_modules.models import deepseek
+    deepseek.warm_up()
+
+
+def warm_google():
+    """
+    Imports the client and loads (and refreshes) the shared credentials and the
+    parsed Calendar discovery document, so a workflow run only builds its service.
+    """
+    from workflows.my_workflows.add_to_calendar import calendar_discovery, google_credentials
+    calendar_discovery()
+    google_credentials()
+
+
+COMPONENTS: Dict[str, Callable[[], None]] = {
+    "whisper": warm_whisper,
+    "deepseek": warm_deepseek,
+    "google": warm_google,
+}
+
+
+class WarmUp:
+    """
+    Args:
+        components (dict): {name: callable} run in parallel on worker threads
+        timeout (float): Seconds wait() blocks before messages are served cold
+
+    Attributes:
+        timings (dict): {name: (seconds, error or None)} once run() finished
+        seconds (float): Wall time of the whole warm-up
+    """
+    def __init__(self, components: Dict[str, Callable[[], None]], timeout: float = 120.0):
+        self.components = components
+        self.timeout = timeout
+        self.timings: Dict[str, Tuple[float, Optional[str]]] = {}
+        self.seconds = 0.0
+        self.ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls) -> "WarmUp":
+        names = os.getenv("WARMUP_COMPONENTS", ",".join(COMPONENTS))
+        components = {}
+        for name in (part.strip() for part in names.split(",")):
+            if not name:
+                continue
+            if name not in COMPONENTS:
+                raise ValueError(f"Unknown warm-up component '{name}', expected one of {list(COMPONENTS)}")
+            components[name] = COMPONENTS[name]
+        return cls(components, timeout=float(os.getenv("WARMUP_TIMEOUT", "120")))
+
+    def start(self):
+        """Starts run() on the current event loop; later calls do nothing."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def _component(self, name: str, warm: Callable[[], None]):
+        started = time.perf_counter()
+        error = None
+        with tracer.span("warmup", component=name) as span:
+            try:
+                await asyncio.to_thread(warm)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                span.set(error=error[:200])
+        self.timings[name] = (time.perf_counter() - started, error)
+
+    async def run(self):
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(self._component(name, warm) for name, warm in self.components.items()))
+        finally:
+            self.seconds = time.perf_counter() - started
+            self.ready.set()
+        print(self.report())
+
+    async def wait(self):
+        """Blocks until the warm-up is done (or timed out)."""
+        if self._task is None or self.ready.is_set():
+            return
+        with tracer.span("warmup.wait"):
+            try:
+                await asyncio.wait_for(self.ready.wait(), self.timeout)
+            except asyncio.TimeoutError:
+                print(f"[WarmUp] Not ready after {self.timeout:g}s; serving cold")
+
+    def report(self) -> str:
+        lines = [f"[WarmUp] Ready in {self.seconds:.2f}s "
+                 f"(components total {sum(seconds for seconds, _ in self.timings.values()):.2f}s)"]
+        for name, (seconds, error) in sorted(self.timings.items(), key=lambda item: -item[1][0]):
+            lines.append(f"[WarmUp]   {name:<10} {seconds:7.2f}s  {'failed: ' + error if error else 'ok'}")
+        return "\n".join(lines)
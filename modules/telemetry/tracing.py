@@ -0,0 +1,302 @@
+"""
+Tracing Module
+
+Lightweight spans for timing the stages of the message-to-workflow pipeline.
+
+Classes:
+    Span: A timed stage with attributes, linked to a trace and parent span.
+    Histogram: Prometheus-style latency histogram, labelled by stage.
+    MetricsRegistry: Stage latency histograms, token counters and labelled counters, rendered in the
+                     Prometheus text format.
+    Tracer: Creates spans and exports finished spans to JSONL and the registry.
+
+Configuration (environment):
+    TRACING_ENABLED=1         Enable tracing (disabled by default)
+    TRACE_JSONL_PATH=path     Where finished spans are appended (default: data/traces.jsonl)
+    METRICS_PORT=9464         Port for the /metrics endpoint (see start_metrics_server)
+    METRICS_HOST=127.0.0.1    Interface it listens on; the endpoint is unauthenticated, so it
+                              is local only unless set (e.g. 0.0.0.0 for remote scraping)
+
+Example Usage:
+    from modules.telemetry.tracing import tracer
+
+    with tracer.trace(message_id=message.id):
+        with tracer.span("transcription", model="tiny") as span:
+            text = transcribe(...)
+            span.set(characters=len(text))
+
+Note:
+    When tracing is disabled, span() returns a shared no-op object, so an
+    instrumented stage costs one attribute check and no allocation.
+    Trace and parent span ids live in context variables, so they follow the
+    code into asyncio tasks and asyncio.to_thread calls.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+_current_trace: ContextVar[Optional[str]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _NoopSpan:
+    """Stand-in returned while tracing is disabled."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """
+    A timed stage. Use as a context manager; attributes can be added while it runs.
+
+    Attributes:
+        name (str): Stage name, used as the histogram label
+        trace_id (str): Id shared by all spans of one message
+        span_id (str): Id of this span
+        parent_id (str): Id of the enclosing span, if any
+        start (float): Wall-clock start time (epoch seconds)
+        duration (float): Seconds between enter and exit
+        attributes (dict): Free-form attributes (token counts, sizes, errors, ...)
+    """
+    __slots__ = ("tracer", "name", "trace_id", "span_id", "parent_id", "start",
+                 "duration", "attributes", "_started", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.trace_id = _current_trace.get() or uuid.uuid4().hex
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.span_id = uuid.uuid4().hex[:16]
+        self.start = 0.0
+        self.duration = 0.0
+        self._started = 0.0
+        self._token = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._started
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        self.tracer._finish(self)
+        return False
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+        }
+
+
+class Histogram:
+    """Cumulative-bucket histogram with one series per label value."""
+    def __init__(self, name: str, help_text: str, label: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series: Dict[str, List[float]] = {}  # label -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, value: float):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [0] * (len(self.buckets) + 1) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {label: list(series) for label, series in self._series.items()}
+        for label_value, series in sorted(snapshot.items()):
+            label = f'{self.label}="{label_value}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label}}} {series[-1]}")
+            lines.append(f"{self.name}_count{{{label}}} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Stage latency histogram plus token and other counters."""
+    def __init__(self):
+        self.stage_latency = Histogram(
+            "pipeline_stage_duration_seconds", "Latency of pipeline stages.", "stage"
+        )
+        self._tokens: Dict[Tuple[str, str], int] = {}
+        self._counters: Dict[str, Tuple[str, Dict[Tuple[Tuple[str, str], ...], int]]] = {}
+        self._lock = threading.Lock()
+
+    def add_tokens(self, stage: str, kind: str, count: int):
+        with self._lock:
+            self._tokens[(stage, kind)] = self._tokens.get((stage, kind), 0) + count
+
+    def increment(self, name: str, help_text: str, count: int = 1, **labels: str):
+        """Adds to a labelled counter; counters are created on first use."""
+        key = tuple(sorted((label, str(value)) for label, value in labels.items()))
+        with self._lock:
+            _, values = self._counters.setdefault(name, (help_text, {}))
+            values[key] = values.get(key, 0) + count
+
+    def render(self) -> str:
+        lines = self.stage_latency.render()
+        lines += ["# HELP llm_tokens_total Tokens used by LLM calls.", "# TYPE llm_tokens_total counter"]
+        with self._lock:
+            tokens = dict(self._tokens)
+        for (stage, kind), count in sorted(tokens.items()):
+            lines.append(f'llm_tokens_total{{stage="{stage}",kind="{kind}"}} {count}')
+        with self._lock:
+            counters = {name: (help_text, dict(values)) for name, (help_text, values) in self._counters.items()}
+        for name, (help_text, values) in sorted(counters.items()):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for key, count in sorted(values.items()):
+                labels = ",".join(f'{label}="{value}"' for label, value in key)
+                lines.append(f"{name}{{{labels}}} {count}")
+        return "\n".join(lines) + "\n"
+
+
+class Tracer:
+    """
+    Creates spans and exports them when they finish.
+
+    Args:
+        enabled (bool): Record spans (default: TRACING_ENABLED environment variable)
+        jsonl_path (str): File finished spans are appended to (None disables JSONL export)
+    """
+    def __init__(self, enabled: Optional[bool] = None, jsonl_path: Optional[str] = None):
+        if enabled is None:
+            enabled = os.getenv("TRACING_ENABLED", "0").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+        self.jsonl_path = jsonl_path or os.getenv("TRACE_JSONL_PATH", "data/traces.jsonl")
+        self.metrics = MetricsRegistry()
+        self.listeners = []  # callables receiving every finished Span
+        self._file = None
+        self._file_lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def span(self, name: str, **attributes):
+        """Time a stage. Returns a no-op when tracing is disabled."""
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, attributes)
+
+    @contextmanager
+    def trace(self, trace_id: Optional[str] = None, **attributes):
+        """Group all spans in the block under one trace id, wrapped in a root 'message' span."""
+        if not self.enabled:
+            yield None
+            return
+        token = _current_trace.set(trace_id or uuid.uuid4().hex)
+        try:
+            with self.span("message", **attributes) as root:
+                yield root
+        finally:
+            _current_trace.reset(token)
+
+    @staticmethod
+    def current_trace_id() -> Optional[str]:
+        return _current_trace.get()
+
+    def _finish(self, span: Span):
+        self.metrics.stage_latency.observe(span.name, span.duration)
+        for kind in ("prompt_tokens", "completion_tokens"):
+            count = span.attributes.get(kind)
+            if count:
+                self.metrics.add_tokens(span.name, kind.split("_")[0], count)
+        for listener in self.listeners:
+            listener(span)
+        if self.jsonl_path:
+            line = json.dumps(span.to_dict(), default=str) + "\n"
+            with self._file_lock:
+                if self._file is None:
+                    directory = os.path.dirname(self.jsonl_path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    self._file = open(self.jsonl_path, "a", buffering=1)
+                self._file.write(line)
+
+    def start_metrics_server(self, port: Optional[int] = None, host: Optional[str] = None) -> Optional[int]:
+        """
+        Serve GET /metrics in a daemon thread.
+        Uses METRICS_PORT when no port is given; does nothing if neither is set.
+        Listens on METRICS_HOST when no host is given (default: 127.0.0.1 only).
+        Returns the bound port.
+        """
+        if self._server is not None:
+            return self._server.server_address[1]
+        if port is None:
+            if not os.getenv("METRICS_PORT"):
+                return None
+            port = int(os.getenv("METRICS_PORT"))
+        if host is None:
+            host = os.getenv("METRICS_HOST", "127.0.0.1")
+        registry = self.metrics
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(inner_self):
+                if inner_self.path.split("?", 1)[0] != "/metrics":
+                    inner_self.send_response(404)
+                    inner_self.end_headers()
+                    return
+                body = registry.render().encode("utf-8")
+                inner_self.send_response(200)
+                inner_self.send_header("Content-Type", "text/plain; version=0.0.4")
+                inner_self.send_header("Content-Length", str(len(body)))
+                inner_self.end_headers()
+                inner_self.wfile.write(body)
+
+            def log_message(inner_self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        print(f"[Tracer] Serving metrics on http://{host}:{self._server.server_address[1]}/metrics")
+        return self._server.server_address[1]
+
+
+# Process-wide tracer used by the instrumented modules
+tracer = Tracer()
@@ -1,12 +1,45 @@
 import abc
+import time
 
-from datetime import datetime
-from typing import Callable, Any
+from typing import Callable, Any, Optional
+
+from modules.triggers.coordination import TriggerCoordinator
+from modules.triggers.executor import OverlapPolicy, TriggerExecutor
 
 
 class BaseTrigger(abc.ABC):
-    def __init__(self, workflow: Callable[[], Any]):
+    """
+    Base class for workflow triggers.
+
+    Args:
+        workflow (Callable[..., Any]): Workflow function to execute when triggered
+        executor (TriggerExecutor): Optional worker pool; without one the workflow
+                                    runs inline on the thread that fired the trigger
+        overlap_policy (OverlapPolicy): What to do when the previous run is still active
+        timeout (float): Per-run timeout in seconds (executor only)
+        jitter (float): Maximum random start delay in seconds (executor only)
+        name (str): Trigger name used for overlap tracking, metrics and coordination.
+                    Must be identical on every node when a coordinator is used
+        coordinator (TriggerCoordinator): Optional multi-node coordinator; only the
+                                          node that claims an execution runs it
+    """
+    def __init__(
+        self,
+        workflow: Callable[..., Any],
+        executor: Optional[TriggerExecutor] = None,
+        overlap_policy: OverlapPolicy = OverlapPolicy.SKIP,
+        timeout: Optional[float] = None,
+        jitter: float = 0.0,
+        name: Optional[str] = None,
+        coordinator: Optional[TriggerCoordinator] = None,
+    ):
         self.workflow = workflow
+        self.executor = executor
+        self.overlap_policy = OverlapPolicy(overlap_policy)
+        self.timeout = timeout
+        self.jitter = jitter
+        self.name = name or f"{type(self).__name__}:{getattr(workflow, '__qualname__', repr(workflow))}"
+        self.coordinator = coordinator
         self._active = False
 
     @abc.abstractmethod
@@ -23,6 +56,35 @@ class BaseTrigger(abc.ABC):
         """Stop the trigger"""
         self._active = False
 
-    def execute_workflow(self):
-        """Execute the associated workflow"""
-        return self.workflow()
\ No newline at end of file
+    def execute_workflow(self, *args, scheduled_time: Optional[float] = None):
+        """
+        Execute the associated workflow.
+
+        With a coordinator, the execution is skipped (None is returned) unless this
+        node claims it. Runs inline when no executor is configured. Otherwise the
+        run is handed to the executor and the TriggerRun (or None if skipped) is
+        returned.
+
+        Args:
+            *args: Positional arguments passed to the workflow
+            scheduled_time (float): When the trigger was due (epoch seconds, default now)
+        """
+        if scheduled_time is None:
+            scheduled_time = time.time()
+        if self.coordinator is not None and not self.coordinator.should_run(self.name, scheduled_time):
+            return None
+        return self._run_workflow(args, scheduled_time)
+
+    def _run_workflow(self, args: tuple, scheduled_time: float):
+        """Run the workflow inline or on the executor, without coordination checks"""
+        if self.executor is None:
+            return self.workflow(*args)
+        return self.executor.submit(
+            self.name,
+            self.workflow,
+            args=args,
+            policy=self.overlap_policy,
+            timeout=self.timeout,
+            jitter=self.jitter,
+            scheduled_time=scheduled_time,
+        )
@@ -0,0 +1,300 @@
+"""
+Trigger Coordination Module
+
+Lets several workforce instances share one set of triggers so that every due
+execution runs on exactly one node.
+
+Classes:
+    BaseLeaseStore: Pluggable storage interface for node heartbeats, leases and claims.
+    SQLiteLeaseStore: SQLite implementation, usable on one host or on a shared volume.
+    TriggerCoordinator: Partitions triggers across live nodes and claims executions.
+
+How it works:
+    - Every node heartbeats into the store. Nodes whose heartbeat expired are dead.
+    - Each trigger is assigned to one live node by rendezvous hashing, which spreads
+      triggers evenly and only moves the triggers of a node that joins or leaves.
+    - The assigned node holds a renewable lease on the trigger. A dead node's leases
+      simply expire and the newly assigned node takes them over.
+    - Before running, the owner inserts a claim keyed by trigger name and scheduled
+      time. The insert succeeds once, so even during a lease handover an execution
+      cannot run twice.
+
+Example Usage:
+    coordinator = TriggerCoordinator(SQLiteLeaseStore("/shared/coordination.db"))
+    coordinator.start()
+    trigger = ScheduledTrigger(
+        workflow=my_workflow.execute,
+        cron_expression='0 * * * *',
+        coordinator=coordinator
+    )
+    trigger.start()
+
+Note:
+    Lease expiry compares wall clocks, so nodes need loosely synchronized clocks
+    (well within the lease TTL). Claims are at-most-once: if the claiming node dies
+    mid-run, that execution is not retried.
+"""
+
+import abc
+import hashlib
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Iterable, List, Optional, Set
+
+
+class BaseLeaseStore(abc.ABC):
+    """Storage backend for coordination state. All times are epoch seconds."""
+
+    @abc.abstractmethod
+    def heartbeat(self, node_id: str, ttl: float):
+        """Mark a node alive for the next ttl seconds"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def remove_node(self, node_id: str):
+        """Remove a node's heartbeat and release all its leases"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def live_nodes(self) -> List[str]:
+        """Return ids of nodes with an unexpired heartbeat"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        """Take or renew a lease. Succeeds if the lease is free, expired or already ours"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def release(self, key: str, owner: str):
+        """Release a lease if we hold it"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def claim(self, key: str, owner: str) -> bool:
+        """One-shot claim. Returns True for exactly one caller per key"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def prune_claims(self, older_than: float):
+        """Delete claims made before the given time"""
+        raise NotImplementedError
+
+
+class SQLiteLeaseStore(BaseLeaseStore):
+    """
+    SQLite-backed lease store.
+
+    Every operation is a single atomic statement, so SQLite's file locking is the
+    only synchronization needed between processes and hosts.
+
+    Args:
+        path (str): Database file. Put it on a shared volume for multi-host setups
+        wal (bool): Use WAL journaling. Faster, but only safe when all nodes run on
+                    the same host (WAL does not work over network filesystems)
+        busy_timeout (float): Seconds to wait for a competing writer
+    """
+    def __init__(self, path: str = "data/coordination.db", wal: bool = False, busy_timeout: float = 10.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        if wal:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS nodes (
+                node_id TEXT PRIMARY KEY,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS leases (
+                key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS claims (
+                key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                claimed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS claims_claimed_at ON claims (claimed_at);
+            """
+        )
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def heartbeat(self, node_id: str, ttl: float):
+        self._execute(
+            "INSERT INTO nodes (node_id, expires_at) VALUES (?, ?) "
+            "ON CONFLICT(node_id) DO UPDATE SET expires_at = excluded.expires_at",
+            (node_id, time.time() + ttl),
+        )
+
+    def remove_node(self, node_id: str):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM nodes WHERE node_id = ?", (node_id,))
+                self._conn.execute("DELETE FROM leases WHERE owner = ?", (node_id,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def live_nodes(self) -> List[str]:
+        rows = self._execute(
+            "SELECT node_id FROM nodes WHERE expires_at > ? ORDER BY node_id", (time.time(),)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        cursor = self._execute(
+            "INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE leases.owner = excluded.owner OR leases.expires_at <= ?",
+            (key, owner, now + ttl, now),
+        )
+        return cursor.rowcount == 1
+
+    def release(self, key: str, owner: str):
+        self._execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def claim(self, key: str, owner: str) -> bool:
+        cursor = self._execute(
+            "INSERT OR IGNORE INTO claims (key, owner, claimed_at) VALUES (?, ?, ?)",
+            (key, owner, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def prune_claims(self, older_than: float):
+        self._execute("DELETE FROM claims WHERE claimed_at < ?", (older_than,))
+
+
+def _rendezvous_score(node_id: str, key: str) -> int:
+    digest = hashlib.blake2b(f"{node_id}\0{key}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class TriggerCoordinator:
+    """
+    Decides which node runs which trigger execution.
+
+    Args:
+        store (BaseLeaseStore): Shared coordination backend
+        node_id (str): Unique id of this node (default: hostname-pid-random)
+        lease_ttl (float): Seconds a heartbeat or lease stays valid without renewal
+        heartbeat_interval (float): Seconds between heartbeats (must be well below lease_ttl)
+        claim_retention (float): Seconds execution claims are kept before pruning
+    """
+    def __init__(
+        self,
+        store: BaseLeaseStore,
+        node_id: Optional[str] = None,
+        lease_ttl: float = 30.0,
+        heartbeat_interval: float = 10.0,
+        claim_retention: float = 7 * 24 * 3600,
+    ):
+        if heartbeat_interval >= lease_ttl:
+            raise ValueError("heartbeat_interval must be smaller than lease_ttl")
+        self.store = store
+        self.node_id = node_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.lease_ttl = lease_ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.claim_retention = claim_retention
+        self._triggers: Set[str] = set()
+        self._held: Set[str] = set()
+        self._live_nodes: List[str] = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def register(self, trigger_names: Iterable[str]):
+        """Tell the coordinator which triggers this node runs, so leases are kept warm"""
+        with self._lock:
+            self._triggers.update(trigger_names)
+
+    def assigned_node(self, trigger_name: str) -> Optional[str]:
+        """The live node a trigger is partitioned to, by rendezvous hashing"""
+        nodes = self._live_nodes or [self.node_id]
+        return max(nodes, key=lambda node: _rendezvous_score(node, trigger_name))
+
+    def owns(self, trigger_name: str) -> bool:
+        """
+        True if this node currently holds the trigger's lease.
+
+        A node keeps a lease it already holds until the heartbeat loop hands it
+        over, so ownership never lapses during rebalancing.
+        """
+        with self._lock:
+            self._triggers.add(trigger_name)
+            held = trigger_name in self._held
+        if not held and self.assigned_node(trigger_name) != self.node_id:
+            return False
+        acquired = self.store.acquire(f"trigger:{trigger_name}", self.node_id, self.lease_ttl)
+        with self._lock:
+            if acquired:
+                self._held.add(trigger_name)
+            else:
+                self._held.discard(trigger_name)
+        return acquired
+
+    def claim(self, key: str) -> bool:
+        """Win a one-shot claim on behalf of this node"""
+        return self.store.claim(key, self.node_id)
+
+    def should_run(self, trigger_name: str, scheduled_time: float) -> bool:
+        """Own the trigger and win the claim for this scheduled execution"""
+        if not self.owns(trigger_name):
+            return False
+        return self.claim(f"{trigger_name}@{int(scheduled_time)}")
+
+    def _tick(self):
+        self.store.heartbeat(self.node_id, self.lease_ttl)
+        self._live_nodes = self.store.live_nodes()
+        with self._lock:
+            triggers = list(self._triggers)
+        for trigger_name in triggers:
+            if self.assigned_node(trigger_name) == self.node_id:
+                self.owns(trigger_name)
+            else:
+                with self._lock:
+                    held = trigger_name in self._held
+                    self._held.discard(trigger_name)
+                if held:
+                    # Hand over to the node the trigger is now partitioned to
+                    self.store.release(f"trigger:{trigger_name}", self.node_id)
+
+    def start(self):
+        """Start heartbeating and lease renewal in a daemon thread"""
+        self._stop_event.clear()
+        self._tick()
+        last_prune = 0.0
+
+        def run_heartbeat():
+            nonlocal last_prune
+            while not self._stop_event.wait(self.heartbeat_interval):
+                try:
+                    self._tick()
+                    if time.time() - last_prune > 3600:
+                        self.store.prune_claims(time.time() - self.claim_retention)
+                        last_prune = time.time()
+                except Exception as e:
+                    print(f"[TriggerCoordinator] Heartbeat failed: {e}")
+
+        heartbeat_thread = threading.Thread(target=run_heartbeat, daemon=True)
+        heartbeat_thread.start()
+
+    def stop(self):
+        """Stop heartbeating and release all leases so other nodes take over immediately"""
+        self._stop_event.set()
+        with self._lock:
+            self._held.clear()
+        self.store.remove_node(self.node_id)
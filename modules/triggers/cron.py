@@ -0,0 +1,357 @@
+"""
+Cron Expression Module
+
+Compiles standard five-field cron expressions into bitsets once and computes
+next fire times by jumping field-by-field instead of scanning minute by minute.
+
+Classes:
+    CronExpression: A compiled cron expression with timezone-aware next-fire
+                    calculation.
+
+Supported syntax:
+    - Fields: minute hour day-of-month month day-of-week
+    - Wildcards (*), values (5), ranges (1-5), lists (1,3,5) and steps
+      (*/15, 10-50/10, 5/20)
+    - Month names (jan-dec) and weekday names (sun-sat); both 0 and 7 mean Sunday
+    - Day of month: L (last day), LW (last weekday) and nW (the weekday nearest
+      to day n, within the same month), also in lists (e.g. '1,15W,L')
+    - Macros: @yearly, @annually, @monthly, @weekly, @daily, @midnight, @hourly
+
+Day semantics:
+    Follows Vixie cron: when both day-of-month and day-of-week are restricted
+    (neither starts with '*'), a day matches if EITHER field matches. Otherwise
+    both must match.
+
+Example Usage:
+    cron = CronExpression('*/15 9-17 * * mon-fri', timezone='Europe/Amsterdam')
+    next_run = cron.next_after(datetime.now(timezone.utc))
+
+Note:
+    Local times that do not exist because of a DST gap are skipped. Local times
+    that occur twice because of a DST fold fire once, on the first occurrence.
+"""
+
+import calendar
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+
+MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+MONTH_NAMES = {
+    name: index for index, name in enumerate(
+        ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"],
+        start=1,
+    )
+}
+WEEKDAY_NAMES = {
+    name: index for index, name in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])
+}
+
+# (name, low, high, aliases) for each of the five fields
+FIELDS = (
+    ("minute", 0, 59, {}),
+    ("hour", 0, 23, {}),
+    ("day of month", 1, 31, {}),
+    ("month", 1, 12, MONTH_NAMES),
+    ("day of week", 0, 7, WEEKDAY_NAMES),
+)
+
+# Bitmask of the valid days 1..n for a month of length n
+MONTH_LENGTH_MASKS = {n: ((1 << (n + 1)) - 1) & ~1 for n in (28, 29, 30, 31)}
+
+# Upper bound on months searched before giving up on an expression
+MAX_SEARCH_MONTHS = 12 * 400
+
+
+def _next_bit(mask: int, start: int) -> Optional[int]:
+    """Return the lowest set bit position >= start, or None."""
+    shifted = mask >> start
+    if not shifted:
+        return None
+    return start + (shifted & -shifted).bit_length() - 1
+
+
+def _lowest_bit(mask: int) -> int:
+    return (mask & -mask).bit_length() - 1
+
+
+def _nearest_weekday(day: int, first_weekday: int, length: int) -> Optional[int]:
+    """
+    The Monday-Friday day nearest to `day` without leaving the month (cron 'W'),
+    or None when the month has no such day. first_weekday uses Monday=0.
+    """
+    if day > length:
+        return None
+    weekday = (first_weekday + day - 1) % 7
+    if weekday == 5:  # Saturday: the Friday before, or the Monday after the 1st
+        return day - 1 if day > 1 else day + 2
+    if weekday == 6:  # Sunday: the Monday after, or the Friday before the last day
+        return day + 1 if day < length else day - 2
+    return day
+
+
+class CronExpression:
+    """
+    A cron expression compiled into per-field bitsets.
+
+    Attributes:
+        expression (str): The original expression
+        tz (ZoneInfo): Timezone the expression is evaluated in (None = naive local time)
+        minutes (int): Bitset of matching minutes (bit n = minute n)
+        hours (int): Bitset of matching hours
+        days (int): Bitset of matching days of month (bit n = day n), without L/W
+        nearest_weekdays (int): Bitset of the days n given as nW
+        last_day (bool): L was given (last day of the month)
+        last_weekday (bool): LW was given (last weekday of the month)
+        months (int): Bitset of matching months (bit n = month n)
+        weekdays (int): Bitset of matching weekdays (bit 0 = Sunday)
+
+    Args:
+        expression (str): Five-field cron string or macro
+        timezone (str): Optional IANA timezone name (e.g. 'Europe/Amsterdam')
+
+    Raises:
+        ValueError: For malformed expressions or expressions that can never fire
+    """
+    def __init__(self, expression: str, timezone: Optional[str] = None):
+        self.expression = expression
+        self.tz = ZoneInfo(timezone) if timezone else None
+
+        fields = MACROS.get(expression.strip().lower(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Invalid cron expression '{expression}': expected 5 fields")
+
+        # L and W depend on the month; they are resolved per month in _day_mask()
+        self.nearest_weekdays, self.last_day, self.last_weekday = 0, False, False
+        plain_days = []
+        for part in fields[2].split(","):
+            upper = part.upper()
+            if upper == "L":
+                self.last_day = True
+            elif upper == "LW":
+                self.last_weekday = True
+            elif upper.endswith("W") and upper[:-1].isdigit() and 1 <= int(upper[:-1]) <= 31:
+                self.nearest_weekdays |= 1 << int(upper[:-1])
+            elif upper.endswith("W") or "L" in upper:
+                raise ValueError(f"Invalid day of month value '{part}'")
+            else:
+                plain_days.append(part)
+        self._day_specials = bool(self.nearest_weekdays or self.last_day or self.last_weekday)
+
+        masks = []
+        for index, (text, (name, low, high, aliases)) in enumerate(zip(fields, FIELDS)):
+            if index == 2 and self._day_specials:
+                masks.append(self._parse_field(",".join(plain_days), name, low, high, aliases) if plain_days else 0)
+            else:
+                masks.append(self._parse_field(text, name, low, high, aliases))
+        self.minutes, self.hours, self.days, self.months, weekdays = masks
+
+        # Fold 7 (Sunday) onto 0
+        if weekdays & (1 << 7):
+            weekdays = (weekdays | 1) & 0x7F
+        self.weekdays = weekdays
+
+        self.dom_restricted = not fields[2].startswith("*")
+        self.dow_restricted = not fields[4].startswith("*")
+
+        # Day-of-month bitsets for each weekday the 1st of a month can fall on.
+        # Bit d is set when day d of that month is a matching weekday.
+        self._weekday_day_masks = []
+        for first_weekday in range(7):
+            mask = 0
+            for day in range(1, 32):
+                if weekdays & (1 << ((first_weekday + day - 1) % 7)):
+                    mask |= 1 << day
+            self._weekday_day_masks.append(mask)
+
+        self._day_mask_cache: Dict[Tuple[int, int], int] = {}
+        self._validate_reachable()
+
+    @staticmethod
+    def _parse_value(text: str, name: str, aliases: dict) -> int:
+        value = aliases.get(text.lower())
+        if value is not None:
+            return value
+        if not text.isdigit():
+            raise ValueError(f"Invalid {name} value '{text}'")
+        return int(text)
+
+    def _parse_field(self, text: str, name: str, low: int, high: int, aliases: dict) -> int:
+        """Compile one cron field into a bitset."""
+        mask = 0
+        for part in text.split(","):
+            if not part:
+                raise ValueError(f"Empty list element in {name} field '{text}'")
+            step = 1
+            has_step = "/" in part
+            if has_step:
+                part, step_text = part.split("/", 1)
+                if not step_text.isdigit() or int(step_text) == 0:
+                    raise ValueError(f"Invalid step '{step_text}' in {name} field")
+                step = int(step_text)
+
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start_text, end_text = part.split("-", 1)
+                start = self._parse_value(start_text, name, aliases)
+                end = self._parse_value(end_text, name, aliases)
+            else:
+                start = self._parse_value(part, name, aliases)
+                # 'a/n' means 'a-max/n'
+                end = high if has_step else start
+
+            if not (low <= start <= high and low <= end <= high) or start > end:
+                raise ValueError(f"{name.capitalize()} field '{text}' out of range {low}-{high}")
+
+            for value in range(start, end + 1, step):
+                mask |= 1 << value
+        return mask
+
+    def _validate_reachable(self):
+        """Reject expressions whose day-of-month can never occur (e.g. '0 0 31 2 *')."""
+        if self.dow_restricted or self.last_day or self.last_weekday:
+            return  # every weekday, last day and last weekday occurs in every month
+        longest = max(
+            calendar.monthrange(2000, month)[1]  # 2000 is a leap year
+            for month in range(1, 13) if self.months & (1 << month)
+        )
+        if _lowest_bit(self.days | self.nearest_weekdays) > longest:
+            raise ValueError(f"Cron expression '{self.expression}' can never fire")
+
+    def _day_mask(self, year: int, month: int) -> int:
+        """Bitset of matching days in the given month."""
+        key = (year, month)
+        mask = self._day_mask_cache.get(key)
+        if mask is not None:
+            return mask
+
+        first_weekday, length = calendar.monthrange(year, month)
+        days = self.days
+        if self._day_specials:
+            if self.last_day:
+                days |= 1 << length
+            if self.last_weekday:
+                days |= 1 << _nearest_weekday(length, first_weekday, length)
+            remaining = self.nearest_weekdays
+            while remaining:
+                day = _lowest_bit(remaining)
+                remaining &= remaining - 1
+                nearest = _nearest_weekday(day, first_weekday, length)
+                if nearest is not None:
+                    days |= 1 << nearest
+        # calendar uses Monday=0; cron uses Sunday=0
+        weekday_mask = self._weekday_day_masks[(first_weekday + 1) % 7]
+        if self.dom_restricted and self.dow_restricted:
+            mask = days | weekday_mask
+        else:
+            mask = days & weekday_mask
+        mask &= MONTH_LENGTH_MASKS[length]
+
+        if len(self._day_mask_cache) > 256:
+            self._day_mask_cache.clear()
+        self._day_mask_cache[key] = mask
+        return mask
+
+    def _next_local(self, start: datetime) -> datetime:
+        """Return the first naive local time >= start (minute resolution) that matches."""
+        year, month, day = start.year, start.month, start.day
+        hour, minute = start.hour, start.minute
+
+        for _ in range(MAX_SEARCH_MONTHS):
+            next_month = _next_bit(self.months, month)
+            if next_month is None:
+                year, month, day, hour, minute = year + 1, 1, 1, 0, 0
+                continue
+            if next_month != month:
+                month, day, hour, minute = next_month, 1, 0, 0
+
+            next_day = _next_bit(self._day_mask(year, month), day)
+            if next_day is None:
+                day, hour, minute = 1, 0, 0
+                month += 1
+                if month > 12:
+                    year, month = year + 1, 1
+                continue
+            if next_day != day:
+                day, hour, minute = next_day, 0, 0
+
+            next_hour = _next_bit(self.hours, hour)
+            if next_hour is None:
+                # Roll into the next day; the day mask handles month overflow
+                day, hour, minute = day + 1, 0, 0
+                continue
+            if next_hour != hour:
+                hour, minute = next_hour, 0
+
+            next_minute = _next_bit(self.minutes, minute)
+            if next_minute is None:
+                hour, minute = hour + 1, 0
+                if hour > 23:
+                    day, hour = day + 1, 0
+                continue
+            return datetime(year, month, day, hour, next_minute)
+
+        raise ValueError(f"Cron expression '{self.expression}' has no fire time in range")
+
+    def matches(self, when: datetime) -> bool:
+        """Check whether a datetime (in the expression's timezone) matches."""
+        if self.tz is not None and when.tzinfo is not None:
+            when = when.astimezone(self.tz)
+        return (
+            bool(self.minutes & (1 << when.minute))
+            and bool(self.hours & (1 << when.hour))
+            and bool(self.months & (1 << when.month))
+            and bool(self._day_mask(when.year, when.month) & (1 << when.day))
+        )
+
+    def next_after(self, after: datetime) -> datetime:
+        """
+        Compute the next fire time strictly after the given moment.
+
+        Args:
+            after (datetime): Reference time. Aware datetimes are converted to the
+                              expression's timezone; naive ones are taken as-is.
+
+        Returns:
+            datetime: The next fire time. Aware (in the expression's timezone) when a
+                      timezone is configured or `after` is aware, naive otherwise.
+        """
+        if self.tz is None:
+            local = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+            candidate = self._next_local(local.replace(tzinfo=None))
+            return candidate.replace(tzinfo=after.tzinfo) if after.tzinfo else candidate
+
+        if after.tzinfo is None:
+            after = after.replace(tzinfo=self.tz)
+        after_utc = after.astimezone(dt_timezone.utc)
+        local = after.astimezone(self.tz).replace(tzinfo=None, second=0, microsecond=0)
+        local += timedelta(minutes=1)
+
+        while True:
+            candidate = self._next_local(local)
+            aware = candidate.replace(tzinfo=self.tz, fold=0)
+            roundtrip = aware.astimezone(dt_timezone.utc).astimezone(self.tz)
+            if roundtrip.replace(tzinfo=None) != candidate:
+                # Nonexistent local time (DST gap); skip it
+                local = candidate + timedelta(minutes=1)
+                continue
+            if aware.astimezone(dt_timezone.utc) <= after_utc:
+                # Second occurrence of an ambiguous time we already passed
+                local = candidate + timedelta(minutes=1)
+                continue
+            return aware
+
+    def __repr__(self) -> str:
+        tz = f", timezone='{self.tz.key}'" if self.tz is not None else ""
+        return f"CronExpression('{self.expression}'{tz})"
@@ -0,0 +1,390 @@
+"""
+Trigger Executor Module
+
+Runs triggered workflows on a bounded worker pool so a slow workflow no longer
+blocks the scheduler thread that fired it.
+
+Classes:
+    OverlapPolicy: What to do when a trigger fires while its previous run is active.
+    TriggerRun: State of a single submitted run.
+    ExecutorMetrics: Outcome counters and scheduled-to-actual start lag.
+    TriggerExecutor: Bounded thread/process pool with per-trigger overlap handling,
+                     per-run timeouts and start jitter.
+
+Example Usage:
+    executor = TriggerExecutor(max_workers=4)
+    trigger = ScheduledTrigger(
+        workflow=my_workflow.execute,
+        cron_expression='0 * * * *',
+        executor=executor,
+        overlap_policy=OverlapPolicy.QUEUE,
+        timeout=300,
+        jitter=30
+    )
+    trigger.start()
+    ...
+    print(executor.metrics.snapshot())
+
+Note:
+    Python cannot kill a running thread. Cancelled or timed-out runs are marked
+    as such, their result is discarded and their overlap slot is released right
+    away; in thread mode the run's cancel event is also set so workflows can stop
+    cooperatively by polling current_run().cancelled(). In thread mode a run's
+    timeout starts when a worker picks it up. In process mode the workflow and
+    its arguments must be picklable, and timeouts include any time spent waiting
+    for a free worker.
+    QUEUE holds at most `max_queued` runs per trigger; when full, queue_overflow
+    decides whether the new run or the oldest queued run is dropped.
+"""
+
+import itertools
+import random
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from enum import Enum
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+DROP_NEW = "drop_new"        # a full queue rejects the new run
+DROP_OLDEST = "drop_oldest"  # a full queue cancels its oldest run to make room
+QUEUE_OVERFLOW = (DROP_NEW, DROP_OLDEST)
+
+
+class OverlapPolicy(str, Enum):
+    SKIP = "skip"                        # drop the new run while one is active
+    QUEUE = "queue"                      # run after the active one finishes
+    PARALLEL = "parallel"                # start regardless of active runs
+    CANCEL_PREVIOUS = "cancel_previous"  # cancel active runs, then start
+
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TIMED_OUT = "timed_out"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED, TIMED_OUT)
+
+_local = threading.local()
+_run_ids = itertools.count(1)
+
+
+def current_run() -> Optional["TriggerRun"]:
+    """Return the TriggerRun executing on this worker thread (thread mode only)."""
+    return getattr(_local, "run", None)
+
+
+def _timed_call(fn: Callable, args: tuple, kwargs: dict) -> Tuple[float, Optional[str], Any]:
+    """Worker entry point. Returns (started_at, error, result) so start time survives failures."""
+    started_at = time.time()
+    try:
+        return started_at, None, fn(*args, **kwargs)
+    except Exception:
+        return started_at, traceback.format_exc(), None
+
+
+def _timed_call_in_thread(run: "TriggerRun", fn: Callable, args: tuple, kwargs: dict):
+    _local.run = run
+    if run._on_start is not None:
+        run._on_start()
+    try:
+        return _timed_call(fn, args, kwargs)
+    finally:
+        _local.run = None
+
+
+class TriggerRun:
+    """
+    A single submitted workflow run.
+
+    Attributes:
+        id (int): Process-unique run id
+        key (str): Trigger name the run belongs to
+        scheduled_time (float): When the trigger was due (epoch seconds)
+        jitter (float): Start delay applied to this run in seconds
+        started_at (float): When the workflow actually started (epoch seconds)
+        finished_at (float): When the run reached a final state
+        status (str): pending | running | succeeded | failed | cancelled | timed_out
+        result (Any): Workflow return value on success
+        error (str): Formatted traceback on failure
+    """
+    def __init__(self, key: str, fn: Callable, args: tuple, kwargs: dict,
+                 timeout: Optional[float], jitter: float, scheduled_time: float):
+        self.id = next(_run_ids)
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.timeout = timeout
+        self.max_jitter = jitter
+        self.jitter = 0.0
+        self.scheduled_time = scheduled_time
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.status = PENDING
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.future: Optional[Future] = None
+        self._start_timer: Optional[threading.Timer] = None
+        self._timeout_timer: Optional[threading.Timer] = None
+        self._on_start: Optional[Callable[[], None]] = None
+        self._cancel_event = threading.Event()
+        self._done = threading.Event()
+
+    def cancelled(self) -> bool:
+        """True once the run was cancelled or timed out. Poll this from long workflows."""
+        return self._cancel_event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the run reaches a final state."""
+        return self._done.wait(timeout)
+
+    def __repr__(self) -> str:
+        return f"TriggerRun(id={self.id}, key='{self.key}', status='{self.status}')"
+
+
+class ExecutorMetrics:
+    """
+    Thread-safe counters plus a rolling window of start lag samples.
+
+    Lag is actual start minus (scheduled time + intended jitter), so it measures
+    time lost to scheduler delay and pool saturation, not deliberate spreading.
+    """
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {
+            "submitted": 0, "skipped": 0, "queued": 0, "dropped": 0, "started": 0,
+            SUCCEEDED: 0, FAILED: 0, CANCELLED: 0, TIMED_OUT: 0,
+        }
+        self._lags: Deque[float] = deque(maxlen=window)
+
+    def incr(self, name: str):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def record_lag(self, lag: float):
+        with self._lock:
+            self._lags.append(lag)
+
+    @staticmethod
+    def _percentile(ordered: List[float], pct: float) -> float:
+        index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+        return ordered[index]
+
+    def snapshot(self) -> dict:
+        """Return counters and lag percentiles (seconds) as a plain dict."""
+        with self._lock:
+            lags = sorted(self._lags)
+            counters = dict(self.counters)
+        lag_stats = {"count": len(lags)}
+        if lags:
+            lag_stats.update({
+                "mean": sum(lags) / len(lags),
+                "p50": self._percentile(lags, 50),
+                "p95": self._percentile(lags, 95),
+                "p99": self._percentile(lags, 99),
+                "max": lags[-1],
+            })
+        return {"counters": counters, "lag_seconds": lag_stats}
+
+
+class TriggerExecutor:
+    """
+    Bounded worker pool for trigger-initiated workflow runs.
+
+    Args:
+        max_workers (int): Maximum number of concurrently executing workflows
+        use_processes (bool): Use a process pool instead of threads (for CPU-bound workflows)
+        lag_window (int): Number of recent lag samples kept for percentiles
+        max_queued (int): Queued runs kept per trigger under the QUEUE policy
+        queue_overflow (str): "drop_new" or "drop_oldest", when a trigger's queue is full
+    """
+    def __init__(self, max_workers: int = 4, use_processes: bool = False, lag_window: int = 1000,
+                 max_queued: int = 100, queue_overflow: str = DROP_NEW):
+        if queue_overflow not in QUEUE_OVERFLOW:
+            raise ValueError(f"Invalid queue_overflow '{queue_overflow}', expected one of {QUEUE_OVERFLOW}")
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.queue_overflow = queue_overflow
+        self.use_processes = use_processes
+        if use_processes:
+            self._pool = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="trigger-worker")
+        self.metrics = ExecutorMetrics(window=lag_window)
+        self._lock = threading.RLock()
+        self._active: Dict[str, List[TriggerRun]] = {}
+        self._queued: Dict[str, Deque[TriggerRun]] = {}
+        self._shutdown = False
+
+    def submit(
+        self,
+        key: str,
+        fn: Callable,
+        args: tuple = (),
+        kwargs: Optional[dict] = None,
+        policy: OverlapPolicy = OverlapPolicy.SKIP,
+        timeout: Optional[float] = None,
+        jitter: float = 0.0,
+        scheduled_time: Optional[float] = None,
+    ) -> Optional[TriggerRun]:
+        """
+        Submit a workflow run for a trigger.
+
+        Args:
+            key (str): Trigger name; overlap policies apply per key
+            fn (Callable): Workflow callable
+            args (tuple): Positional arguments for the workflow
+            kwargs (dict): Keyword arguments for the workflow
+            policy (OverlapPolicy): Behaviour when a run for this key is still active
+            timeout (float): Seconds after which the run is abandoned (None = no limit)
+            jitter (float): Maximum random start delay in seconds
+            scheduled_time (float): When the trigger was due (epoch seconds, default now)
+
+        Returns:
+            TriggerRun: The run, or None if it was skipped
+        """
+        policy = OverlapPolicy(policy)
+        run = TriggerRun(
+            key, fn, args, kwargs or {}, timeout, jitter,
+            scheduled_time if scheduled_time is not None else time.time(),
+        )
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("TriggerExecutor has been shut down")
+            self.metrics.incr("submitted")
+            active = self._active.setdefault(key, [])
+
+            if active and policy == OverlapPolicy.SKIP:
+                self.metrics.incr("skipped")
+                print(f"[TriggerExecutor] Skipping '{key}': previous run still active")
+                return None
+            if active and policy == OverlapPolicy.QUEUE:
+                queued = self._queued.setdefault(key, deque())
+                if len(queued) >= self.max_queued:
+                    self.metrics.incr("dropped")
+                    if self.queue_overflow == DROP_NEW:
+                        print(f"[TriggerExecutor] Dropping run of '{key}': {len(queued)} runs already queued")
+                        return None
+                    print(f"[TriggerExecutor] Queue of '{key}' is full; cancelling its oldest queued run")
+                    self._finish(queued.popleft(), CANCELLED)
+                queued.append(run)
+                self.metrics.incr("queued")
+                return run
+            if active and policy == OverlapPolicy.CANCEL_PREVIOUS:
+                # Empty the queue first, so finishing the active runs does not launch a queued one
+                for queued in self._queued.pop(key, ()):
+                    self._finish(queued, CANCELLED)
+                for previous in list(active):
+                    self._finish(previous, CANCELLED)
+
+            self._launch(run)
+        return run
+
+    def _launch(self, run: TriggerRun):
+        """Register the run as active and dispatch it, after jitter if configured."""
+        self._active.setdefault(run.key, []).append(run)
+        if run.max_jitter > 0:
+            run.jitter = random.uniform(0, run.max_jitter)
+            run._start_timer = threading.Timer(run.jitter, self._dispatch, (run,))
+            run._start_timer.daemon = True
+            run._start_timer.start()
+        else:
+            self._dispatch(run)
+
+    def _dispatch(self, run: TriggerRun):
+        with self._lock:
+            if run.status != PENDING or self._shutdown:
+                return
+            run.status = RUNNING
+            if self.use_processes:
+                run.future = self._pool.submit(_timed_call, run.fn, run.args, run.kwargs)
+                # The worker process cannot call back, so the timeout includes the wait for a worker
+                self._arm_timeout(run)
+            else:
+                run._on_start = lambda: self._arm_timeout(run)
+                run.future = self._pool.submit(_timed_call_in_thread, run, run.fn, run.args, run.kwargs)
+        run.future.add_done_callback(lambda future: self._on_done(run, future))
+
+    def _arm_timeout(self, run: TriggerRun):
+        with self._lock:
+            if run.timeout is None or run.status in FINISHED_STATES or run._timeout_timer is not None:
+                return
+            run._timeout_timer = threading.Timer(run.timeout, self._on_timeout, (run,))
+            run._timeout_timer.daemon = True
+            run._timeout_timer.start()
+
+    def _on_timeout(self, run: TriggerRun):
+        with self._lock:
+            if run.status in FINISHED_STATES:
+                return
+            print(f"[TriggerExecutor] Run {run.id} of '{run.key}' timed out after {run.timeout}s")
+            self._finish(run, TIMED_OUT)
+
+    def _on_done(self, run: TriggerRun, future: Future):
+        if future.cancelled():
+            return
+        try:
+            started_at, error, result = future.result()
+        except Exception:
+            # Only reachable in process mode (e.g. unpicklable workflow or broken pool)
+            started_at, error, result = None, traceback.format_exc(), None
+
+        with self._lock:
+            if started_at is not None:
+                run.started_at = started_at
+                self.metrics.incr("started")
+                self.metrics.record_lag(started_at - (run.scheduled_time + run.jitter))
+            if run.status in FINISHED_STATES:
+                return  # cancelled or timed out; discard the late result
+            if error is None:
+                run.result = result
+                self._finish(run, SUCCEEDED)
+            else:
+                run.error = error
+                print(f"[TriggerExecutor] Run {run.id} of '{run.key}' failed:\n{error}")
+                self._finish(run, FAILED)
+
+    def _finish(self, run: TriggerRun, status: str):
+        """Move a run to a final state, release its slot and start the next queued run."""
+        run.status = status
+        run.finished_at = time.time()
+        self.metrics.incr(status)
+        if status in (CANCELLED, TIMED_OUT):
+            run._cancel_event.set()
+            if run.future is not None:
+                run.future.cancel()
+        for timer in (run._start_timer, run._timeout_timer):
+            if timer is not None:
+                timer.cancel()
+        run._done.set()
+
+        active = self._active.get(run.key, [])
+        if run in active:
+            active.remove(run)
+        queued = self._queued.get(run.key)
+        if not active and queued and not self._shutdown:
+            self._launch(queued.popleft())
+
+    def active_runs(self, key: Optional[str] = None) -> List[TriggerRun]:
+        """Return runs that are delayed or executing, optionally for one trigger."""
+        with self._lock:
+            if key is not None:
+                return list(self._active.get(key, []))
+            return [run for runs in self._active.values() for run in runs]
+
+    def shutdown(self, wait: bool = True):
+        """Cancel delayed and queued runs and stop the pool."""
+        with self._lock:
+            self._shutdown = True
+            queued, self._queued = self._queued, {}
+            for runs in queued.values():
+                for run in runs:
+                    self._finish(run, CANCELLED)
+            for run in self.active_runs():
+                if run.status == PENDING:
+                    self._finish(run, CANCELLED)
+        self._pool.shutdown(wait=wait)
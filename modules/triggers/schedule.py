@@ -10,7 +10,8 @@ Classes:
                       either cron expressions or fixed intervals.
 
 Dependencies:
-    schedule: For scheduling logic and job management
+    schedule: For interval scheduling logic and job management
+    cron: For compiled cron expressions and next-fire calculation
     threading: For background schedule monitoring
 
 Example Usage:
@@ -29,28 +30,42 @@ Example Usage:
     )
     trigger.start()
 
+    # Every 15 minutes during Amsterdam office hours on weekdays
+    trigger = ScheduledTrigger(
+        workflow=my_workflow.execute,
+        cron_expression='*/15 9-17 * * mon-fri',
+        timezone='Europe/Amsterdam'
+    )
+    trigger.start()
+
 Note:
     The scheduler runs in a daemon thread. Ensure the main thread remains alive
-    while scheduling is active. For cron expressions, only the first two fields
-    (minute and hour) are currently utilized for daily scheduling.
+    while scheduling is active. Cron expressions are compiled once by
+    modules.triggers.cron.CronExpression and support all five fields.
 """
 
 import time
 import schedule
-from datetime import datetime
-from typing import Callable, Any
+from datetime import datetime, timezone as dt_timezone
+from typing import Callable, Any, Optional
 import threading
 from modules.triggers.base_trigger import BaseTrigger
+from modules.triggers.cron import CronExpression
+
+INTERVAL_UNIT_SECONDS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400, "week": 604800}
 
 class ScheduledTrigger(BaseTrigger):
     """
     Time-based workflow trigger supporting cron-style and interval scheduling.
 
-    This trigger implementation uses the schedule library to manage recurring
-    jobs and executes associated workflows when scheduled times occur.
+    Interval jobs are managed by the schedule library. Cron jobs are compiled
+    into a CronExpression and the next fire time is precomputed after every run,
+    so checking for due work is a single comparison.
 
     Attributes:
-        cron_expression (str): Optional cron-style schedule string (min hour * * *)
+        cron_expression (str): Optional cron-style schedule string (min hour dom month dow)
+        cron (CronExpression): Compiled cron expression, if any
+        next_run (datetime): Next cron fire time (timezone-aware)
         interval (int): Recurring interval value
         interval_unit (str): Time unit for intervals (seconds|minutes|hours|days)
         scheduler (schedule.Scheduler): Underlying scheduler instance
@@ -58,9 +73,12 @@ class ScheduledTrigger(BaseTrigger):
 
     Args:
         workflow (Callable[[], Any]): Workflow function to execute when triggered
-        cron_expression (str): Cron string in 'min hour * * *' format
+        cron_expression (str): Five-field cron string or macro (e.g. '@hourly')
         interval (int): Recurring interval length
         interval_unit (str): Time unit for intervals (default: minutes)
+        timezone (str): IANA timezone for cron expressions (default: system local time)
+        **trigger_options: Execution options passed to BaseTrigger (executor,
+                           overlap_policy, timeout, jitter, name)
 
     Raises:
         ValueError: For invalid cron expressions or scheduling parameters
@@ -70,13 +88,22 @@ class ScheduledTrigger(BaseTrigger):
         workflow: Callable[[], Any],
         cron_expression: str = None,
         interval: int = None,
-        interval_unit: str = 'minutes'
+        interval_unit: str = 'minutes',
+        timezone: str = None,
+        **trigger_options
     ):
-        super().__init__(workflow)
+        if "name" not in trigger_options:
+            # Include the schedule so triggers sharing a workflow stay distinct across nodes
+            schedule_text = cron_expression or f"every {interval} {interval_unit}"
+            trigger_options["name"] = f"ScheduledTrigger:{getattr(workflow, '__qualname__', repr(workflow))}:{schedule_text}"
+        super().__init__(workflow, **trigger_options)
         self.cron_expression = cron_expression
         self.interval = interval
         self.interval_unit = interval_unit
+        self.timezone = timezone
         self.scheduler = schedule.Scheduler()
+        self.cron: Optional[CronExpression] = None
+        self.next_run: Optional[datetime] = None
 
         if cron_expression:
             self._parse_cron(cron_expression)
@@ -84,26 +111,49 @@ class ScheduledTrigger(BaseTrigger):
             self._setup_interval()
 
     def _parse_cron(self, cron: str):
-        """Parse cron-style expression (min hour day month day_of_week)"""
-        parts = cron.split()
-        if len(parts) < 2:
-            raise ValueError("Invalid cron expression")
-        # Schedule daily at specific time (minute, hour)
-        self.scheduler.every().day.at(f"{parts[1]}:{parts[0]}").do(self.execute_workflow)
+        """Compile cron-style expression (min hour day month day_of_week)"""
+        self.cron = CronExpression(cron, timezone=self.timezone)
+        self.next_run = self.cron.next_after(self._now())
+
+    def _now(self) -> datetime:
+        if self.cron is not None and self.cron.tz is not None:
+            return datetime.now(self.cron.tz)
+        return datetime.now(dt_timezone.utc).astimezone()
+
+    def _run_cron_pending(self):
+        """Run the cron job if its precomputed fire time has passed."""
+        now = self._now()
+        if self.next_run is None or now < self.next_run:
+            return
+        self.execute_workflow(scheduled_time=self.next_run.timestamp())
+        # Compute from 'now' so a stalled process does not replay missed runs
+        self.next_run = self.cron.next_after(now)
 
     def _setup_interval(self):
         """Correct interval-based scheduling"""
         job = self.scheduler.every(self.interval)
-        getattr(job, self.interval_unit).do(self.execute_workflow)
+        getattr(job, self.interval_unit).do(self._run_interval)
+
+    def _run_interval(self):
+        """
+        Run an interval job, reporting the start of the current interval slot as the
+        scheduled time. Nodes started at different moments thus agree on the slot,
+        which lets a coordinator deduplicate interval runs across nodes.
+        """
+        period = self.interval * INTERVAL_UNIT_SECONDS.get(self.interval_unit.rstrip("s"), 60)
+        now = time.time()
+        self.execute_workflow(scheduled_time=now - (now % period))
 
     def check_condition(self) -> bool:
-        return len(self.scheduler.get_jobs()) > 0
+        return self.cron is not None or len(self.scheduler.get_jobs()) > 0
 
     def start(self):
         self._active = True
         def run_scheduler():
             while self._active:
                 self.scheduler.run_pending()
+                if self.cron is not None:
+                    self._run_cron_pending()
                 time.sleep(1)
 
         scheduler_thread = threading.Thread(target=run_scheduler)
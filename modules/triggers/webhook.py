@@ -0,0 +1,339 @@
+"""
+Webhook Trigger Module
+
+Event-driven trigger that starts workflows when other systems POST to it.
+
+Classes:
+    DeliveryCache: Bounded, time-limited set of recently seen delivery IDs.
+    WebhookTrigger: asyncio HTTP/1.1 server that validates, deduplicates and
+                    enqueues webhook deliveries as workflow runs.
+
+Request handling:
+    - POST {path} with a body of at most max_body_bytes
+    - If a secret is configured, the signature header must be
+      'sha256=<hex HMAC-SHA256 of the raw body>' (GitHub style)
+    - Deliveries carrying an already seen delivery ID are acknowledged with
+      200 and not run again
+    - Accepted deliveries are put on a bounded queue and acknowledged with 202
+      immediately; dispatcher tasks hand them to the workflow off the event loop
+    - When the queue is full the server answers 503 with Retry-After instead of
+      blocking the acceptor
+    - GET /health answers 200 for load balancer checks
+
+Example Usage:
+    def on_event(event):
+        print(event["delivery_id"], event["payload"])
+
+    trigger = WebhookTrigger(
+        workflow=on_event,
+        port=8081,
+        secret=os.getenv("WEBHOOK_SECRET"),
+        executor=TriggerExecutor(max_workers=8)
+    )
+    trigger.start()
+
+Note:
+    The workflow is called with one argument, an event dict with the keys
+    delivery_id, path, headers, payload (parsed JSON, or text) and received_at.
+    Connections use keep-alive; chunked request bodies are not supported.
+    With a coordinator, deliveries are also deduplicated across nodes by claiming
+    their delivery ID, but they are not partitioned: each node runs what it receives.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from modules.triggers.base_trigger import BaseTrigger
+from modules.triggers.executor import OverlapPolicy
+
+REASONS = {
+    200: b"OK", 202: b"Accepted", 400: b"Bad Request", 401: b"Unauthorized",
+    404: b"Not Found", 405: b"Method Not Allowed", 408: b"Request Timeout",
+    411: b"Length Required", 413: b"Payload Too Large",
+    431: b"Request Header Fields Too Large", 501: b"Not Implemented",
+    503: b"Service Unavailable",
+}
+
+
+class DeliveryCache:
+    """
+    Remembers delivery IDs for ttl seconds, keeping at most max_size of them.
+
+    Insertion order equals expiry order, so expired entries are always at the
+    front and are dropped in amortized O(1) per insert.
+    """
+    def __init__(self, max_size: int = 100_000, ttl: float = 24 * 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+
+    def add(self, delivery_id: str, now: float) -> bool:
+        """Record a delivery ID. Returns False if it was already seen."""
+        seen = self._seen
+        while seen:
+            _, expires_at = next(iter(seen.items()))
+            if expires_at > now and len(seen) < self.max_size:
+                break
+            seen.popitem(last=False)
+        if delivery_id in seen:
+            return False
+        seen[delivery_id] = now + self.ttl
+        return True
+
+    def discard(self, delivery_id: str):
+        self._seen.pop(delivery_id, None)
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+
+class WebhookTrigger(BaseTrigger):
+    """
+    Webhook trigger backed by an asyncio HTTP server.
+
+    Attributes:
+        stats (Dict[str, int]): Counters for accepted, duplicate, unauthorized,
+                                overloaded and rejected requests
+
+    Args:
+        workflow (Callable[[dict], Any]): Workflow called with the event dict
+        host (str): Interface to bind (default: 127.0.0.1)
+        port (int): Port to listen on (default: 8081)
+        path (str): Request path that accepts deliveries (default: /webhook)
+        secret (str): Shared HMAC secret; signatures are not checked when empty
+        signature_header (str): Header carrying the signature
+        delivery_id_header (str): Header carrying the unique delivery ID
+        max_body_bytes (int): Largest accepted request body
+        queue_size (int): Deliveries buffered before answering 503
+        dispatch_concurrency (int): Deliveries handed to the workflow concurrently
+        idle_timeout (float): Seconds an idle keep-alive connection stays open
+        dedupe_ttl (float): Seconds a delivery ID is remembered
+        **trigger_options: Execution options passed to BaseTrigger (executor,
+                           overlap_policy, timeout, jitter, name, coordinator).
+                           overlap_policy defaults to parallel for webhooks.
+    """
+    def __init__(
+        self,
+        workflow: Callable[[dict], Any],
+        host: str = "127.0.0.1",
+        port: int = 8081,
+        path: str = "/webhook",
+        secret: Optional[str] = None,
+        signature_header: str = "X-Signature-256",
+        delivery_id_header: str = "X-Delivery-ID",
+        max_body_bytes: int = 1024 * 1024,
+        queue_size: int = 10_000,
+        dispatch_concurrency: int = 8,
+        idle_timeout: float = 30.0,
+        dedupe_ttl: float = 24 * 3600,
+        **trigger_options
+    ):
+        trigger_options.setdefault("overlap_policy", OverlapPolicy.PARALLEL)
+        super().__init__(workflow, **trigger_options)
+        self.host = host
+        self.port = port
+        self.path = path
+        self._secret = secret.encode("utf-8") if secret else None
+        self.signature_header = signature_header.lower()
+        self.delivery_id_header = delivery_id_header.lower()
+        self.max_body_bytes = max_body_bytes
+        self.queue_size = queue_size
+        self.dispatch_concurrency = dispatch_concurrency
+        self.idle_timeout = idle_timeout
+        self.deliveries = DeliveryCache(ttl=dedupe_ttl)
+        self.stats: Dict[str, int] = {
+            "accepted": 0, "duplicate": 0, "unauthorized": 0, "overloaded": 0, "rejected": 0,
+        }
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._dispatch_pool: Optional[ThreadPoolExecutor] = None
+        self._ready = threading.Event()
+
+    # ---- HTTP handling -------------------------------------------------
+
+    @staticmethod
+    def _response(status: int, body: bytes = b"", keep_alive: bool = True, extra: bytes = b"") -> bytes:
+        return b"".join((
+            b"HTTP/1.1 %d %s\r\n" % (status, REASONS.get(status, b"")),
+            b"Content-Type: application/json\r\n",
+            b"Content-Length: %d\r\n" % len(body),
+            b"Connection: keep-alive\r\n" if keep_alive else b"Connection: close\r\n",
+            extra,
+            b"\r\n",
+            body,
+        ))
+
+    def _verify_signature(self, headers: Dict[str, str], body: bytes) -> bool:
+        if self._secret is None:
+            return True
+        signature = headers.get(self.signature_header, "")
+        expected = "sha256=" + hmac.new(self._secret, body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(signature, expected)
+
+    def _handle_request(self, method: bytes, target: bytes, headers: Dict[str, str], body: bytes) -> Tuple[int, bytes, bytes]:
+        """Validate and enqueue one request. Returns (status, body, extra headers)."""
+        path = target.split(b"?", 1)[0].decode("latin-1")
+        if method == b"GET" and path == "/health":
+            return 200, b'{"status":"ok"}', b""
+        if path != self.path:
+            self.stats["rejected"] += 1
+            return 404, b'{"error":"not found"}', b""
+        if method != b"POST":
+            self.stats["rejected"] += 1
+            return 405, b'{"error":"method not allowed"}', b"Allow: POST\r\n"
+        if not self._verify_signature(headers, body):
+            self.stats["unauthorized"] += 1
+            return 401, b'{"error":"invalid signature"}', b""
+
+        now = time.time()
+        delivery_id = headers.get(self.delivery_id_header)
+        if delivery_id is not None and not self.deliveries.add(delivery_id, now):
+            self.stats["duplicate"] += 1
+            return 200, b'{"status":"duplicate"}', b""
+
+        if self._queue.full():
+            if delivery_id is not None:
+                self.deliveries.discard(delivery_id)  # let the sender's retry through
+            self.stats["overloaded"] += 1
+            return 503, b'{"error":"overloaded"}', b"Retry-After: 1\r\n"
+
+        self._queue.put_nowait((delivery_id, path, headers, body, now))
+        self.stats["accepted"] += 1
+        return 202, b'{"status":"queued"}', b""
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.idle_timeout)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    writer.write(self._response(431, keep_alive=False))
+                    break
+
+                lines = head[:-4].split(b"\r\n")
+                try:
+                    method, target, version = lines[0].split(b" ", 2)
+                except ValueError:
+                    writer.write(self._response(400, keep_alive=False))
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(b":")
+                    headers[name.strip().lower().decode("latin-1")] = value.strip().decode("latin-1")
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == b"HTTP/1.1" else connection == "keep-alive"
+
+                if "transfer-encoding" in headers:
+                    writer.write(self._response(501, keep_alive=False))
+                    break
+                try:
+                    length = int(headers.get("content-length", "0"))
+                except ValueError:
+                    writer.write(self._response(411, keep_alive=False))
+                    break
+                if length > self.max_body_bytes:
+                    writer.write(self._response(413, keep_alive=False))
+                    break
+                try:
+                    body = await asyncio.wait_for(reader.readexactly(length), self.idle_timeout) if length else b""
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+
+                status, response_body, extra = self._handle_request(method, target, headers, body)
+                writer.write(self._response(status, response_body, keep_alive, extra))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    # ---- Dispatch ------------------------------------------------------
+
+    def _dispatch(self, delivery_id: Optional[str], path: str, headers: Dict[str, str], body: bytes, received_at: float):
+        """Runs on the dispatch pool: decode, dedupe across nodes and run the workflow."""
+        if delivery_id is not None and self.coordinator is not None:
+            if not self.coordinator.claim(f"{self.name}#{delivery_id}"):
+                return
+        text = body.decode("utf-8", errors="replace")
+        try:
+            payload = json.loads(text) if text else None
+        except json.JSONDecodeError:
+            payload = text
+        event = {
+            "delivery_id": delivery_id,
+            "path": path,
+            "headers": headers,
+            "payload": payload,
+            "received_at": received_at,
+        }
+        return self._run_workflow((event,), received_at)
+
+    async def _dispatcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            delivery = await self._queue.get()
+            try:
+                await loop.run_in_executor(self._dispatch_pool, self._dispatch, *delivery)
+            except Exception as e:
+                print(f"[WebhookTrigger] Failed to dispatch delivery {delivery[0]}: {e}")
+            finally:
+                self._queue.task_done()
+
+    # ---- Lifecycle -----------------------------------------------------
+
+    async def serve(self):
+        """Run the server on the current event loop until stop() is called."""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._dispatch_pool = ThreadPoolExecutor(
+            max_workers=self.dispatch_concurrency, thread_name_prefix="webhook-dispatch"
+        )
+        dispatchers = [asyncio.create_task(self._dispatcher()) for _ in range(self.dispatch_concurrency)]
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port, limit=64 * 1024, backlog=1024
+        )
+        self._active = True
+        self._ready.set()
+        print(f"[WebhookTrigger] Listening on http://{self.host}:{self.port}{self.path}")
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            for task in dispatchers:
+                task.cancel()
+            self._dispatch_pool.shutdown(wait=False)
+            self._active = False
+
+    def check_condition(self) -> bool:
+        return self._active
+
+    def start(self):
+        """Start the server on its own event loop in a daemon thread."""
+        self._ready.clear()
+
+        def run_server():
+            asyncio.run(self.serve())
+
+        server_thread = threading.Thread(target=run_server, daemon=True)
+        server_thread.start()
+        self._ready.wait(timeout=10)
+
+    def stop(self):
+        """Stop accepting connections; queued deliveries are dropped."""
+        self._active = False
+        if self._loop is not None and self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import pytest
+
+from modules.triggers.cron import CronExpression
+
+
+def fire_times(expression, start, count=3):
+    cron = CronExpression(expression)
+    times = []
+    for _ in range(count):
+        start = cron.next_after(start)
+        times.append(start)
+    return times
+
+
+def test_last_day_of_month():
+    assert fire_times("0 0 L * *", datetime(2024, 1, 15)) == [
+        datetime(2024, 1, 31), datetime(2024, 2, 29), datetime(2024, 3, 31),
+    ]
+
+
+def test_last_weekday_of_month():
+    # 2024-03-31 is a Sunday
+    assert fire_times("0 0 LW * *", datetime(2024, 3, 1), 1) == [datetime(2024, 3, 29)]
+
+
+def test_nearest_weekday_stays_in_month():
+    # 2024-06-01 is a Saturday: the Monday after, not the Friday in May
+    assert fire_times("0 0 1W * *", datetime(2024, 5, 15), 1) == [datetime(2024, 6, 3)]
+    # 2024-06-15 is a Saturday, 2024-09-15 a Sunday
+    assert CronExpression("0 0 15W * *").next_after(datetime(2024, 6, 1)) == datetime(2024, 6, 14)
+    assert CronExpression("0 0 15W * *").next_after(datetime(2024, 9, 1)) == datetime(2024, 9, 16)
+
+
+def test_nearest_weekday_in_list():
+    assert fire_times("0 0 1,L * *", datetime(2024, 1, 15)) == [
+        datetime(2024, 1, 31), datetime(2024, 2, 1), datetime(2024, 2, 29),
+    ]
+
+
+@pytest.mark.parametrize("expression", ["0 0 L5 * *", "0 0 0W * *", "0 0 W * *", "0 0 32W * *"])
+def test_invalid_last_and_weekday_values(expression):
+    with pytest.raises(ValueError):
+        CronExpression(expression)
+
+
+def test_day_of_week_seven_is_sunday():
+    assert CronExpression("0 9 * * 7").weekdays == CronExpression("0 9 * * 0").weekdays == 1
+    # 2024-01-07 is a Sunday
+    assert CronExpression("0 9 * * 5-7").next_after(datetime(2024, 1, 6, 10)) == datetime(2024, 1, 7, 9)
+
+
+def test_day_of_month_or_day_of_week_when_both_restricted():
+    # The 13th, or any Friday: 2024-09-06 and 2024-09-13 are Fridays
+    assert fire_times("0 0 13 * fri", datetime(2024, 9, 1)) == [
+        datetime(2024, 9, 6), datetime(2024, 9, 13), datetime(2024, 9, 20),
+    ]
+
+
+def test_day_of_month_and_day_of_week_when_one_is_wildcard():
+    # '*/1' starts with '*', so only the weekday restricts the day
+    assert fire_times("0 0 */1 * fri", datetime(2024, 9, 1), 2) == [datetime(2024, 9, 6), datetime(2024, 9, 13)]
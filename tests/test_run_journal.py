@@ -0,0 +1,135 @@
+import pytest
+
+from agents.managers import base_manager
+from agents.managers.base_manager import BaseManager
+from modules.ai_modules.models.schemas import WorkflowChoice
+from workflows.run_journal import (
+    CLAIMED, COMPLETED, DISPATCHED, FAILED, IN_PROGRESS, RUNNING, TAKEN_OVER, RunJournal,
+)
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / "run_journal.db")
+
+
+def reopen(path):
+    """A journal as seen by a later process"""
+    return RunJournal(path, owner="next-process", started_at=float("inf"))
+
+
+class CountingWorkflow:
+    runs = 0
+
+    def execute(self, **params):
+        CountingWorkflow.runs += 1
+        return "done"
+
+
+class ChoosingModel:
+    prompt_types = ("structured",)
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, text, prompt_type=None, schema=None, check=None, on_member=None):
+        self.calls += 1
+        return check(WorkflowChoice(workflow="counting", params={}))
+
+
+@pytest.fixture
+def manager_factory(monkeypatch):
+    monkeypatch.setitem(base_manager.managers_config, "tester", {
+        "name": "tester", "role": "tester",
+        "workflows": [{"name": "counting", "trigger": CountingWorkflow, "params": {}}],
+    })
+    CountingWorkflow.runs = 0
+    return lambda journal: BaseManager(ChoosingModel(), name="tester", journal=journal)
+
+
+def test_begin_twice_reports_live_run(journal_path):
+    journal = RunJournal(journal_path)
+    try:
+        first = journal.begin("k", manager="tester", task="t")
+        second = journal.begin("k", manager="tester", task="t")
+        assert first.claim == CLAIMED
+        assert second.claim == IN_PROGRESS
+    finally:
+        journal.close()
+
+
+def test_begin_of_finished_run_returns_its_output(journal_path):
+    journal = RunJournal(journal_path)
+    try:
+        record = journal.begin("k", manager="tester", task="t")
+        journal.complete(record, "done")
+        again = journal.begin("k", manager="tester", task="t")
+        assert again.finished and again.status == COMPLETED and again.output == "done"
+    finally:
+        journal.close()
+
+
+def test_duplicate_delivery_is_not_run_again(journal_path, manager_factory):
+    journal = RunJournal(journal_path)
+    try:
+        journal.begin("k", manager="tester", task="t")
+        manager = manager_factory(journal)
+        assert manager.run("t", run_key="k") == "This request is already in progress."
+        assert manager.model.calls == 0 and CountingWorkflow.runs == 0
+        assert journal.get("k").status != FAILED
+    finally:
+        journal.close()
+
+
+def test_resume_from_running_skips_planning(journal_path, manager_factory):
+    journal = RunJournal(journal_path)
+    record = journal.begin("k", manager="tester", task="t")
+    journal.plan(record, "counting", {})
+    journal.close()
+
+    journal = reopen(journal_path)
+    try:
+        assert [r.key for r in journal.abandoned()] == ["k"]
+        assert journal.get("k").status == RUNNING
+        manager = manager_factory(journal)
+        assert manager.run("t", run_key="k") == "done"
+        assert manager.model.calls == 0 and CountingWorkflow.runs == 1
+        assert journal.get("k").status == COMPLETED
+    finally:
+        journal.close()
+
+
+def test_dispatched_run_is_failed_as_interrupted(journal_path, manager_factory):
+    journal = RunJournal(journal_path)
+    record = journal.begin("k", manager="tester", task="t")
+    journal.plan(record, "counting", {})
+    journal.dispatch(record)
+    journal.close()
+
+    journal = reopen(journal_path)
+    try:
+        manager = manager_factory(journal)
+        output = manager.run("t", run_key="k")
+        assert "interrupted" in output
+        assert CountingWorkflow.runs == 0
+        assert journal.get("k").status == FAILED
+    finally:
+        journal.close()
+
+
+def test_begin_takes_over_runs_of_earlier_processes_once(journal_path):
+    journal = RunJournal(journal_path)
+    record = journal.begin("k", manager="tester", task="t")
+    journal.plan(record, "counting", {})
+    journal.dispatch(record)
+    journal.close()
+
+    journal = reopen(journal_path)
+    try:
+        taken = journal.begin("k", manager="tester", task="t")
+        assert taken.claim == TAKEN_OVER and taken.status == DISPATCHED
+        assert taken.owner == journal.get("k").owner == journal.owner
+        assert journal.begin("k", manager="tester", task="t").claim == IN_PROGRESS
+        assert journal.abandoned() == []
+    finally:
+        journal.close()
@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from modules.ai_modules.models.structured import extract_json, repair_json
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"workflow": "add_to_calendar", "params": {"summary": "Lunch', {"workflow": "add_to_calendar", "params": {"summary": "Lunch"}}),
+    ('[{"content": "a", "intent": "general"}, {"content": "b"', [{"content": "a", "intent": "general"}, {"content": "b"}]),
+    ('{"manager": "Sam", "task":', {"manager": "Sam", "task": None}),
+    ('{"a": [1, 2', {"a": [1, 2]}),
+])
+def test_repair_truncated(text, expected):
+    assert json.loads(repair_json(text)) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": 1,}', {"a": 1}),
+    ('[1, 2, ]', [1, 2]),
+    ('{"a": [1, 2,], "b": {"c": 3,},}', {"a": [1, 2], "b": {"c": 3}}),
+])
+def test_repair_trailing_commas(text, expected):
+    assert json.loads(repair_json(text)) == expected
+
+
+def test_extract_fenced_answer():
+    answer = 'Here you go:\n```json\n{"manager": "Sam", "task": "Lunch on 2024-09-13",}\n```\nAnything else?'
+    value, repaired = extract_json(answer)
+    assert value == {"manager": "Sam", "task": "Lunch on 2024-09-13"}
+    assert repaired
+
+
+def test_extract_strict_json_is_not_repaired():
+    assert extract_json('{"a": 1}') == ({"a": 1}, False)
+
+
+def test_repair_python_literals_and_quotes():
+    assert json.loads(repair_json("{'done': True, 'note': None, 'n': 'it\\'s'}")) == {"done": True, "note": None, "n": "it's"}
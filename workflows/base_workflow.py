@@ -9,6 +9,14 @@ class Workflow:
     def get_id(self):
         return self.id
     
+    def warm_up(self):
+        """
+        Optional setup ahead of execute() (credentials, clients, connections), run
+        on another thread while the params are still being generated. Must be safe
+        to run concurrently with execute(), which waits for or repeats the setup.
+        """
+        pass
+
     def execute(self):
         """Main workflow execution logic"""
         print(f"Executing workflow {self.id}")
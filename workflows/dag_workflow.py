@@ -0,0 +1,229 @@
+# workflows/dag_workflow.py
+"""
+DAG Workflow Module
+
+Builds multi-step workflows out of steps that declare their dependencies.
+Independent steps run concurrently: coroutine functions on the event loop,
+plain functions on a thread pool. Each step runs at most once per run, and its
+output is handed to every step that depends on it.
+
+Classes:
+    Step: A named unit of work with dependencies and retry/timeout policies.
+    StepFailed: Raised when a step fails after exhausting its retries.
+    DagWorkflow: Workflow that executes its steps as a dependency graph.
+
+Example Usage:
+    workflow = DagWorkflow()
+    workflow.add_step("context", fetch_context)
+    workflow.add_step("draft", draft_with_llm, depends_on=["context"], retries=2, timeout=30)
+    workflow.add_workflow(AddToCalendarWorkflow(), name="calendar", depends_on=["draft"])
+    workflow.add_step("notify", notify_discord, depends_on=["calendar"])
+    result = workflow.execute(message="Lunch with Sam next Friday")
+
+Argument passing:
+    A step function receives, as keyword arguments, the run inputs passed to
+    execute() plus the outputs of its dependencies keyed by step name. Only the
+    names the function accepts are passed, unless it takes **kwargs.
+"""
+
+import asyncio
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from workflows.base_workflow import Workflow
+
+
+class StepFailed(Exception):
+    def __init__(self, step: str, error: BaseException):
+        super().__init__(f"Step '{step}' failed: {str(error) or type(error).__name__}")
+        self.step = step
+        self.error = error
+
+
+class Step:
+    """
+    A node in a DagWorkflow.
+
+    Args:
+        name (str): Unique step name; also the keyword its output is passed under
+        fn (Callable): Function or coroutine function doing the work
+        depends_on (Iterable[str]): Names of steps whose outputs this step needs
+        retries (int): Extra attempts after a failure or timeout
+        retry_delay (float): Seconds before the first retry
+        backoff (float): Multiplier applied to the delay after every retry
+        timeout (float): Seconds per attempt (None = no limit). A timed-out thread
+                         cannot be killed; its result is simply ignored.
+    """
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        depends_on: Iterable[str] = (),
+        retries: int = 0,
+        retry_delay: float = 0.5,
+        backoff: float = 2.0,
+        timeout: Optional[float] = None,
+    ):
+        self.name = name
+        self.fn = fn
+        self.depends_on = list(depends_on)
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.backoff = backoff
+        self.timeout = timeout
+
+        signature = inspect.signature(fn)
+        self._accepts_all = any(
+            p.kind == inspect.Parameter.VAR_KEYWORD for p in signature.parameters.values()
+        )
+        self._params = set(signature.parameters)
+        self._is_async = inspect.iscoroutinefunction(fn)
+
+    def select_kwargs(self, available: Dict[str, Any]) -> Dict[str, Any]:
+        if self._accepts_all:
+            return dict(available)
+        return {key: value for key, value in available.items() if key in self._params}
+
+    def __repr__(self) -> str:
+        return f"Step('{self.name}', depends_on={self.depends_on})"
+
+
+class DagWorkflow(Workflow):
+    """
+    Workflow composed of dependent steps.
+
+    Args:
+        max_threads (int): Thread pool size for synchronous steps
+        output_step (str): Step whose output execute() returns. Defaults to the only
+                           step without dependents; with several, a dict of all
+                           step outputs is returned.
+    """
+    def __init__(self, max_threads: int = 8, output_step: Optional[str] = None) -> None:
+        super().__init__()
+        self.steps: Dict[str, Step] = {}
+        self.max_threads = max_threads
+        self.output_step = output_step
+        self._order: Optional[List[str]] = None
+        self._workflows: List[Workflow] = []
+
+    def add_step(self, name: str, fn: Callable[..., Any], depends_on: Iterable[str] = (), **policy) -> Step:
+        """Add a step. Policy keywords are passed to Step (retries, retry_delay, backoff, timeout)."""
+        if name in self.steps:
+            raise ValueError(f"Duplicate step name '{name}'")
+        step = Step(name, fn, depends_on, **policy)
+        self.steps[name] = step
+        self._order = None
+        return step
+
+    def add_workflow(self, workflow: Workflow, name: Optional[str] = None, depends_on: Iterable[str] = (), **policy) -> Step:
+        """Wrap an existing Workflow instance as a step calling its execute() (execute_async() for a DagWorkflow)."""
+        self._workflows.append(workflow)
+        fn = workflow.execute_async if isinstance(workflow, DagWorkflow) else workflow.execute
+        return self.add_step(name or type(workflow).__name__, fn, depends_on, **policy)
+
+    def warm_up(self):
+        """Warms up the workflows added with add_workflow()."""
+        for workflow in self._workflows:
+            workflow.warm_up()
+
+    def _topological_order(self) -> List[str]:
+        """Validate dependencies and return steps in a valid execution order."""
+        if self._order is not None:
+            return self._order
+        remaining = {}
+        for step in self.steps.values():
+            for dependency in step.depends_on:
+                if dependency not in self.steps:
+                    raise ValueError(f"Step '{step.name}' depends on unknown step '{dependency}'")
+            remaining[step.name] = len(step.depends_on)
+
+        dependents: Dict[str, List[str]] = {name: [] for name in self.steps}
+        for step in self.steps.values():
+            for dependency in step.depends_on:
+                dependents[dependency].append(step.name)
+
+        ready = [name for name, count in remaining.items() if count == 0]
+        order = []
+        while ready:
+            name = ready.pop()
+            order.append(name)
+            for dependent in dependents[name]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+        if len(order) != len(self.steps):
+            cyclic = sorted(name for name, count in remaining.items() if count > 0)
+            raise ValueError(f"Dependency cycle between steps: {', '.join(cyclic)}")
+        self._order = order
+        return order
+
+    def _sinks(self) -> List[str]:
+        depended_on = {dependency for step in self.steps.values() for dependency in step.depends_on}
+        return [name for name in self.steps if name not in depended_on]
+
+    async def _run_step(self, step: Step, inputs: Dict[str, Any], tasks: Dict[str, asyncio.Task], pool: ThreadPoolExecutor):
+        dependency_outputs = {}
+        for dependency in step.depends_on:
+            dependency_outputs[dependency] = await tasks[dependency]
+        kwargs = step.select_kwargs({**inputs, **dependency_outputs})
+
+        loop = asyncio.get_running_loop()
+        delay = step.retry_delay
+        for attempt in range(step.retries + 1):
+            try:
+                if step._is_async:
+                    call = step.fn(**kwargs)
+                else:
+                    call = loop.run_in_executor(pool, lambda: step.fn(**kwargs))
+                return await asyncio.wait_for(call, step.timeout)
+            except Exception as e:
+                if attempt == step.retries:
+                    raise StepFailed(step.name, e) from e
+                print(f"[DagWorkflow] Step '{step.name}' attempt {attempt + 1} failed: {e!r}; retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                delay *= step.backoff
+
+    async def execute_async(self, **inputs) -> Any:
+        """Run all steps on the current event loop and return the workflow output."""
+        order = self._topological_order()
+        pool = ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix="dag-step")
+        tasks: Dict[str, asyncio.Task] = {}
+        try:
+            # Dependencies come first in 'order', so their tasks exist when awaited
+            for name in order:
+                tasks[name] = asyncio.ensure_future(self._run_step(self.steps[name], inputs, tasks, pool))
+            try:
+                await asyncio.gather(*tasks.values())
+            except StepFailed:
+                for task in tasks.values():
+                    task.cancel()
+                raise
+        finally:
+            pool.shutdown(wait=False)
+
+        results = {name: task.result() for name, task in tasks.items()}
+        output_step = self.output_step
+        if output_step is None:
+            sinks = self._sinks()
+            if len(sinks) != 1:
+                return results
+            output_step = sinks[0]
+        return results[output_step]
+
+    def execute(self, **inputs) -> Any:
+        """
+        Synchronous entry point, compatible with Workflow.execute.
+
+        Raises RuntimeError when called from inside a running event loop (e.g. a
+        Discord handler), which it would block; await execute_async() there, or
+        call execute() through asyncio.to_thread as the bot does for manager runs.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.execute_async(**inputs))
+        raise RuntimeError(
+            f"{type(self).__name__}.execute() would block the running event loop; "
+            f"await execute_async() or call execute() through asyncio.to_thread()"
+        )
@@ -1,13 +1,117 @@
 # workflows/my_workflows/add_to_calendar.py
 import os
 import json
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
+import threading
 
 from workflows.base_workflow import Workflow
+from workflows.dag_workflow import DagWorkflow
+from modules.telemetry.tracing import tracer
+
+# Credentials and the parsed Calendar discovery document, shared by all workflow runs
+# (and loaded at bot startup). Each run builds its own service from them, since a
+# service's HTTP connection must not be used by several threads at once.
+_credentials = None
+_credentials_lock = threading.Lock()
+_discovery = None
+_discovery_lock = threading.Lock()
+
+
+def calendar_discovery():
+    """
+    The Calendar v3 discovery document shipped with googleapiclient, parsed once.
+    None when the installed client does not ship it.
+    """
+    global _discovery
+    with _discovery_lock:
+        if _discovery is None:
+            from googleapiclient.discovery_cache import get_static_doc
+            document = get_static_doc("calendar", "v3")
+            _discovery = json.loads(document) if document else {}
+        return _discovery or None
+
+
+def google_credentials():
+    """
+    The OAuth credentials from tokens/google_tokens.json, loaded once and
+    refreshed when expired. None when no tokens are stored.
+    """
+    global _credentials
+    # Imported here so loading the manager config does not pull in the Google client libraries
+    from google.oauth2.credentials import Credentials
+    from google.auth.transport.requests import Request
+
+    token_path = os.path.join("tokens", "google_tokens.json")
+    with _credentials_lock:
+        if _credentials is None:
+            # 1. Load stored tokens from your OAuth flow
+            if not os.path.exists(token_path):
+                return None
+
+            with open(token_path, "r") as f:
+                token_data = json.load(f)
+
+            # 2. Build Credentials object from these tokens
+            _credentials = Credentials(
+                token=token_data["access_token"],
+                refresh_token=token_data.get("refresh_token"),
+                token_uri="https://oauth2.googleapis.com/token",
+                client_id=os.getenv("GOOGLE_DRIVE_CLIENT_ID"),
+                client_secret=os.getenv("GOOGLE_DRIVE_CLIENT_SECRET"),
+                scopes=["https://www.googleapis.com/auth/calendar"]
+            )
+
+        creds = _credentials
+        # 3. Refresh token if necessary (the google-auth library handles the logic)
+        if creds.expired and creds.refresh_token:
+            creds.refresh(Request())
+            # Optionally store updated credentials back to file
+            updated_token_data = {
+                "access_token": creds.token,
+                "refresh_token": creds.refresh_token,
+                "scope": " ".join(creds.scopes),
+                "token_type": "Bearer"
+            }
+            with open(token_path, "w") as f:
+                json.dump(updated_token_data, f, indent=2)
+        return creds
+
 
 class AddToCalendarWorkflow(Workflow):
+    def __init__(self) -> None:
+        super().__init__()
+        self._service = None
+        self._service_lock = threading.Lock()
+
+    def warm_up(self):
+        """Loads (and if needed refreshes) the OAuth credentials and builds the Calendar service."""
+        with tracer.span("google.calendar.connect"):
+            self._calendar_service()
+
+    def _calendar_service(self):
+        """
+        The Calendar service, built once per instance. A warm-up still in progress
+        is waited for rather than repeated. None when no tokens are stored.
+        """
+        with self._service_lock:
+            if self._service is None:
+                self._service = self._build_service()
+            return self._service
+
+    def _build_service(self):
+        """Builds the service from the shared credentials and discovery document."""
+        # Imported here so loading the manager config does not pull in the Google client libraries
+        from googleapiclient.discovery import build, build_from_document
+
+        creds = google_credentials()
+        if creds is None:
+            return None
+
+        # 4. Build the Google Calendar service, without reading and parsing the discovery file again
+        discovery = calendar_discovery()
+        if discovery is None:
+            return build("calendar", "v3", credentials=creds)
+        return build_from_document(discovery, credentials=creds)
+
     def execute(
         self,
         summary: str,
@@ -28,40 +132,11 @@ class AddToCalendarWorkflow(Workflow):
         :return: A string message about the created event or any errors.
         """
 
-        # 1. Load stored tokens from your OAuth flow
-        token_path = os.path.join("tokens", "google_tokens.json")
-        if not os.path.exists(token_path):
+        # 1-4. Credentials and service, unless warm_up() already prepared them
+        service = self._calendar_service()
+        if service is None:
             return "No OAuth tokens found. Please authorize Google first."
 
-        with open(token_path, "r") as f:
-            token_data = json.load(f)
-
-        # 2. Build Credentials object from these tokens
-        creds = Credentials(
-            token=token_data["access_token"],
-            refresh_token=token_data.get("refresh_token"),
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=os.getenv("GOOGLE_DRIVE_CLIENT_ID"),
-            client_secret=os.getenv("GOOGLE_DRIVE_CLIENT_SECRET"),
-            scopes=["https://www.googleapis.com/auth/calendar"]
-        )
-
-        # 3. Refresh token if necessary (the google-auth library handles the logic)
-        if creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-            # Optionally store updated credentials back to file
-            updated_token_data = {
-                "access_token": creds.token,
-                "refresh_token": creds.refresh_token,
-                "scope": " ".join(creds.scopes),
-                "token_type": "Bearer"
-            }
-            with open(token_path, "w") as f:
-                json.dump(updated_token_data, f, indent=2)
-
-        # 4. Build the Google Calendar service
-        service = build("calendar", "v3", credentials=creds)
-
         # 5. Construct the event body
         event_body = {
             "summary": summary,
@@ -82,9 +157,17 @@ class AddToCalendarWorkflow(Workflow):
             event_body["description"] = description
 
         try:
-            event = service.events().insert(
-                calendarId=calendar_id, body=event_body
-            ).execute()
+            with tracer.span("google.calendar.insert"):
+                event = service.events().insert(
+                    calendarId=calendar_id, body=event_body
+                ).execute()
             return f"Event created successfully! View it here: {event.get('htmlLink')}"
         except Exception as e:
             return f"Failed to create event: {str(e)}"
+
+
+class AddToCalendarDagWorkflow(DagWorkflow):
+    """AddToCalendarWorkflow as a single-step DAG, so it can be extended with further steps."""
+    def __init__(self) -> None:
+        super().__init__()
+        self.add_workflow(AddToCalendarWorkflow(), name="add_to_calendar")
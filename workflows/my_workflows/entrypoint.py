@@ -1,11 +1,14 @@
 # workflows/my_workflows/test_workflow.py
 
 from workflows.base_workflow import Workflow
-from modules.app_actions.discord.executive_director_bot import bot
 import os
 
 class OnDiscordMessageWorkflow(Workflow):
     def execute(self):
+        from modules.app_actions.discord.executive_director_bot import bot
+        from modules.telemetry.tracing import tracer
+        # Serves /metrics when METRICS_PORT is set
+        tracer.start_metrics_server()
         TOKEN = os.getenv('DISCORD_BOT_TOKEN')
         bot.run(TOKEN)
 
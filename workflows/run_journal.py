@@ -0,0 +1,380 @@
+# workflows/run_journal.py
+"""
+Run Journal Module
+
+Durable record of workflow runs, used to resume runs after a crash and to
+answer duplicate deliveries of the same request without executing it again.
+
+Classes:
+    RunRecord: One journaled run.
+    RunJournal: SQLite (WAL) journal with group-committed writes.
+
+Run lifecycle:
+    begin()    -> pending    request received, workflow not chosen yet
+    plan()     -> running    workflow and params resolved, not executed yet
+    dispatch() -> dispatched workflow execution started; its side effects may have happened
+    complete() -> completed  output stored
+    fail()     -> failed     user-facing error stored
+
+    A run interrupted while running is resumed by executing its workflow. One
+    interrupted while dispatched is not executed again, since the workflow may
+    already have taken effect (e.g. a calendar event was created).
+
+Ownership:
+    begin() is an atomic claim: the record is inserted (or read back) in one
+    transaction, tagged with the journal's owner token (one per process). An
+    unfinished record of the same owner is a live run ("in_progress", e.g. a
+    duplicate delivery); only one left behind by an earlier process is taken
+    over ("taken_over") and may be resumed.
+
+Performance:
+    All writes go through one writer thread. It collects whatever writes arrived
+    in the last few milliseconds and commits them in a single transaction, so
+    concurrent runs share one commit instead of paying one each. Callers wait for
+    their write to be committed before continuing, which keeps the journal ahead
+    of the side effects it describes. With synchronous=NORMAL in WAL mode commits
+    survive process crashes without an fsync per transaction; use FULL to also
+    survive power loss.
+"""
+
+import hashlib
+import json
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+PENDING = "pending"
+RUNNING = "running"
+DISPATCHED = "dispatched"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# Outcomes of begin(), in RunRecord.claim
+CLAIMED = "claimed"          # new record, owned by this journal
+IN_PROGRESS = "in_progress"  # unfinished and owned by this process: a live run
+TAKEN_OVER = "taken_over"    # unfinished run of an earlier process, now owned by this journal
+
+_COLUMNS = (
+    "key", "message_key", "manager", "task", "workflow", "params",
+    "status", "output", "channel_id", "created_at", "updated_at", "owner",
+)
+
+# Owner token of this process, and when it started
+PROCESS_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+PROCESS_STARTED = time.time()
+
+
+class RunRecord:
+    """A single journaled workflow run."""
+    def __init__(
+        self,
+        key: str,
+        message_key: str = "",
+        manager: str = "",
+        task: str = "",
+        workflow: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+        status: str = PENDING,
+        output: Optional[str] = None,
+        channel_id: Optional[int] = None,
+        created_at: float = 0.0,
+        updated_at: float = 0.0,
+        owner: str = "",
+        claim: Optional[str] = None,
+    ):
+        self.key = key
+        self.message_key = message_key
+        self.manager = manager
+        self.task = task
+        self.workflow = workflow
+        self.params = params
+        self.status = status
+        self.output = output
+        self.channel_id = channel_id
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.owner = owner
+        self.claim = claim  # outcome of begin(); not stored
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "RunRecord":
+        values = dict(zip(_COLUMNS, row))
+        values["params"] = json.loads(values["params"]) if values["params"] else None
+        return cls(**values)
+
+    def to_row(self) -> tuple:
+        values = dict(self.__dict__)
+        values["params"] = json.dumps(self.params) if self.params is not None else None
+        return tuple(values[column] for column in _COLUMNS)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (COMPLETED, FAILED)
+
+    def __repr__(self) -> str:
+        return f"RunRecord(key='{self.key}', manager='{self.manager}', status='{self.status}')"
+
+
+class RunJournal:
+    """
+    Journal of workflow runs keyed by idempotency key.
+
+    Args:
+        path (str): SQLite database file
+        flush_interval (float): Seconds the writer waits to gather more writes into a batch
+        max_batch (int): Maximum writes per transaction
+        synchronous (str): SQLite synchronous mode (NORMAL or FULL)
+        owner (str): Owner token of this journal's runs (default: one per process)
+        started_at (float): Records of other owners created before this are taken over
+                            by begin() (default: process start)
+    """
+    def __init__(
+        self,
+        path: str = "data/run_journal.db",
+        flush_interval: float = 0.002,
+        max_batch: int = 256,
+        synchronous: str = "NORMAL",
+        owner: Optional[str] = None,
+        started_at: Optional[float] = None,
+    ):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.owner = owner or PROCESS_OWNER
+        self.started_at = PROCESS_STARTED if started_at is None else started_at
+
+        self._write_conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._write_conn.execute("PRAGMA journal_mode=WAL")
+        self._write_conn.execute(f"PRAGMA synchronous={synchronous}")
+        self._write_conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                key TEXT PRIMARY KEY,
+                message_key TEXT NOT NULL,
+                manager TEXT NOT NULL,
+                task TEXT NOT NULL,
+                workflow TEXT,
+                params TEXT,
+                status TEXT NOT NULL,
+                output TEXT,
+                channel_id INTEGER,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                owner TEXT NOT NULL DEFAULT ''
+            );
+            CREATE INDEX IF NOT EXISTS runs_message_key ON runs (message_key);
+            CREATE INDEX IF NOT EXISTS runs_status ON runs (status);
+            """
+        )
+        columns = {row[1] for row in self._write_conn.execute("PRAGMA table_info(runs)")}
+        if "owner" not in columns:
+            self._write_conn.execute("ALTER TABLE runs ADD COLUMN owner TEXT NOT NULL DEFAULT ''")
+        self._read_conn = sqlite3.connect(path, check_same_thread=False)
+        self._read_lock = threading.Lock()
+        # begin() claims records synchronously on its own connection, outside the group commit
+        self._claim_conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=30)
+        self._claim_lock = threading.Lock()
+
+        # Latest state of every record with a write that is not committed yet.
+        # Reads consult it first, so callers always see their own writes.
+        self._unflushed: Dict[str, RunRecord] = {}
+        self._unflushed_lock = threading.Lock()
+
+        self._writes: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="run-journal-writer", daemon=True)
+        self._writer.start()
+
+    @staticmethod
+    def idempotency_key(message_key: str, part: int = 0) -> str:
+        """Key for the part-th run spawned by a message"""
+        return hashlib.sha256(f"{message_key}#{part}".encode("utf-8")).hexdigest()[:32]
+
+    @staticmethod
+    def message_key(*identifiers: Any) -> str:
+        """Stable key for an incoming message, e.g. message_key('discord', guild_id, channel_id, message_id)"""
+        return ":".join(str(identifier) for identifier in identifiers)
+
+    # ---- Writer --------------------------------------------------------
+
+    def _write_loop(self):
+        while True:
+            first = self._writes.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._writes.get(timeout=remaining) if remaining > 0 else self._writes.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._writes.put(None)  # handle shutdown after this batch
+                    break
+                batch.append(item)
+
+            error = None
+            try:
+                self._write_conn.execute("BEGIN")
+                self._write_conn.executemany(
+                    f"INSERT OR REPLACE INTO runs ({', '.join(_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' for _ in _COLUMNS)})",
+                    [record.to_row() for record, _ in batch],
+                )
+                self._write_conn.execute("COMMIT")
+            except Exception as e:
+                error = e
+                print(f"[RunJournal] Failed to commit {len(batch)} writes: {e}")
+                try:
+                    self._write_conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+
+            with self._unflushed_lock:
+                for record, _ in batch:
+                    if self._unflushed.get(record.key) is record:
+                        del self._unflushed[record.key]
+            for _, done in batch:
+                done["error"] = error
+                done["event"].set()
+
+    def _write(self, record: RunRecord, wait: bool = True):
+        """Queue the record's current state and optionally wait until it is committed."""
+        record.updated_at = time.time()
+        snapshot = RunRecord(**record.__dict__)
+        with self._unflushed_lock:
+            self._unflushed[record.key] = snapshot
+        done = {"event": threading.Event(), "error": None}
+        self._writes.put((snapshot, done))
+        if wait:
+            done["event"].wait()
+            if done["error"] is not None:
+                raise done["error"]
+
+    # ---- Reads ---------------------------------------------------------
+
+    def get(self, key: str) -> Optional[RunRecord]:
+        with self._unflushed_lock:
+            record = self._unflushed.get(key)
+        if record is not None:
+            return RunRecord(**record.__dict__)
+        with self._read_lock:
+            row = self._read_conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM runs WHERE key = ?", (key,)
+            ).fetchone()
+        return RunRecord.from_row(row) if row else None
+
+    def _query(self, where: str, params: tuple) -> List[RunRecord]:
+        with self._read_lock:
+            rows = self._read_conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM runs WHERE {where} ORDER BY created_at, key", params
+            ).fetchall()
+        records = {row[0]: RunRecord.from_row(row) for row in rows}
+        with self._unflushed_lock:
+            for record in self._unflushed.values():
+                records[record.key] = RunRecord(**record.__dict__)
+        return list(records.values())
+
+    def for_message(self, message_key: str) -> List[RunRecord]:
+        """All runs spawned by a message, in creation order"""
+        return [r for r in self._query("message_key = ?", (message_key,)) if r.message_key == message_key]
+
+    def incomplete(self) -> List[RunRecord]:
+        """Runs that were started but never finished, e.g. because of a crash"""
+        return [r for r in self._query("status IN (?, ?, ?)", (PENDING, RUNNING, DISPATCHED)) if not r.finished]
+
+    def abandoned(self) -> List[RunRecord]:
+        """Unfinished runs left behind by earlier processes, which begin() will take over"""
+        return [r for r in self.incomplete() if r.owner != self.owner and r.created_at < self.started_at]
+
+    # ---- Lifecycle writes ----------------------------------------------
+
+    def begin(self, key: str, manager: str, task: str, message_key: str = "",
+              channel_id: Optional[int] = None) -> RunRecord:
+        """
+        Atomically claim a run. A new key is inserted and committed before this
+        returns. For a known key the existing record is returned so the caller can
+        serve its output (finished), report it as running (claim IN_PROGRESS), or
+        resume it (claim TAKEN_OVER: left unfinished by an earlier process).
+        """
+        now = time.time()
+        record = RunRecord(
+            key=key, message_key=message_key, manager=manager, task=task,
+            channel_id=channel_id, created_at=now, updated_at=now, owner=self.owner,
+        )
+        select = f"SELECT {', '.join(_COLUMNS)} FROM runs WHERE key = ?"
+        with self._claim_lock:
+            conn = self._claim_conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                inserted = conn.execute(
+                    f"INSERT OR IGNORE INTO runs ({', '.join(_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' for _ in _COLUMNS)})",
+                    record.to_row(),
+                ).rowcount
+                if inserted:
+                    claim = CLAIMED
+                else:
+                    existing = RunRecord.from_row(conn.execute(select, (key,)).fetchone())
+                    claim = None
+                    if not existing.finished and existing.owner != self.owner and existing.created_at < self.started_at:
+                        conn.execute("UPDATE runs SET owner = ? WHERE key = ?", (self.owner, key))
+                        claim = TAKEN_OVER
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if claim == CLAIMED:
+            record.claim = CLAIMED
+            return record
+        # Latest state, including writes of this process not committed yet
+        current = self.get(key)
+        if claim == TAKEN_OVER:
+            current.owner = self.owner
+        elif not current.finished:
+            claim = IN_PROGRESS
+        current.claim = claim
+        return current
+
+    def plan(self, record: RunRecord, workflow: str, params: Dict[str, Any]):
+        """Store the chosen workflow and its params before executing it"""
+        record.workflow = workflow
+        record.params = params
+        record.status = RUNNING
+        self._write(record)
+
+    def dispatch(self, record: RunRecord):
+        """Mark the workflow as executing; committed before the workflow's side effects start"""
+        record.status = DISPATCHED
+        self._write(record)
+
+    def complete(self, record: RunRecord, output: Any):
+        record.output = output if output is None or isinstance(output, str) else json.dumps(output, default=str)
+        record.status = COMPLETED
+        self._write(record)
+
+    def fail(self, record: RunRecord, output: str):
+        record.output = output
+        record.status = FAILED
+        self._write(record)
+
+    def close(self):
+        """Flush pending writes and close the database"""
+        if self._closed:
+            return
+        self._closed = True
+        self._writes.put(None)
+        self._writer.join()
+        self._write_conn.close()
+        self._read_conn.close()
+        self._claim_conn.close()